@@ -0,0 +1,205 @@
+"""Benchmarks of the ziploader.
+
+Times every get_* function and common combined workflows on an archive and
+measures the peak of traced allocations and the memory of each loader stage
+(see pyeutl.ziploader.profiling). Without an archive, a synthetic archive of
+the given scale is generated (see synthetic.py). Results are written as json,
+and compared to a previous run to detect regressions:
+
+    python benchmarks/run.py --scale 0.1 --output base.json
+    python benchmarks/run.py --scale 0.1 --output new.json --compare base.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pyeutl import ziploader as zl  # noqa: E402
+from pyeutl.ziploader.profiling import profile_memory  # noqa: E402
+from synthetic import make_archive  # noqa: E402
+
+
+def _accounts(fn_zip):
+    return zl.get_accounts(
+        fn_zip,
+        df_installation=zl.get_installations(fn_zip, compact=True),
+        df_accountHolder=zl.get_account_holders(fn_zip, compact=True),
+        compact=True,
+    )
+
+
+def _transactions_accounts(fn_zip):
+    return zl.get_transactions(fn_zip, df_account=_accounts(fn_zip), compact=True)
+
+
+def _compliance_installations(fn_zip):
+    return zl.get_compliance(
+        fn_zip, df_installation=zl.get_installations(fn_zip, compact=True)
+    )
+
+
+# benchmarks: name -> function of the archive
+BENCHMARKS = {
+    "get_installations": lambda fn: zl.get_installations(fn),
+    "get_installations_compact": lambda fn: zl.get_installations(fn, compact=True),
+    "get_account_holders": lambda fn: zl.get_account_holders(fn),
+    "get_accounts": lambda fn: zl.get_accounts(fn),
+    "get_accounts_compact": lambda fn: zl.get_accounts(fn, compact=True),
+    "get_compliance": lambda fn: zl.get_compliance(fn),
+    "get_compliance_compact": lambda fn: zl.get_compliance(fn, compact=True),
+    "get_transactions": lambda fn: zl.get_transactions(fn),
+    "get_transactions_compact": lambda fn: zl.get_transactions(fn, compact=True),
+    "get_transactions_monthly": lambda fn: zl.get_transactions(fn, freq="ME"),
+    "get_transactions_chunked_monthly": lambda fn: zl.get_transactions(
+        fn, freq="ME", chunksize=250000
+    ),
+    "accounts_with_details": _accounts,
+    "transactions_with_accounts": _transactions_accounts,
+    "compliance_with_installations": _compliance_installations,
+    "holdings_monthly": lambda fn: zl.get_holdings(fn, freq="ME"),
+    "flow_matrix_registry": lambda fn: zl.get_flow_matrix(fn, by="registry"),
+}
+
+
+def _size(res):
+    """Rows and deep memory usage of a result"""
+    if isinstance(res, pd.DataFrame):
+        return len(res), int(res.memory_usage(deep=True).sum())
+    return None, None
+
+
+def _arrow_allocated():
+    """Bytes allocated by the Arrow memory pool, which tracemalloc does not
+    trace. None if pyarrow is not installed"""
+    try:
+        import pyarrow as pa
+    except ImportError:
+        return None
+    return pa.total_allocated_bytes()
+
+
+def run_benchmark(func, fn_zip, repeat=3):
+    """Time a benchmark and measure its memory in an additional traced run.
+    Arrow-backed columns are accounted for by the Arrow memory held by the
+    result
+    :param func: <callable> taking the archive
+    :param fn_zip: <string> name of zip file
+    :param repeat: <int> number of timed runs
+    :return: <dict>"""
+    seconds = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        res = func(fn_zip)
+        seconds.append(time.perf_counter() - t0)
+    rows, frame_bytes = _size(res)
+    del res
+    arrow = _arrow_allocated()
+    with profile_memory() as profile:
+        tracemalloc.reset_peak()
+        res = func(fn_zip)
+        peak = tracemalloc.get_traced_memory()[1]
+    arrow = _arrow_allocated() - arrow if arrow is not None else None
+    del res
+    return {
+        "seconds": seconds,
+        "best": min(seconds),
+        "median": float(np.median(seconds)),
+        "peak_bytes": peak,
+        "arrow_bytes": arrow,
+        "frame_bytes": frame_bytes,
+        "rows": rows,
+        "stages": profile.to_frame().to_dict(orient="records"),
+    }
+
+
+def run(fn_zip, benchmarks=None, repeat=3):
+    """Run benchmarks
+    :param fn_zip: <string> name of zip file
+    :param benchmarks: <list: string> names of benchmarks (see BENCHMARKS).
+            None for all
+    :param repeat: <int> number of timed runs per benchmark
+    :return: <dict> with metadata and results"""
+    results = {}
+    for name in benchmarks or BENCHMARKS:
+        results[name] = run_benchmark(BENCHMARKS[name], fn_zip, repeat=repeat)
+        r = results[name]
+        print(f"{name:36} {r['best']:9.3f}s {r['peak_bytes'] / 2**20:10.1f} MiB")
+    return {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(),
+            "archive": os.path.abspath(fn_zip),
+            "archive_size": os.path.getsize(fn_zip),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def _memory(result):
+    """Traced peak and Arrow memory of a benchmark"""
+    return result["peak_bytes"] + (result.get("arrow_bytes") or 0)
+
+
+def compare(results, baseline, threshold=0.2):
+    """Compare results to a baseline run
+    :param results: <dict> as returned by run
+    :param baseline: <dict> as returned by run
+    :param threshold: <float> relative increase of time or memory reported as
+            regression
+    :return: <pd.DataFrame> with ratios of new to baseline results"""
+    rows = {}
+    for name, r in results["results"].items():
+        if name not in baseline["results"]:
+            continue
+        b = baseline["results"][name]
+        rows[name] = {
+            "time_ratio": r["best"] / b["best"],
+            "memory_ratio": _memory(r) / _memory(b),
+        }
+    df = pd.DataFrame(rows).T
+    df["regression"] = (df[["time_ratio", "memory_ratio"]] > 1 + threshold).any(axis=1)
+    return df
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--archive", help="zip file, synthetic if not given")
+    parser.add_argument("--scale", type=float, default=0.1, help="synthetic scale")
+    parser.add_argument("--seed", type=int, default=0, help="synthetic seed")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs")
+    parser.add_argument("--benchmarks", nargs="*", choices=list(BENCHMARKS))
+    parser.add_argument("--output", help="json file to write results to")
+    parser.add_argument("--compare", help="json file with baseline results")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fn_zip = args.archive
+        if fn_zip is None:
+            fn_zip = os.path.join(tmp, "eutl_synthetic.zip")
+            make_archive(fn_zip, scale=args.scale, seed=args.seed)
+        results = run(fn_zip, benchmarks=args.benchmarks, repeat=args.repeat)
+        if args.archive is None:
+            results["meta"].update(archive=None, scale=args.scale, seed=args.seed)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, default=str)
+    if args.compare:
+        with open(args.compare) as f:
+            df = compare(results, json.load(f), threshold=args.threshold)
+        print(df.to_string())
+        sys.exit(1 if df.regression.any() else 0)
@@ -0,0 +1,473 @@
+"""Synthetic EUTL archive for offline benchmarks.
+
+The archive has the members and columns of the euets.info release (see
+COLUMNS). Columns are listed independently of the ziploader schemas, so that
+changes of the schemas show up in benchmarks. Keys are consistent between
+members, codes are drawn from the lookup tables and the category mappings, so
+all loaders and merges of the ziploader work on it. The number of rows scales with the scale factor, at
+scale 1 they are close to the 2024 release:
+
+    python benchmarks/synthetic.py eutl_synthetic.zip --scale 0.1
+"""
+
+import argparse
+import io
+import os
+import sys
+from zipfile import ZipFile, ZIP_DEFLATED
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pyeutl.ziploader.category_mappings import (  # noqa: E402
+    map_account_category,
+    map_activity_category,
+    map_nace_category,
+)
+
+# rows of members at scale 1
+BASE_ROWS = {
+    "installation.csv": 18000,
+    "account_holder.csv": 30000,
+    "account.csv": 45000,
+    "transaction.csv": 1200000,
+    "surrender.csv": 60000,
+    "project.csv": 8000,
+}
+
+# columns of the members in the header of the euets.info release with the
+# kind of values generated for them
+COLUMNS = {
+    "installation.csv": {
+        "id": "text",
+        "name": "text",
+        "tradingSystem_id": "code",
+        "registry_id": "code",
+        "activity_id": "integer",
+        "eprtrID": "text",
+        "parentCompany": "text",
+        "subsidiaryCompany": "text",
+        "permitID": "text",
+        "designatorICAO": "text",
+        "monitoringID": "text",
+        "monitoringExpiry": "text",
+        "monitoringFirstYear": "text",
+        "permitDateExpiry": "timestamp",
+        "isAircraftOperator": "flag",
+        "ec748_2009Code": "text",
+        "permitDateEntry": "timestamp",
+        "addressMain": "text",
+        "addressSecondary": "text",
+        "postalCode": "text",
+        "city": "text",
+        "country_id": "code",
+        "latitudeEutl": "decimal",
+        "longitudeEutl": "decimal",
+        "latitudeGoogle": "decimal",
+        "longitudeGoogle": "decimal",
+        "nace15_id": "decimal",
+        "nace20_id": "decimal",
+        "nace_id": "decimal",
+        "euEntitlement": "integer",
+        "chEntitlement": "integer",
+        "isMaritimeOperator": "flag",
+        "shippingCompanyCountry": "code",
+        "shippingCompanyType": "code",
+        "shippingCompany": "text",
+        "imoID": "text",
+        "region": "code",
+        "created_on": "timestamp",
+        "updated_on": "timestamp",
+    },
+    "account_holder.csv": {
+        "id": "integer",
+        "name": "text",
+        "tradingSystem_id": "code",
+        "addressMain": "text",
+        "addressSecondary": "text",
+        "postalCode": "text",
+        "city": "text",
+        "telephone1": "text",
+        "telephone2": "text",
+        "eMail": "text",
+        "legalEntityIdentifier": "text",
+        "country_id": "code",
+        "created_on": "timestamp",
+        "updated_on": "timestamp",
+    },
+    "account.csv": {
+        "id": "integer",
+        "tradingSystem_id": "code",
+        "accountIDEutl": "integer",
+        "accountIDTransactions": "text",
+        "accountIDESD": "text",
+        "yearValid": "integer",
+        "name": "text",
+        "registry_id": "code",
+        "accountHolder_id": "integer",
+        "accountType_id": "code",
+        "isOpen": "flag",
+        "openingDate": "timestamp",
+        "closingDate": "timestamp",
+        "commitmentPeriod": "code",
+        "companyRegistrationNumber": "text",
+        "companyRegistrationNumberType": "code",
+        "isRegisteredEutl": "flag",
+        "installation_id": "text",
+        "bvdId": "text",
+        "created_on": "timestamp",
+        "updated_on": "timestamp",
+    },
+    "compliance.csv": {
+        "installation_id": "text",
+        "year": "integer",
+        "reportedInSystem_id": "code",
+        "euetsPhase": "code",
+        "compliance_id": "code",
+        "allocatedFree": "integer",
+        "allocatedNewEntrance": "integer",
+        "allocatedTotal": "integer",
+        "allocated10c": "integer",
+        "verified": "integer",
+        "verifiedCummulative": "integer",
+        "verifiedUpdated": "flag",
+        "surrendered": "integer",
+        "surrenderedCummulative": "integer",
+        "balance": "integer",
+        "penalty": "integer",
+        "created_on": "timestamp",
+        "updated_on": "timestamp",
+    },
+    "surrender.csv": {
+        "id": "integer",
+        "installation_id": "text",
+        "reportedInSystem_id": "code",
+        "year": "integer",
+        "unitType_id": "code",
+        "amount": "integer",
+        "originatingRegistry_id": "code",
+        "project_id": "integer",
+        "created_on": "timestamp",
+        "updated_on": "timestamp",
+    },
+    "transaction.csv": {
+        "id": "integer",
+        "transactionID": "text",
+        "tradingSystem_id": "code",
+        "date": "text",
+        "acquiringYear": "integer",
+        "transferringYear": "integer",
+        "transactionTypeMain_id": "integer",
+        "transactionTypeSupplementary_id": "integer",
+        "transferringAccount_id": "integer",
+        "acquiringAccount_id": "integer",
+        "unitType_id": "code",
+        "project_id": "integer",
+        "amount": "integer",
+    },
+    "project.csv": {
+        "id": "integer",
+        "track": "integer",
+        "country_id": "code",
+        "created_on": "timestamp",
+        "updated_on": "timestamp",
+    },
+}
+
+# years with compliance data of every installation
+YEARS = list(range(2005, 2024))
+
+# rows of the transaction member generated and written at once
+CHUNKSIZE = 500000
+
+REGISTRIES = {
+    "AT": "Austria",
+    "BE": "Belgium",
+    "BG": "Bulgaria",
+    "CY": "Cyprus",
+    "CZ": "Czechia",
+    "DE": "Germany",
+    "DK": "Denmark",
+    "EE": "Estonia",
+    "ES": "Spain",
+    "EU": "European Union",
+    "FI": "Finland",
+    "FR": "France",
+    "GB": "United Kingdom",
+    "GR": "Greece",
+    "HR": "Croatia",
+    "HU": "Hungary",
+    "IE": "Ireland",
+    "IS": "Iceland",
+    "IT": "Italy",
+    "LI": "Liechtenstein",
+    "LT": "Lithuania",
+    "LU": "Luxembourg",
+    "LV": "Latvia",
+    "MT": "Malta",
+    "NL": "Netherlands",
+    "NO": "Norway",
+    "PL": "Poland",
+    "PT": "Portugal",
+    "RO": "Romania",
+    "SE": "Sweden",
+    "SI": "Slovenia",
+    "SK": "Slovakia",
+}
+
+LOOKUPS = {
+    "unit_type.csv": {
+        "AAU": "Assigned Amount Unit",
+        "CER": "Certified Emission Reduction",
+        "ERU": "Emission Reduction Unit",
+        "EUA": "Allowance",
+        "EUAA": "Aviation Allowance",
+        "CHU": "Swiss Allowance",
+    },
+    "transaction_type_main.csv": {
+        1: "Issuance",
+        3: "External transfer",
+        4: "Cancellation",
+        5: "Retirement",
+        10: "Internal transfer",
+    },
+    "transaction_type_supplementary.csv": {
+        0: "Not applicable",
+        21: "Allocation",
+        52: "Surrender",
+        53: "Deletion",
+        54: "Auction",
+    },
+    "compliance_code.csv": {
+        "A": "Compliant",
+        "B": "Not compliant",
+        "C": "Emissions not verified",
+        "D": "Verified late",
+        "E": "Not compliant, verified late",
+    },
+    "trading_system_code.csv": {"euets": "EU ETS", "ch": "Swiss ETS"},
+}
+
+
+def _nace_id(code):
+    """NACE code as written in the archive, e.g., 1.11 -> "01.11" """
+    s = f"{code:g}"
+    return s if code >= 10 else "0" + s
+
+
+def _lookup(mapping):
+    return pd.DataFrame({"id": list(mapping), "description": list(mapping.values())})
+
+
+def _lookups():
+    """Lookup members of the archive"""
+    nace = sorted(map_nace_category)
+    members = {
+        "country_code.csv": _lookup(REGISTRIES),
+        "activity_type.csv": _lookup(
+            {k: f"Activity {k}" for k in map_activity_category}
+        ),
+        "account_type.csv": _lookup(
+            {k: f"Account type {k}" for k in map_account_category}
+        ),
+        "nace_code.csv": pd.DataFrame(
+            {
+                "id": [_nace_id(c) for c in nace],
+                "parent_id": [_nace_id(int(c)) if c % 1 else "" for c in nace],
+                "level": [2 + len(f"{c:g}".partition(".")[2]) for c in nace],
+                "description": [f"NACE {_nace_id(c)}" for c in nace],
+            }
+        ),
+    }
+    members.update({fn: _lookup(mapping) for fn, mapping in LOOKUPS.items()})
+    return members
+
+
+def _values(rng, kind, n, col):
+    """Random values of a column of given kind (see COLUMNS)"""
+    missing = rng.random(n) < 0.1
+    if kind == "text":
+        values = pd.Series([f"{col} {i}" for i in rng.integers(0, n, n)])
+    elif kind == "code":
+        values = pd.Series(rng.choice([f"{col}_{i}" for i in range(8)], n))
+    elif kind == "timestamp":
+        values = pd.Series(_timestamps(rng, n, fraction=False))
+    elif kind == "flag":
+        values = pd.Series(rng.choice(["True", "False"], n))
+    elif kind == "decimal":
+        values = pd.Series(rng.random(n) * 100)
+    else:
+        values = pd.Series(rng.integers(0, 10000, n)).astype("Int64")
+    return values.mask(missing)
+
+
+def _timestamps(rng, n, fraction=True):
+    """EUTL timestamps between 2005 and 2024, partly with milliseconds"""
+    seconds = rng.integers(1104537600, 1704067200, n)
+    dates = pd.to_datetime(seconds, unit="s").strftime("%Y-%m-%d %H:%M:%S")
+    if not fraction:
+        return dates
+    ms = pd.Series(rng.integers(0, 1000, n)).map(lambda x: f".{x:03d}")
+    return np.where(rng.random(n) < 0.8, dates + ms, dates)
+
+
+def _table(rng, fn_file, n, **columns):
+    """Member with random values for all columns of the member. Keyword
+    arguments give values of columns with relations to other members."""
+    df = pd.DataFrame(index=range(n))
+    for col, kind in COLUMNS[fn_file].items():
+        if isinstance(columns.get(col), pd.Series):
+            df[col] = columns[col].to_numpy()
+        elif col in columns:
+            df[col] = columns[col]
+        else:
+            df[col] = _values(rng, kind, n, col)
+    return df
+
+
+def _choice(rng, values, n, missing=0.0):
+    """Random draw of values with a share of missing values"""
+    res = pd.Series(rng.choice(np.asarray(values, dtype=object), n))
+    return res.mask(rng.random(n) < missing) if missing else res
+
+
+def _transactions(rng, n, start, accounts):
+    """Chunk of the transaction member"""
+    ids = np.arange(start + 1, start + n + 1)
+    return _table(
+        rng,
+        "transaction.csv",
+        n,
+        id=ids,
+        transactionID=[f"EU{i}" for i in ids],
+        tradingSystem_id=_choice(rng, ["euets", "ch"], n),
+        date=_timestamps(rng, n),
+        transactionTypeMain_id=_choice(
+            rng, list(LOOKUPS["transaction_type_main.csv"]), n
+        ),
+        transactionTypeSupplementary_id=_choice(
+            rng, list(LOOKUPS["transaction_type_supplementary.csv"]), n
+        ),
+        transferringAccount_id=_choice(rng, accounts, n, missing=0.05),
+        acquiringAccount_id=_choice(rng, accounts, n, missing=0.01),
+        unitType_id=_choice(rng, list(LOOKUPS["unit_type.csv"]), n),
+        project_id=pd.Series(dtype="Int64", index=range(n)),
+        amount=rng.lognormal(8, 2, n).astype("int64") + 1,
+    )
+
+
+def make_archive(fn_zip, scale=1.0, seed=0):
+    """Write synthetic archive
+    :param fn_zip: <string> name of zip file to write
+    :param scale: <float> scale factor of the number of rows (see BASE_ROWS)
+    :param seed: <int> seed of the random generator
+    :return: <dict: member -> number of rows>"""
+    rng = np.random.default_rng(seed)
+    rows = {fn: max(int(n * scale), 10) for fn, n in BASE_ROWS.items()}
+    registries = list(REGISTRIES)
+    members = _lookups()
+
+    n = rows["installation.csv"]
+    registry = _choice(rng, registries, n)
+    installations = (registry + "_" + pd.Series(range(n)).astype(str)).to_numpy()
+    nace = [_nace_id(c) for c in map_nace_category]
+    members["installation.csv"] = _table(
+        rng,
+        "installation.csv",
+        n,
+        id=installations,
+        tradingSystem_id="euets",
+        registry_id=registry,
+        country_id=registry,
+        activity_id=_choice(rng, list(map_activity_category), n),
+        nace15_id=_choice(rng, nace, n, missing=0.2),
+        nace20_id=_choice(rng, nace, n, missing=0.2),
+        nace_id=_choice(rng, nace, n, missing=0.2),
+    )
+
+    n = rows["account_holder.csv"]
+    holders = np.arange(1, n + 1)
+    members["account_holder.csv"] = _table(
+        rng,
+        "account_holder.csv",
+        n,
+        id=holders,
+        tradingSystem_id="euets",
+        country_id=_choice(rng, registries, n),
+    )
+
+    n = rows["account.csv"]
+    accounts = np.arange(1, n + 1)
+    members["account.csv"] = _table(
+        rng,
+        "account.csv",
+        n,
+        id=accounts,
+        tradingSystem_id="euets",
+        registry_id=_choice(rng, registries, n),
+        accountHolder_id=_choice(rng, holders, n, missing=0.05),
+        accountType_id=_choice(rng, list(map_account_category), n),
+        installation_id=_choice(rng, installations, n, missing=0.5),
+    )
+
+    n = len(installations) * len(YEARS)
+    members["compliance.csv"] = _table(
+        rng,
+        "compliance.csv",
+        n,
+        installation_id=np.repeat(installations, len(YEARS)),
+        year=np.tile(YEARS, len(installations)),
+        reportedInSystem_id="euets",
+        euetsPhase=pd.cut(
+            np.tile(YEARS, len(installations)),
+            [2004, 2007, 2012, 2020, 2030],
+            labels=["2005-2007", "2008-2012", "2013-2020", "2021-2030"],
+        ).astype(str),
+        compliance_id=_choice(rng, list(LOOKUPS["compliance_code.csv"]), n, 0.3),
+    )
+
+    n = rows["project.csv"]
+    projects = np.arange(1, n + 1)
+    members["project.csv"] = _table(
+        rng, "project.csv", n, id=projects, country_id=_choice(rng, registries, n)
+    )
+
+    n = rows["surrender.csv"]
+    members["surrender.csv"] = _table(
+        rng,
+        "surrender.csv",
+        n,
+        id=np.arange(1, n + 1),
+        installation_id=_choice(rng, installations, n),
+        reportedInSystem_id="euets",
+        year=_choice(rng, YEARS, n),
+        unitType_id=_choice(rng, ["CER", "ERU"], n),
+        originatingRegistry_id=_choice(rng, registries, n),
+        project_id=_choice(rng, projects, n),
+    )
+
+    with ZipFile(fn_zip, "w", compression=ZIP_DEFLATED) as zip_file:
+        for fn_file, df in members.items():
+            zip_file.writestr(fn_file, df.to_csv(index=False))
+            rows[fn_file] = len(df)
+        # transactions are generated in chunks to bound memory at large scales
+        n = rows["transaction.csv"]
+        with zip_file.open("transaction.csv", "w", force_zip64=True) as f:
+            text = io.TextIOWrapper(f, encoding="utf-8", newline="")
+            for start in range(0, n, CHUNKSIZE):
+                df = _transactions(rng, min(CHUNKSIZE, n - start), start, accounts)
+                df.to_csv(text, index=False, header=start == 0)
+            text.flush()
+            text.detach()
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("fn_zip", help="name of zip file to write")
+    parser.add_argument("--scale", type=float, default=1.0, help="scale factor")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    args = parser.parse_args()
+    for fn_file, n in make_archive(args.fn_zip, args.scale, args.seed).items():
+        print(f"{fn_file:40} {n:>10}")
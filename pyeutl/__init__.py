@@ -1,3 +1,31 @@
-import pyeutl.orm as orm
-import pyeutl.ziploader as ziploader
-from .utils import download_data
+"""Access data of the European Union Emissions Trading System provided by
+euets.info. Submodules are imported on first access, so that, e.g., using
+the ziploader does not import the database dependencies of the orm."""
+
+import importlib
+
+# submodules and attributes imported on first access
+_SUBMODULES = ["orm", "ziploader"]
+_ATTRIBUTES = {
+    "download_data": "utils",
+    "fetch_release": "releases",
+    "ReleaseManager": "releases",
+}
+
+__all__ = _SUBMODULES + list(_ATTRIBUTES)
+
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        value = importlib.import_module(f".{name}", __name__)
+    elif name in _ATTRIBUTES:
+        module = importlib.import_module(f".{_ATTRIBUTES[name]}", __name__)
+        value = getattr(module, name)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,192 @@
+"""Compiled lookup of categories of hierarchical codes.
+
+Category tables are written by hand for NACE, activity and account type codes,
+with keys in different forms (e.g. "01.11" or 1.11 for NACE codes). A lookup
+encodes all codes as integers of their position in the code hierarchy, so
+string and numeric forms of a code resolve alike, and searches a sorted array
+of the encoded keys level by level. Codes missing from the table resolve to the
+category of their closest listed parent. Keys that cannot be encoded, e.g.
+"None" for accounts without type, are matched exactly:
+
+    lookup = CategoryLookup.nace(map_nace)
+    lookup.get("35.11")  # same as lookup.get(35.11)
+    lookup.map(df.nace_id, as_category=True)  # vectorized over a column
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def encode_nace(s):
+    """Encode NACE codes as hundredths, e.g., "35.11" and 35.11 -> 3511
+    :param s: <pd.Series> with codes as strings or numbers
+    :return: <np.ndarray: int64> with -1 for invalid codes"""
+    x = pd.to_numeric(s, errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    codes = np.round(x * 100)
+    # codes with more than two decimals are not NACE codes
+    valid = np.isfinite(codes) & (codes >= 0) & (np.abs(x * 100 - codes) < 1e-6)
+    return np.where(valid, codes, -1).astype("int64")
+
+
+def encode_integer(s):
+    """Encode integer codes, e.g., activity ids "20", 20, and 20.0 -> 20
+    :param s: <pd.Series> with codes as strings or numbers
+    :return: <np.ndarray: int64> with -1 for invalid codes"""
+    x = pd.to_numeric(s, errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    valid = np.isfinite(x) & (x >= 0) & (x == np.round(x))
+    return np.where(valid, x, -1).astype("int64")
+
+
+def encode_account_type(s):
+    """Encode account types "<kind>-<type>" as kind * 1000 + type + 1 and bare
+    kinds as kind * 1000, e.g., "100-7" -> 100008 and "100" -> 100000
+    :param s: <pd.Series> with codes
+    :return: <np.ndarray: int64> with -1 for invalid codes"""
+    parts = (
+        pd.Series(s, dtype=object).astype(str).str.extract(r"^\s*(\d+)(?:-(\d+))?\s*$")
+    )
+    kind = pd.to_numeric(parts[0]).to_numpy(dtype="float64", na_value=np.nan)
+    sub = pd.to_numeric(parts[1]).to_numpy(dtype="float64", na_value=np.nan)
+    codes = kind * 1000 + np.where(np.isnan(sub), 0, sub + 1)
+    valid = np.isfinite(codes) & ~(sub >= 999)
+    return np.where(valid, codes, -1).astype("int64")
+
+
+class CategoryLookup:
+    """Lookup of categories of codes on sorted encoded keys
+
+    :param mapping: <dict: code -> category>
+    :param encode: <callable> encoding a series of codes as non-negative
+            integers, -1 for invalid codes
+    :param levels: <tuple: int> divisors of the encoded code giving the code
+            itself and its parents, from fine to coarse. (1,) for exact lookup
+    """
+
+    def __init__(self, mapping, encode, levels=(1,)):
+        self.encode = encode
+        self.levels = tuple(levels)
+        self.keys = list(mapping)
+        self.labels = list(mapping.values())
+        codes = encode(pd.Series(list(mapping), dtype=object))
+        # keys that cannot be encoded are only matched exactly
+        self._exact = {
+            key: i for i, (key, code) in enumerate(zip(mapping, codes)) if code < 0
+        }
+        # later keys win if several keys have the same code, like in a dict
+        entries = np.arange(len(codes))[::-1]
+        codes = codes[::-1]
+        keep = codes >= 0
+        codes, first = np.unique(codes[keep], return_index=True)
+        self._keys = codes
+        self._entries = entries[keep][first]
+
+    @classmethod
+    def nace(cls, mapping, hierarchical=True):
+        """Lookup of NACE codes resolving classes to groups and divisions
+        :param mapping: <dict: code -> category>
+        :param hierarchical: <boolean> False for exact lookup
+        :return: <CategoryLookup>"""
+        return cls(mapping, encode_nace, (1, 10, 100) if hierarchical else (1,))
+
+    @classmethod
+    def activity(cls, mapping):
+        """Lookup of activity ids
+        :param mapping: <dict: code -> category>
+        :return: <CategoryLookup>"""
+        return cls(mapping, encode_integer)
+
+    @classmethod
+    def account_type(cls, mapping):
+        """Lookup of account types resolving types to their kind if listed
+        :param mapping: <dict: code -> category>
+        :return: <CategoryLookup>"""
+        return cls(mapping, encode_account_type, (1, 1000))
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __repr__(self):
+        return (
+            f"<CategoryLookup keys={len(self._keys) + len(self._exact)} "
+            f"levels={self.levels}>"
+        )
+
+    def resolve(self, codes):
+        """Position of the category of codes in labels
+        :param codes: <list-like> with codes in any form
+        :return: <np.ndarray: int64> with -1 for codes not resolved"""
+        codes = pd.Series(codes, dtype=object)
+        encoded = self.encode(codes)
+        pos = np.full(len(encoded), -1, dtype="int64")
+        if self._exact:
+            exact = codes.map(self._exact).to_numpy(dtype="float64", na_value=np.nan)
+            found = ~np.isnan(exact)
+            pos[found] = exact[found]
+            encoded = np.where(found, -1, encoded)
+        if len(self._keys) == 0:
+            return pos
+        todo = encoded >= 0
+        for divisor in self.levels:
+            parent = encoded // divisor * divisor
+            i = np.minimum(np.searchsorted(self._keys, parent), len(self._keys) - 1)
+            found = todo & (self._keys[i] == parent)
+            pos[found] = self._entries[i[found]]
+            todo &= ~found
+        return pos
+
+    def mismatches(self):
+        """Keys of the table that do not resolve to their own category, e.g.,
+        keys of the same code in different forms with different categories
+        :return: <dict: code -> (category in table, category resolved)>"""
+        resolved = self.map(pd.Series(self.keys, dtype=object))
+        return {
+            k: (v, r) for k, v, r in zip(self.keys, self.labels, resolved) if v != r
+        }
+
+    def verify(self):
+        """Check that all keys of the table resolve to their own category
+        :return: <CategoryLookup> self"""
+        wrong = self.mismatches()
+        if wrong:
+            raise ValueError(f"Keys not resolved to their category: {wrong}")
+        return self
+
+    def get(self, code, default=None):
+        """Category of one code
+        :param code: code as string or number
+        :param default: value if the code is not resolved
+        :return: <string>"""
+        pos = self.resolve([code])[0]
+        return self.labels[pos] if pos >= 0 else default
+
+    def to_dict(self, codes):
+        """Categories of given codes
+        :param codes: <list-like> with codes
+        :return: <dict: code -> category> of resolved codes"""
+        codes = list(codes)
+        return {c: self.labels[p] for c, p in zip(codes, self.resolve(codes)) if p >= 0}
+
+    def map(self, s, default=None, as_category=False):
+        """Categories of a column of codes. Distinct values are resolved once.
+        :param s: <pd.Series> with codes
+        :param default: value for codes not resolved
+        :param as_category: <boolean> True to return a categorical series
+        :return: <pd.Series> with index of s"""
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            # categories are mapped, codes are gathered by position
+            values = list(self.map(pd.Series(s.cat.categories), default=default))
+            pos = s.cat.codes.to_numpy().astype("int64")
+            pos[pos == -1] = len(values)
+        else:
+            codes, uniques = pd.factorize(s)
+            values = self.labels
+            pos = np.append(self.resolve(uniques), -1)[codes]
+            pos[pos == -1] = len(values)  # position of default value
+        values = values + [default]
+        if as_category:
+            codes, categories = pd.factorize(pd.Series(values))
+            return pd.Series(
+                pd.Categorical.from_codes(codes[pos], categories=categories),
+                index=s.index,
+            )
+        return pd.Series(values).take(pos).set_axis(s.index)
@@ -1,3 +1,11 @@
 from .dataAccessLayer import DataAccessLayer
 from .model import *
-from .mappings import *
\ No newline at end of file
+from .mappings import *
+from . import mappings as _mappings
+
+
+def __getattr__(name):
+    # inverse mappings are built on first access
+    if name in _mappings._INVERSE:
+        return getattr(_mappings, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
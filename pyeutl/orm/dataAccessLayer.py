@@ -1,18 +1,21 @@
-import os
 import csv
 from typing import Any
 from zipfile import ZipFile
 from getpass import getpass
-from io import StringIO
+from io import StringIO, TextIOWrapper
 import psycopg2
 import pandas as pd
-from sqlalchemy.exc import ProgrammingError
 from sqlalchemy.inspection import inspect
 from sqlalchemy import create_engine, MetaData
 from sqlalchemy.orm import sessionmaker
-from pyeutl.utils import download_data
+from pyeutl.releases import fetch_release
+from pyeutl.ziploader.utils import get_engine_args
+from pyeutl.ziploader.schemas import NA_VALUES
 from .model import (
     Base,
+    Account,
+    Compliance,
+    Transaction,
     TransactionTypeMain,
     TransactionTypeSupplementary,
     Country,
@@ -161,56 +164,142 @@ class DataAccessLayer:
         update: bool = False,
         bulk_insert: bool = False,
         verbose: bool = False,
-    ) -> None:
-        """Inserts dataframe to database using session and ORM object.
-        Dataframe has to have columns matching fields of the OMR objects
+    ) -> dict[str, int]:
+        """Inserts dataframe into the table of an ORM object.
+        Dataframe has to have columns matching fields of the ORM object.
+
+        The frame is copied into a temporary staging table in one statement and
+        inserted with INSERT ... ON CONFLICT keyed on the primary key of the
+        object. Of rows with the same key in the frame, the first is inserted,
+        or the last with update=True. Frames without all primary key columns,
+        e.g. without an autoincrement id, are inserted as they are and the
+        database assigns the keys; they cannot update existing rows.
+
+        Args:
             df: <pd.DataFrame> with data
             obj: <ORM object>
             update: <boolean> True to update existing rows
-            bulk_insert: <boolean> True for bulk insert of items
+            bulk_insert: <boolean> kept for compatibility, rows are always
+                inserted in bulk
             verbose: <boolean> to print all keys not inserted
+
+        Returns:
+            dict[str, int]: number of rows "inserted", "updated", and "skipped"
         """
-        printed = False
-        # get primary key names
-        pk_names = [i.name for i in inspect(obj).primary_key]
-
-        # replace Null values by None
-        df_ = self._replace_null(df)
-        to_add = []
-        with self.Session() as session:
-            for item in df_.to_dict(orient="records"):
-                # get primary key
-                pk = {k: v for k, v in item.items() if k in pk_names}
-                exists = False
-                try:
-                    qry = session.query(obj).filter_by(**pk)
-                    exists = qry.count() > 0
-                except ProgrammingError:
-                    pass
-                if exists:  # with same key already in database
-                    if update:
-                        qry.delete()
-                    else:
-                        if verbose:
-                            print(
-                                f"Did not insert {pk} into table {obj.__tablename__}",
-                            )
-                        else:
-                            if not printed:
-                                print(
-                                    f"Some entries not inserted into {obj.__tablename__} due to key duplication."
-                                )
-                                printed = True
-                        continue
-                obj_to_insert = obj(**item)
-                if bulk_insert:
-                    to_add.append(obj_to_insert)
+        table = obj.__table__
+        pk_names = [c.name for c in inspect(obj).primary_key]
+        columns = [c.name for c in table.columns if c.name in df.columns]
+        missing_keys = [c for c in pk_names if c not in columns]
+        if update and missing_keys:
+            raise ValueError(
+                f"Rows of {table.name} cannot be updated without the primary key "
+                f"columns {missing_keys}"
+            )
+        int_cols = [
+            c.name
+            for c in table.columns
+            if c.name in df.columns and self._is_integer(c.type)
+        ]
+        df_ = self._replace_null(
+            self._prepare_int_cols_for_sql_insert(df[columns].copy(), int_cols)
+        )
+
+        name = f'"{table.schema}"."{table.name}"' if table.schema else f'"{table.name}"'
+        stage = "_pyeutl_stage"
+        keys = self._quote(pk_names)
+        if update and set(columns) - set(pk_names):
+            assignments = ", ".join(
+                f'"{c}" = EXCLUDED."{c}"' for c in columns if c not in pk_names
+            )
+            conflict = f"DO UPDATE SET {assignments}"
+        else:
+            conflict = "DO NOTHING"
+        # of duplicated keys in the frame, keep the row that would win if the
+        # rows were inserted one after the other
+        order = "DESC" if update else "ASC"
+        if missing_keys:
+            sql_insert = (
+                f"INSERT INTO {name} ({self._quote(columns)}) "
+                f'SELECT {self._quote(columns)} FROM {stage} ORDER BY "_row"'
+            )
+        else:
+            sql_insert = f"""
+                WITH ins AS (
+                    INSERT INTO {name} ({self._quote(columns)})
+                    SELECT DISTINCT ON ({keys}) {self._quote(columns)} FROM {stage}
+                    ORDER BY {keys}, "_row" {order}
+                    ON CONFLICT ({keys}) {conflict}
+                    RETURNING (xmax = 0) AS inserted
+                )
+                SELECT count(*) FILTER (WHERE inserted),
+                    count(*) FILTER (WHERE NOT inserted)
+                FROM ins"""
+
+        with self.engine.begin() as con:
+            with con.connection.cursor() as cur:
+                cur.execute(
+                    f"CREATE TEMP TABLE {stage} ON COMMIT DROP AS "
+                    f"SELECT {self._quote(columns)} FROM {name} WITH NO DATA"
+                )
+                cur.execute(f'ALTER TABLE {stage} ADD COLUMN "_row" bigserial')
+                self._copy_df(cur, df_, stage, columns)
+                skipped_keys = []
+                if verbose and not update and not missing_keys:
+                    cur.execute(
+                        f"SELECT DISTINCT {keys} FROM {stage} "
+                        f"JOIN {name} USING ({keys})"
+                    )
+                    skipped_keys = cur.fetchall()
+                cur.execute(sql_insert)
+                if missing_keys:
+                    inserted, updated = cur.rowcount, 0
                 else:
-                    session.add(obj_to_insert)
-            if bulk_insert:
-                session.add_all(to_add)
-            session.commit()
-        return
+                    inserted, updated = cur.fetchone()
+
+        skipped = len(df_) - inserted - updated
+        for key in skipped_keys:
+            print(f"Did not insert {dict(zip(pk_names, key))} into table {table.name}")
+        if skipped > 0 and not verbose:
+            print(
+                f"Some entries not inserted into {table.name} due to key duplication."
+            )
+        return {"inserted": inserted, "updated": updated, "skipped": skipped}
+
+    @staticmethod
+    def _quote(names: list[str]) -> str:
+        """Comma separated list of quoted column names"""
+        return ", ".join(f'"{c}"' for c in names)
+
+    @staticmethod
+    def _is_integer(column_type: Any) -> bool:
+        """True if the sqlalchemy column type holds integers"""
+        try:
+            return column_type.python_type is int
+        except NotImplementedError:
+            return False
+
+    @classmethod
+    def _copy_df(
+        cls, cur: Any, df: pd.DataFrame, table: str, columns: list[str]
+    ) -> None:
+        """Copy dataframe into a table with a single COPY statement.
+
+        Args:
+            cur: psycopg2 cursor
+            df (pd.DataFrame): data with None for null values
+            table (str): quoted name of table
+            columns (list[str]): columns of the dataframe to copy
+        """
+        s_buf = StringIO()
+        writer = csv.writer(s_buf)
+        # unquoted \N is null, so that empty strings remain empty strings
+        writer.writerows(
+            [r"\N" if v is None else v for v in row]
+            for row in df[columns].itertuples(index=False, name=None)
+        )
+        s_buf.seek(0)
+        sql = f"COPY {table} ({cls._quote(columns)}) FROM STDIN WITH (FORMAT csv, "
+        cur.copy_expert(sql=sql + "NULL '\\N')", file=s_buf)
 
     def insert_df_large(
         self,
@@ -315,15 +404,76 @@ class DataAccessLayer:
             )
         return
 
+    def insert_member(
+        self,
+        fzip: ZipFile,
+        fn_file: str,
+        obj: Any,
+        drop: list[str] | None = None,
+    ) -> int:
+        """Insert a csv member of the zip archive into the table of an ORM object
+        without parsing it in python.
+
+        The decompressed member is streamed into a temporary staging table of
+        text columns by COPY ... WITH CSV HEADER. Columns of the member that
+        are not dropped and exist in the table are inserted with SQL casts.
+        Empty strings and the other default missing values of pandas read_csv
+        (see NA_VALUES) are null, so that rows are the same as read by pandas,
+        and integers written as floats (e.g. "1.0") are converted to integers.
+
+        Args:
+            fzip (ZipFile): open zip archive
+            fn_file (str): name of csv file in zip archive
+            obj (Any): ORM object of the target table
+            drop (list[str], optional): columns of the member not inserted.
+                Defaults to None for ["created_on", "updated_on"].
+
+        Returns:
+            int: number of rows inserted
+        """
+        if drop is None:
+            drop = ["created_on", "updated_on"]
+        with fzip.open(fn_file) as f:
+            header = next(csv.reader(TextIOWrapper(f, encoding="utf-8-sig")))
+        table = obj.__table__
+        name = f'"{table.schema}"."{table.name}"' if table.schema else f'"{table.name}"'
+        stage = "_pyeutl_stage"
+        columns = [c for c in header if c in table.columns and c not in drop]
+
+        na_values = ", ".join(f"'{v}'" for v in NA_VALUES)
+
+        def cast(col):
+            value = (
+                f"CASE WHEN {self._quote([col])} IN ({na_values}) THEN NULL "
+                f"ELSE {self._quote([col])} END"
+            )
+            if self._is_integer(table.columns[col].type):
+                value = f"CAST({value} AS numeric)"
+            sql_type = table.columns[col].type.compile(dialect=self.engine.dialect)
+            return f"CAST({value} AS {sql_type})"
+
+        with self.engine.begin() as con:
+            with con.connection.cursor() as cur:
+                text_columns = ", ".join(f'"{c}" text' for c in header)
+                cur.execute(
+                    f"CREATE TEMP TABLE {stage} ({text_columns}) ON COMMIT DROP"
+                )
+                with fzip.open(fn_file) as f:
+                    cur.copy_expert(
+                        sql=f"COPY {stage} FROM STDIN WITH (FORMAT csv, HEADER true)",
+                        file=f,
+                    )
+                cur.execute(
+                    f"INSERT INTO {name} ({self._quote(columns)}) "
+                    f"SELECT {', '.join(cast(c) for c in columns)} FROM {stage}"
+                )
+                return cur.rowcount
+
     @staticmethod
     def _replace_null(df: pd.DataFrame) -> pd.DataFrame:
         """replaces nan and nat in dataframe by None values for database insertion"""
-        df_ = df.copy()
-        dt_cols = df_.select_dtypes(include=["datetime64"]).columns
-        for c in dt_cols:  # convert datetimes to objects to replace nat
-            df_[c] = df_[c].astype("object")
-        df_ = df_.where(df.notnull(), None)
-        return df_
+        # cast to objects, numeric and datetime columns would keep nan and nat
+        return df.astype("object").where(df.notnull(), None)
 
     @staticmethod
     def _prepare_int_cols_for_sql_insert(
@@ -353,22 +503,52 @@ class DataAccessLayer:
             df[c] = df[c].map(int_to_string)
         return df
 
+    @staticmethod
+    def _read_csv(
+        fzip: ZipFile, fn_file: str, engine: str | None = None, **kwargs
+    ) -> pd.DataFrame:
+        """Read csv file from zip archive with the given parsing engine
+
+        Args:
+            fzip (ZipFile): open zip archive
+            fn_file (str): name of file in zip archive
+            engine (str, optional): parsing engine "c", "python", or "pyarrow".
+                Defaults to None for the pandas default.
+            kwargs: passed to pandas read_csv
+
+        Returns:
+            pd.DataFrame: parsed file
+        """
+        kwargs.update(get_engine_args(engine, arrow_dtypes=False))
+        if kwargs.get("engine", "c") != "c":
+            kwargs.pop("low_memory", None)
+        return pd.read_csv(fzip.open(fn_file), **kwargs)
+
     def create_database(
-        self, fn_source: str | None = None, askConfirmation: bool = True
+        self,
+        fn_source: str | None = None,
+        askConfirmation: bool = True,
+        engine: str | None = None,
+        passthrough: bool = False,
     ) -> None:
         """Create Postres-Eutl database based in zipped eutl csv datafiles.
         Note that data already in the database will be deleted.
 
         Args:
-            fn_source (str): path to zip file with eutl data. If none, data will be
-                downloaded from euets.info for the most recent year of the database.
+            fn_source (str): path to zip file with eutl data. If none, data of the
+                most recent year will be taken from the release cache or downloaded
+                from euets.info (see pyeutl.releases).
             askConfirmation (bool, optional): True to ask for confirmation. Defaults to True.
+            engine (str, optional): csv parsing engine "c", "python", or "pyarrow".
+                The multithreaded pyarrow engine falls back to the c engine if
+                pyarrow is not installed. Defaults to None for the pandas default.
+            passthrough (bool, optional): True to stream the compliance, account,
+                and transaction files into the database without parsing them in
+                python (see insert_member). Defaults to False.
         """
-        delete_input = False
         if fn_source is None:
-            print("No source file provided. Download data from euets.info")
-            delete_input = True
-            fn_source = download_data()
+            print("No source file provided. Get data from euets.info")
+            fn_source = fetch_release()
 
         # empty the database
         self.empty_database(askConfirmation=askConfirmation)
@@ -376,32 +556,39 @@ class DataAccessLayer:
             # insert basic tables
             print("---- Insert lookup tables")
             self.insert_df(
-                pd.read_csv(fzip.open("nace_code.csv")).sort_values("level"), NaceCode
+                self._read_csv(fzip, "nace_code.csv", engine).sort_values("level"),
+                NaceCode,
             )
             self.insert_df(
-                pd.read_csv(fzip.open("compliance_code.csv")), ComplianceCode
+                self._read_csv(fzip, "compliance_code.csv", engine), ComplianceCode
             )
             self.insert_df(
-                pd.read_csv(fzip.open("country_code.csv"), keep_default_na=False),
+                self._read_csv(fzip, "country_code.csv", engine, keep_default_na=False),
                 Country,
             )
-            self.insert_df(pd.read_csv(fzip.open("unit_type.csv")), UnitType)
-            self.insert_df(pd.read_csv(fzip.open("activity_type.csv")), ActivityType)
-            self.insert_df(pd.read_csv(fzip.open("account_type.csv")), AccountType)
+            self.insert_df(self._read_csv(fzip, "unit_type.csv", engine), UnitType)
             self.insert_df(
-                pd.read_csv(fzip.open("transaction_type_supplementary.csv")),
+                self._read_csv(fzip, "activity_type.csv", engine), ActivityType
+            )
+            self.insert_df(
+                self._read_csv(fzip, "account_type.csv", engine), AccountType
+            )
+            self.insert_df(
+                self._read_csv(fzip, "transaction_type_supplementary.csv", engine),
                 TransactionTypeSupplementary,
             )
             self.insert_df(
-                pd.read_csv(fzip.open("transaction_type_main.csv")), TransactionTypeMain
+                self._read_csv(fzip, "transaction_type_main.csv", engine),
+                TransactionTypeMain,
             )
             self.insert_df(
-                pd.read_csv(fzip.open("trading_system_code.csv")), TradingSystemCode
+                self._read_csv(fzip, "trading_system_code.csv", engine),
+                TradingSystemCode,
             )
             # projects
             print("---- Insert offset projects")
             self.insert_df_large(
-                pd.read_csv(fzip.open("project.csv")).drop(
+                self._read_csv(fzip, "project.csv", engine).drop(
                     ["created_on", "updated_on", "source"], axis=1
                 ),
                 "offset_project",
@@ -410,8 +597,10 @@ class DataAccessLayer:
             )
             # Installations
             print("---- Insert installations")
-            df = pd.read_csv(
-                fzip.open("installation.csv"),
+            df = self._read_csv(
+                fzip,
+                "installation.csv",
+                engine,
                 dtype={"nace15_id": "str", "nace20_id": "str", "nace_id": "str"},
                 low_memory=False,
             ).drop(["created_on", "updated_on"], axis=1)
@@ -423,28 +612,31 @@ class DataAccessLayer:
             )
             # Compliance
             print("---- Insert compliance data")
-            df = pd.read_csv(fzip.open("compliance.csv"), low_memory=False).drop(
-                ["created_on", "updated_on"], axis=1
-            )
-            int_cols = [
-                "allocatedFree",
-                "allocatedNewEntrance",
-                "allocatedTotal",
-                "allocated10c",
-                "verified",
-                "verifiedCummulative",
-                "verifiedUpdated",
-                "surrendered",
-                "surrenderedCummulative",
-                "balance",
-                "penalty",
-            ]
-            self.insert_df_large(
-                df, "compliance", integerColumns=int_cols, if_exists="append"
-            )
+            if passthrough:
+                self.insert_member(fzip, "compliance.csv", Compliance)
+            else:
+                df = self._read_csv(
+                    fzip, "compliance.csv", engine, low_memory=False
+                ).drop(["created_on", "updated_on"], axis=1)
+                int_cols = [
+                    "allocatedFree",
+                    "allocatedNewEntrance",
+                    "allocatedTotal",
+                    "allocated10c",
+                    "verified",
+                    "verifiedCummulative",
+                    "verifiedUpdated",
+                    "surrendered",
+                    "surrenderedCummulative",
+                    "balance",
+                    "penalty",
+                ]
+                self.insert_df_large(
+                    df, "compliance", integerColumns=int_cols, if_exists="append"
+                )
             # Surrender
             print("---- Insert surrendering data")
-            df = pd.read_csv(fzip.open("surrender.csv")).drop(
+            df = self._read_csv(fzip, "surrender.csv", engine).drop(
                 ["created_on", "updated_on"], axis=1
             )
             int_cols = ["amount", "project_id", "id"]
@@ -453,38 +645,40 @@ class DataAccessLayer:
             )
             # insert account holders
             print("---- Insert account holders")
-            df = pd.read_csv(fzip.open("account_holder.csv")).drop(
+            df = self._read_csv(fzip, "account_holder.csv", engine).drop(
                 ["created_on", "updated_on"], axis=1
             )
             self.insert_df_large(df, "account_holder", if_exists="append")
             # insert accounts
             print("---- Insert accounts")
-            df = pd.read_csv(fzip.open("account.csv"), low_memory=False).drop(
-                ["created_on", "updated_on"], axis=1
-            )
-            int_cols = ["id", "accountHolder_id", "yearValid"]
-            self.insert_df_large(
-                df, "account", integerColumns=int_cols, if_exists="append"
-            )
+            if passthrough:
+                self.insert_member(fzip, "account.csv", Account)
+            else:
+                df = self._read_csv(fzip, "account.csv", engine, low_memory=False).drop(
+                    ["created_on", "updated_on"], axis=1
+                )
+                int_cols = ["id", "accountHolder_id", "yearValid"]
+                self.insert_df_large(
+                    df, "account", integerColumns=int_cols, if_exists="append"
+                )
             # Transaction data
             print("---- Insert transactions")
-            df = pd.read_csv(fzip.open("transaction.csv"))
-            int_cols = [
-                "id",
-                "transactionTypeSupplementary_id",
-                "transactionTypeMain_id",
-                "project_id",
-                "amount",
-                "transferringAccount_id",
-                "acquiringAccount_id",
-                "acquiringYear",
-                "transferringYear",
-            ]
-            self.insert_df_large(
-                df, "transaction", integerColumns=int_cols, if_exists="append"
-            )
-
-        # delete the downloaded source file
-        if delete_input:
-            os.remove(fn_source)
+            if passthrough:
+                self.insert_member(fzip, "transaction.csv", Transaction)
+            else:
+                df = self._read_csv(fzip, "transaction.csv", engine)
+                int_cols = [
+                    "id",
+                    "transactionTypeSupplementary_id",
+                    "transactionTypeMain_id",
+                    "project_id",
+                    "amount",
+                    "transferringAccount_id",
+                    "acquiringAccount_id",
+                    "acquiringYear",
+                    "transferringYear",
+                ]
+                self.insert_df_large(
+                    df, "transaction", integerColumns=int_cols, if_exists="append"
+                )
         return
@@ -1,3 +1,5 @@
+from ..categories import CategoryLookup
+
 map_activities = {
     1: "Combustion",
     2: "Refineries",
@@ -41,10 +43,6 @@ map_activities = {
     99: "Other",
 }
 
-map_activities_inv = {}
-for key, val in map_activities.items():
-    map_activities_inv[val] = map_activities_inv.get(val, []) + [key]
-
 map_accounts = {
     "100-7": "Operator Holding Account",
     "100-9": "Operator Holding Account",
@@ -99,10 +97,6 @@ map_accounts = {
     "None": "Account Type Not Provided",
 }
 
-map_accounts_inv = {}
-for key, val in map_accounts.items():
-    map_accounts_inv[val] = map_accounts_inv.get(val, []) + [key]
-
 map_nace = {
     "01": "Agriculture and mining",
     "01.0": "Agriculture and mining",
@@ -1155,6 +1149,32 @@ map_nace = {
     "99.00": "Construction and services",
 }
 
-map_nace_inv = {}
-for key, val in map_nace.items():
-    map_nace_inv[val] = map_nace_inv.get(val, []) + [key]
+# inverse mappings (category -> codes) are built on first access
+_INVERSE = {
+    "map_activities_inv": "map_activities",
+    "map_accounts_inv": "map_accounts",
+    "map_nace_inv": "map_nace",
+}
+
+
+def _invert(mapping):
+    """Keys of a mapping by value
+    :param mapping: <dict>
+    :return: <dict: value -> list>"""
+    inverse = {}
+    for key, val in mapping.items():
+        inverse.setdefault(val, []).append(key)
+    return inverse
+
+
+def __getattr__(name):
+    if name in _INVERSE:
+        globals()[name] = _invert(globals()[_INVERSE[name]])
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# compiled lookups resolving codes not listed above through their parents
+lookup_activities = CategoryLookup.activity(map_activities).verify()
+lookup_accounts = CategoryLookup.account_type(map_accounts).verify()
+lookup_nace = CategoryLookup.nace(map_nace).verify()
@@ -14,7 +14,7 @@ from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship, backref
 import pandas as pd
 import numpy as np
-from .mappings import map_nace, map_activities
+from .mappings import lookup_nace, lookup_activities
 
 Base = declarative_base()
 
@@ -311,11 +311,11 @@ class Installation(Base):
 
     @property
     def nace_category(self):
-        return map_nace.get(self.nace_id)
+        return lookup_nace.get(self.nace_id)
 
     @property
     def activity_category(self):
-        return map_activities.get(self.activity_id)
+        return lookup_activities.get(self.activity_id)
 
     def get_compliance(self):
         """Returns compliance data as dataframe"""
@@ -339,10 +339,10 @@ class Installation(Base):
         }
         if self.activity_id:
             res["activity"] = self.activityType.description
-            res["activity_category"] = map_activities.get(self.activity_id, np.nan)
+            res["activity_category"] = lookup_activities.get(self.activity_id, np.nan)
         if self.nace_id:
             res["nace"] = self.nace.description
-            res["nace_category"] = map_nace.get(self.nace_id, np.nan)
+            res["nace_category"] = lookup_nace.get(self.nace_id, np.nan)
         if self.registry_id:
             res["registry"] = self.registry.description
         if self.country_id:
@@ -603,9 +603,9 @@ class Country(Base):
             Compliance.allocatedNewEntrance,
         )
         df = pd.read_sql(qry.statement, qry.session.bind)
-        df["nace_category"] = df.nace_id.map(lambda x: map_nace.get(x, "not provided"))
-        df["activity_category"] = df.activity_id.map(
-            lambda x: map_activities.get(x, "not provided")
+        df["nace_category"] = lookup_nace.map(df.nace_id, default="not provided")
+        df["activity_category"] = lookup_activities.map(
+            df.activity_id, default="not provided"
         )
         return df
 
@@ -0,0 +1,351 @@
+"""Download manager for releases of the EUTL archive published on euets.info.
+
+Releases are streamed to disk in chunks, split into byte ranges fetched in
+parallel if the server supports range requests, and resumed from partial
+files after interruptions. Completed downloads are verified by size and
+SHA-256 and stored in a content-addressed cache. Cached releases are
+revalidated with ETag and Last-Modified, so unchanged files are not
+downloaded again:
+
+    manager = ReleaseManager()
+    fn_zip = manager.fetch(2024)
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from .utils import URLS, MOST_RECENT_YEAR
+
+RELEASE_DIR_ENV = "PYEUTL_RELEASE_DIR"
+
+
+def default_release_dir() -> str:
+    """Directory of the release cache: environment variable PYEUTL_RELEASE_DIR
+    or ~/.cache/pyeutl/releases"""
+    return os.environ.get(
+        RELEASE_DIR_ENV,
+        os.path.join(os.path.expanduser("~"), ".cache", "pyeutl", "releases"),
+    )
+
+
+def file_sha256(fn: str, chunk_size: int = 1 << 20) -> str:
+    """SHA-256 of a file read in chunks.
+
+    Args:
+        fn (str): path to file
+        chunk_size (int, optional): bytes read at once
+
+    Returns:
+        str: hexadecimal digest
+    """
+    h = hashlib.sha256()
+    with open(fn, "rb") as f:
+        while chunk := f.read(chunk_size):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ReleaseManager:
+    """Download and cache releases of the EUTL archive"""
+
+    def __init__(
+        self,
+        cache_dir: str | None = None,
+        connections: int = 4,
+        min_part_size: int = 16 << 20,
+        chunk_size: int = 1 << 20,
+        timeout: float = 60,
+    ):
+        """Constructor of the release manager.
+
+        Args:
+            cache_dir (str, optional): directory of the release cache. Defaults
+                to None for default_release_dir().
+            connections (int, optional): number of byte ranges fetched in
+                parallel. Defaults to 4.
+            min_part_size (int, optional): minimal size of byte ranges in bytes,
+                smaller files are fetched in one stream. Defaults to 16 MiB.
+            chunk_size (int, optional): bytes written at once. Defaults to 1 MiB.
+            timeout (float, optional): timeout of requests in seconds.
+        """
+        self.cache_dir = cache_dir or default_release_dir()
+        self.connections = connections
+        self.min_part_size = min_part_size
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        for sub in ["objects", "partial"]:
+            os.makedirs(os.path.join(self.cache_dir, sub), exist_ok=True)
+
+    # ---- index of cached releases
+    @property
+    def fn_index(self) -> str:
+        return os.path.join(self.cache_dir, "index.json")
+
+    def _read_index(self) -> dict:
+        if not os.path.exists(self.fn_index):
+            return {}
+        with open(self.fn_index) as f:
+            return json.load(f)
+
+    def _write_index(self, index: dict) -> None:
+        fn_tmp = f"{self.fn_index}.{os.getpid()}.tmp"
+        with open(fn_tmp, "w") as f:
+            json.dump(index, f, indent=2)
+        os.replace(fn_tmp, self.fn_index)
+
+    def path(self, year: int = MOST_RECENT_YEAR, url: str | None = None) -> str | None:
+        """Path of a cached release without contacting the server.
+
+        Args:
+            year (int, optional): year of release (see URLS)
+            url (str, optional): url of release. Overrides year.
+
+        Returns:
+            str | None: path to cached file or None if not cached
+        """
+        entry = self._read_index().get(url or URLS[year])
+        if entry is None:
+            return None
+        fn = os.path.join(self.cache_dir, "objects", entry["file"])
+        return fn if os.path.exists(fn) else None
+
+    def releases(self) -> dict:
+        """Cached releases by url with sha256, size, etag, and last_modified"""
+        return self._read_index()
+
+    # ---- download
+    def fetch(
+        self,
+        year: int = MOST_RECENT_YEAR,
+        url: str | None = None,
+        sha256: str | None = None,
+        force: bool = False,
+        revalidate: bool = True,
+    ) -> str:
+        """Get a release from the cache or download it.
+
+        Args:
+            year (int, optional): year of release (see URLS). Defaults to
+                MOST_RECENT_YEAR.
+            url (str, optional): url of release. Overrides year.
+            sha256 (str, optional): expected SHA-256 of the file. Defaults to
+                None for no check of the content.
+            force (bool, optional): True to download even if cached.
+            revalidate (bool, optional): True to check with the server whether
+                a cached release changed. False to use cached releases as they
+                are.
+
+        Returns:
+            str: path to the release in the cache
+        """
+        import requests
+
+        url = url or URLS[year]
+        index = self._read_index()
+        entry = index.get(url)
+        cached = self.path(url=url)
+        if cached is not None and not force:
+            if sha256 is not None and entry["sha256"] != sha256.lower():
+                cached = None
+            elif not revalidate:
+                return cached
+        try:
+            # forced downloads must not be answered with 304 Not Modified
+            info = self._head(url, entry if cached and not force else None)
+        except requests.RequestException as e:
+            if cached is None:
+                raise
+            warnings.warn(f"Could not revalidate {url}, using cached file: {e}")
+            return cached
+        if cached is not None and not force and self._unchanged(entry, info):
+            return cached
+
+        fn_part = self._download(url, info)
+        size = os.path.getsize(fn_part)
+        if info["size"] is not None and size != info["size"]:
+            self._remove_partial(url)
+            raise IOError(f"Size of {url} is {size} instead of {info['size']} bytes")
+        digest = file_sha256(fn_part, self.chunk_size)
+        if sha256 is not None and digest != sha256.lower():
+            self._remove_partial(url)
+            raise ValueError(f"SHA-256 of {url} is {digest} instead of {sha256}")
+
+        fn = os.path.join(self.cache_dir, "objects", f"{digest}.zip")
+        os.replace(fn_part, fn)
+        self._remove_partial(url)
+        index = self._read_index()
+        index[url] = {
+            "file": os.path.basename(fn),
+            "sha256": digest,
+            "size": size,
+            "etag": info["etag"],
+            "last_modified": info["last_modified"],
+        }
+        self._write_index(index)
+        return fn
+
+    def _head(self, url: str, entry: dict | None = None) -> dict:
+        """Size, validators and range support of a file on the server. Cached
+        validators are sent as conditional headers."""
+        import requests
+
+        headers = {}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        r = requests.head(
+            url, headers=headers, allow_redirects=True, timeout=self.timeout
+        )
+        if r.status_code == 304:
+            return {"not_modified": True, **entry}
+        r.raise_for_status()
+        size = r.headers.get("Content-Length")
+        return {
+            "not_modified": False,
+            "size": int(size) if size is not None else None,
+            "etag": r.headers.get("ETag"),
+            "last_modified": r.headers.get("Last-Modified"),
+            "ranges": r.headers.get("Accept-Ranges", "").lower() == "bytes",
+        }
+
+    @staticmethod
+    def _unchanged(entry: dict, info: dict) -> bool:
+        """True if the file on the server is the cached release"""
+        if info["not_modified"]:
+            return True
+        if info["size"] is not None and info["size"] != entry["size"]:
+            return False
+        if info["etag"] and entry.get("etag"):
+            return info["etag"] == entry["etag"]
+        if info["last_modified"] and entry.get("last_modified"):
+            return info["last_modified"] == entry["last_modified"]
+        return False
+
+    def _partial(self, url: str) -> str:
+        """Path of partial download of url"""
+        key = hashlib.sha256(url.encode()).hexdigest()[:32]
+        return os.path.join(self.cache_dir, "partial", key)
+
+    def _remove_partial(self, url: str) -> None:
+        base = self._partial(url)
+        directory = os.path.dirname(base)
+        for fn in os.listdir(directory):
+            if fn.startswith(os.path.basename(base)):
+                os.remove(os.path.join(directory, fn))
+
+    def _download(self, url: str, info: dict) -> str:
+        """Download url to its partial file, resuming earlier attempts of the
+        same version of the file.
+
+        Returns:
+            str: path to the complete partial file
+        """
+        base = self._partial(url)
+        validator = info["etag"] or info["last_modified"]
+        fn_meta = f"{base}.json"
+        if os.path.exists(fn_meta):
+            with open(fn_meta) as f:
+                meta = json.load(f)
+            if meta.get("validator") != validator or meta.get("size") != info["size"]:
+                # the file changed since the partial download
+                self._remove_partial(url)
+        with open(fn_meta, "w") as f:
+            json.dump({"url": url, "validator": validator, "size": info["size"]}, f)
+
+        size = info["size"]
+        fn_part = f"{base}.part"
+        n_parts = 1
+        if info["ranges"] and size is not None:
+            n_parts = max(1, min(self.connections, size // self.min_part_size))
+        if n_parts == 1:
+            self._fetch_range(url, fn_part, 0, None, info["ranges"], validator)
+            return fn_part
+
+        # byte ranges are fetched to separate files and concatenated
+        bounds = [size * i // n_parts for i in range(n_parts + 1)]
+        parts = [f"{base}.{i}.range" for i in range(n_parts)]
+        with ThreadPoolExecutor(n_parts) as pool:
+            futures = [
+                pool.submit(self._fetch_range, url, fn, start, end, True, validator)
+                for fn, start, end in zip(parts, bounds[:-1], bounds[1:])
+            ]
+            for future in futures:
+                future.result()
+        with open(fn_part, "wb") as f:
+            for fn in parts:
+                with open(fn, "rb") as part:
+                    shutil.copyfileobj(part, f, self.chunk_size)
+                os.remove(fn)
+        return fn_part
+
+    def _fetch_range(
+        self,
+        url: str,
+        fn: str,
+        start: int,
+        end: int | None,
+        ranges: bool,
+        validator: str | None,
+    ) -> None:
+        """Stream a byte range of url to fn, continuing a partial file.
+
+        Args:
+            url (str): url of file
+            fn (str): file to write
+            start (int): first byte of range
+            end (int | None): end of range (exclusive), None for the rest of
+                the file. The whole file is written if the server does not
+                return the rest of the file as range.
+            ranges (bool): True if the server supports range requests
+            validator (str | None): ETag or Last-Modified of the file
+        """
+        import requests
+
+        done = os.path.getsize(fn) if os.path.exists(fn) else 0
+        if end is not None and start + done >= end:
+            return
+        headers = {}
+        if ranges and (start + done > 0 or end is not None):
+            last = "" if end is None else end - 1
+            headers["Range"] = f"bytes={start + done}-{last}"
+            if validator:
+                headers["If-Range"] = validator
+        with requests.get(url, headers=headers, stream=True, timeout=self.timeout) as r:
+            r.raise_for_status()
+            if r.status_code != 206:
+                if end is not None or start > 0:
+                    raise IOError(f"Server did not return byte range of {url}")
+                # whole file returned, restart
+                done = 0
+            with open(fn, "ab" if done else "wb") as f:
+                for chunk in r.iter_content(self.chunk_size):
+                    f.write(chunk)
+
+
+def fetch_release(
+    year: int = MOST_RECENT_YEAR,
+    url: str | None = None,
+    sha256: str | None = None,
+    cache_dir: str | None = None,
+    **kwargs,
+) -> str:
+    """Get a release of the EUTL archive from the release cache or download it,
+    see ReleaseManager.fetch.
+
+    Args:
+        year (int, optional): year of release (see URLS)
+        url (str, optional): url of release. Overrides year.
+        sha256 (str, optional): expected SHA-256 of the file
+        cache_dir (str, optional): directory of the release cache
+        kwargs: passed to ReleaseManager.fetch
+
+    Returns:
+        str: path to the release in the cache
+    """
+    manager = ReleaseManager(cache_dir=cache_dir)
+    return manager.fetch(year, url=url, sha256=sha256, **kwargs)
@@ -1,5 +1,4 @@
 import os
-import requests
 
 MOST_RECENT_YEAR = 2024
 
@@ -18,6 +17,9 @@ def download_data(
 ) -> str:
     """Download data from the EUTL website for the given year.
 
+    The release is streamed into the release cache, resuming partial downloads
+    and skipping unchanged releases (see pyeutl.releases), and copied to fn_out.
+
     Args:
         year (int, optional): Year to download data for. Defaults to MOST_RECENT_YEAR.
         fn_out (str, optional): Filename to save the data to. If None, file will be saved
@@ -27,9 +29,10 @@ def download_data(
     Returns:
         str: Path to the downloaded file.
     """
+    import shutil
+    from .releases import fetch_release
+
     if fn_out is None:
         fn_out = os.path.join(os.getcwd(), f"eutl_{year}.zip")
-    dir_out = os.path.abspath(os.path.join(os.path.abspath(__file__), "../data/"))
-    r = requests.get(URLS[year], allow_redirects=True)
-    open(fn_out, "wb").write(r.content)
+    shutil.copyfile(fetch_release(year), fn_out)
     return fn_out
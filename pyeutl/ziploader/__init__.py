@@ -1,3 +1,21 @@
 from .ziploader import *
 from .category_mappings import *
-from .utils import *
\ No newline at end of file
+from .utils import *
+from .archive import EUTLArchive
+from .cache import set_cache_dir, get_cache_dir, clear_cache
+from .loader import load_all, EUTLTables
+from .joins import LazyAccountFrame
+from .star import get_star_schema, StarSchema
+from .delta import diff_archives, diff_tables, write_patch, read_patch
+from .sql import DuckDBArchive
+from .lazy import (
+    scan_installations,
+    scan_compliance,
+    scan_accounts,
+    scan_account_holders,
+    scan_transactions,
+)
+from .holdings import get_holdings, compute_holdings, get_flows
+from .flows import get_flow_matrix, compute_flow_matrix, FlowMatrix
+from .cube import build_cube, Cube, CUBES
+from .profiling import profile_memory, MemoryProfile
@@ -0,0 +1,202 @@
+import threading
+from collections import OrderedDict
+from zipfile import ZipFile
+import pandas as pd
+from .cache import freeze_args, archive_hash, get_cache_dir, read_cached
+
+
+class EUTLArchive:
+    """Session on a zipped EUTL archive. The zip file is opened once and every
+    member is parsed at most once. Parsed tables are kept in a cache that is
+    bounded by a memory budget (least recently used tables are evicted first).
+    Lookup tables used as label mappers are small and always kept. If a
+    persistent cache directory is set, members are additionally cached on disk
+    (see :mod:`pyeutl.ziploader.cache`).
+
+    All loader functions of the ziploader accept an archive instead of the name
+    of the zip file and are also available as methods, e.g.:
+
+        with EUTLArchive("eutl.zip") as archive:
+            df_inst = archive.get_installations()
+            df_acc = archive.get_accounts(df_installation=df_inst)
+
+    Archives can be shared between threads. Members are parsed outside of the
+    cache lock, so different members can be parsed concurrently.
+    """
+
+    def __init__(self, fn_zip, max_memory=None, cache_dir=None):
+        """
+        :param fn_zip: <string> name of zip file with data
+        :param max_memory: <int> memory budget in bytes for cached tables.
+                None for no limit
+        :param cache_dir: <string> directory of the persistent cache.
+                None to use the global cache directory (see set_cache_dir)
+        """
+        self.fn_zip = fn_zip
+        self.max_memory = max_memory
+        self.cache_dir = cache_dir
+        self._zip_file = None
+        self._hash = None
+        self._tables = OrderedDict()
+        self._sizes = {}
+        self._memory = 0
+        self._mappers = {}
+        self._columns = {}
+        self._lock = threading.RLock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __repr__(self):
+        return f"<EUTLArchive({self.fn_zip!r}) cached={list(self._tables)}>"
+
+    @property
+    def zip_file(self):
+        """Open zip file (opened on first access)"""
+        with self._lock:
+            if self._zip_file is None:
+                self._zip_file = ZipFile(self.fn_zip)
+            return self._zip_file
+
+    @property
+    def hash(self):
+        """Content hash of the archive"""
+        if self._hash is None:
+            self._hash = archive_hash(self.zip_file)
+        return self._hash
+
+    @property
+    def memory_usage(self):
+        """Memory in bytes used by cached tables"""
+        return self._memory
+
+    def namelist(self):
+        """Names of the members of the archive"""
+        return self.zip_file.namelist()
+
+    def open(self, fn_file):
+        """Open member of the archive
+        :param fn_file: <string> name of file in zip file
+        :return: <file-like>"""
+        return self.zip_file.open(fn_file)
+
+    def get_columns(self, fn_file):
+        """Get column names of member without parsing the file
+        :param fn_file: <string> name of file in zip file
+        :return: <list: string>"""
+        with self._lock:
+            if fn_file not in self._columns:
+                with self.open(fn_file) as f:
+                    df = pd.read_csv(f, nrows=0)
+                self._columns[fn_file] = list(df.columns)
+            return self._columns[fn_file]
+
+    def load_file(self, fn_file, read_csv_args={}):
+        """Load file in the archive. Tables are parsed only once for
+        a given set of read arguments and served from the cache afterwards.
+        :param fn_file: <string> name of file in zip file
+        :param read_csv_args: <dict> passed to pandas read_csv
+        :return: <pd.DataFrame> shallow copy of the cached table"""
+        key = (fn_file, freeze_args(read_csv_args))
+        with self._lock:
+            if key in self._tables:
+                self._tables.move_to_end(key)
+                return self._tables[key].copy(deep=False)
+        cache_dir = self.cache_dir or get_cache_dir()
+        if cache_dir is not None:
+            df = read_cached(
+                self.hash,
+                self.open,
+                fn_file,
+                read_csv_args=read_csv_args,
+                cache_dir=cache_dir,
+            )
+        else:
+            with self.open(fn_file) as f:
+                df = pd.read_csv(f, **read_csv_args)
+        with self._lock:
+            self._store(key, df)
+        return df.copy(deep=False)
+
+    def get_mapper(self, fn_file, key="id", value="description"):
+        """Get mapping dictionary from a lookup table in the archive
+        :param fn_file: <string> name of file in zip file
+        :param key: <string> name of key column
+        :param value: <string> name of value column
+        :return: <dict: key -> value>"""
+        cache_key = (fn_file, key, value)
+        with self._lock:
+            if cache_key not in self._mappers:
+                with self.open(fn_file) as f:
+                    df = pd.read_csv(f, keep_default_na=False)
+                self._mappers[cache_key] = dict(zip(df[key], df[value]))
+            return self._mappers[cache_key]
+
+    def clear(self):
+        """Remove all tables and mappers from the cache"""
+        with self._lock:
+            self._tables.clear()
+            self._sizes.clear()
+            self._memory = 0
+            self._mappers.clear()
+
+    def close(self):
+        """Close the zip file and empty the cache"""
+        with self._lock:
+            self.clear()
+            if self._zip_file is not None:
+                self._zip_file.close()
+                self._zip_file = None
+
+    def _store(self, key, df):
+        """Add table to cache and evict least recently used tables to stay
+        within the memory budget. Tables larger than the budget are not cached.
+        Tables are sized once when they are added.
+        :param key: <tuple> cache key
+        :param df: <pd.DataFrame> table to cache"""
+        if key in self._tables:
+            # parsed concurrently by another thread
+            return
+        size = int(df.memory_usage(deep=True).sum())
+        if self.max_memory is not None:
+            if size > self.max_memory:
+                return
+            while self._tables and self._memory + size > self.max_memory:
+                old_key, _ = self._tables.popitem(last=False)
+                self._memory -= self._sizes.pop(old_key)
+        self._tables[key] = df
+        self._sizes[key] = size
+        self._memory += size
+
+    def get_installations(self, **kwargs):
+        """See :func:`pyeutl.ziploader.get_installations`"""
+        from .ziploader import get_installations
+
+        return get_installations(self, **kwargs)
+
+    def get_compliance(self, **kwargs):
+        """See :func:`pyeutl.ziploader.get_compliance`"""
+        from .ziploader import get_compliance
+
+        return get_compliance(self, **kwargs)
+
+    def get_accounts(self, **kwargs):
+        """See :func:`pyeutl.ziploader.get_accounts`"""
+        from .ziploader import get_accounts
+
+        return get_accounts(self, **kwargs)
+
+    def get_transactions(self, **kwargs):
+        """See :func:`pyeutl.ziploader.get_transactions`"""
+        from .ziploader import get_transactions
+
+        return get_transactions(self, **kwargs)
+
+    def get_account_holders(self, **kwargs):
+        """See :func:`pyeutl.ziploader.get_account_holders`"""
+        from .ziploader import get_account_holders
+
+        return get_account_holders(self, **kwargs)
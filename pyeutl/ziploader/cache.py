@@ -0,0 +1,192 @@
+import os
+import shutil
+import hashlib
+import threading
+import warnings
+from zipfile import ZipFile
+import numpy as np
+import pandas as pd
+
+CACHE_DIR_ENV = "PYEUTL_CACHE_DIR"
+
+_cache_dir = os.environ.get(CACHE_DIR_ENV)
+_archive_hashes = {}
+
+
+def freeze_args(obj):
+    """Convert nested read arguments into a hashable cache key
+    :param obj: <object> argument value (dict, list, tuple or scalar)
+    :return: <hashable>"""
+    if isinstance(obj, dict):
+        return tuple(sorted((k, freeze_args(v)) for k, v in obj.items()))
+    if isinstance(obj, (list, tuple, set)):
+        return tuple(freeze_args(v) for v in obj)
+    return obj
+
+
+def set_cache_dir(cache_dir):
+    """Set directory of the persistent columnar cache for archive members.
+    The cache is disabled if cache_dir is None. The default is taken from
+    the environment variable PYEUTL_CACHE_DIR.
+    :param cache_dir: <string> directory to store cached tables
+    """
+    global _cache_dir
+    _cache_dir = cache_dir
+
+
+def get_cache_dir():
+    """Directory of the persistent cache or None if the cache is disabled"""
+    return _cache_dir
+
+
+def _has_pyarrow():
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def archive_hash(zip_file):
+    """Content hash of a zip archive. The hash is computed from name, size and
+    CRC-32 of all members as stored in the central directory of the archive, so
+    the archive does not have to be decompressed.
+    :param zip_file: <ZipFile>
+    :return: <string> hexadecimal hash"""
+    h = hashlib.sha256()
+    for info in sorted(zip_file.infolist(), key=lambda x: x.filename):
+        h.update(f"{info.filename}:{info.file_size}:{info.CRC};".encode())
+    return h.hexdigest()[:32]
+
+
+def get_archive_hash(fn_zip):
+    """Content hash of a zip archive file. Hashes are memorized as long as
+    size and modification time of the file do not change.
+    :param fn_zip: <string> name of zip file
+    :return: <string> hexadecimal hash"""
+    stat = os.stat(fn_zip)
+    key = (os.path.abspath(fn_zip), stat.st_size, stat.st_mtime_ns)
+    if key not in _archive_hashes:
+        with ZipFile(fn_zip) as zip_file:
+            _archive_hashes[key] = archive_hash(zip_file)
+    return _archive_hashes[key]
+
+
+def get_cache_path(hash_zip, fn_file, read_csv_args={}, cache_dir=None):
+    """Path of cached member
+    :param hash_zip: <string> content hash of the archive
+    :param fn_file: <string> name of file in zip file
+    :param read_csv_args: <dict> passed to pandas read_csv
+    :param cache_dir: <string> cache directory. None for global cache directory
+    :return: <string>"""
+    cache_dir = cache_dir or _cache_dir
+    hash_args = hashlib.sha256(repr(freeze_args(read_csv_args)).encode()).hexdigest()
+    name = os.path.splitext(os.path.basename(fn_file))[0]
+    return os.path.join(cache_dir, hash_zip, f"{name}-{hash_args[:16]}.parquet")
+
+
+def read_cached(hash_zip, open_file, fn_file, read_csv_args={}, cache_dir=None):
+    """Read member of archive from the persistent cache. If the member is not
+    cached yet it is parsed from the archive and written to the cache.
+    Cached tables are read memory-mapped.
+    :param hash_zip: <string> content hash of the archive
+    :param open_file: <callable> returning file-like object of member
+    :param fn_file: <string> name of file in zip file
+    :param read_csv_args: <dict> passed to pandas read_csv
+    :param cache_dir: <string> cache directory. None for global cache directory
+    :return: <pd.DataFrame>"""
+    if not _has_pyarrow():
+        warnings.warn("pyarrow is not installed. Persistent cache is disabled.")
+        with open_file(fn_file) as f:
+            return pd.read_csv(f, **read_csv_args)
+    fn_cache = get_cache_path(hash_zip, fn_file, read_csv_args, cache_dir=cache_dir)
+    if os.path.exists(fn_cache):
+        return _restore(pd.read_parquet(fn_cache, memory_map=True), fn_cache)
+    with open_file(fn_file) as f:
+        df = pd.read_csv(f, **read_csv_args)
+    os.makedirs(os.path.dirname(fn_cache), exist_ok=True)
+    fn_tmp = f"{fn_cache}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        df.to_parquet(fn_tmp)
+        os.replace(fn_tmp, fn_cache)
+    except Exception as e:  # table is still usable if it cannot be cached
+        warnings.warn(f"Could not cache {fn_file}: {e}")
+        if os.path.exists(fn_tmp):
+            os.remove(fn_tmp)
+    return df
+
+
+def _restore(df, fn_cache):
+    """Undo differences of a table read from parquet to the table as parsed:
+    missing values of object columns are None instead of nan and timestamps of
+    second resolution are stored in milliseconds
+    :param df: <pd.DataFrame> read from the cache
+    :param fn_cache: <string> name of cached file
+    :return: <pd.DataFrame>"""
+    import pyarrow.parquet as pq
+
+    meta = pq.read_schema(fn_cache).pandas_metadata or {}
+    numpy_types = {
+        c["name"]: c["numpy_type"]
+        for c in meta.get("columns", [])
+        if c["pandas_type"] == "datetime"
+    }
+    for c in df.columns:
+        if df[c].dtype == object and df[c].hasnans:
+            df[c] = df[c].where(df[c].notna(), np.nan)
+        dtype = numpy_types.get(c, "")
+        if dtype.startswith("datetime64[") and str(df[c].dtype) != dtype:
+            df[c] = df[c].astype(dtype)
+    return df
+
+
+def extract_member(open_file, fn_file, directory):
+    """Extract member of archive to a directory for engines reading files.
+    Members already extracted are not extracted again.
+    :param open_file: <callable> returning file-like object of member
+    :param fn_file: <string> name of file in zip file
+    :param directory: <string> directory to extract to
+    :return: <string> path of extracted file"""
+    path = os.path.join(directory, os.path.basename(fn_file))
+    if not os.path.exists(path):
+        os.makedirs(directory, exist_ok=True)
+        fn_tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open_file(fn_file) as src, open(fn_tmp, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.replace(fn_tmp, path)
+    return path
+
+
+def load_cached_file(fn_zip, fn_file, read_csv_args={}, cache_dir=None):
+    """Load file in zip archive using the persistent cache
+    :param fn_zip: <string> name of zip file
+    :param fn_file: <string> name of file in zip file
+    :param read_csv_args: <dict> passed to pandas read_csv
+    :param cache_dir: <string> cache directory. None for global cache directory
+    :return: <pd.DataFrame>"""
+    with ZipFile(fn_zip) as zip_file:
+        return read_cached(
+            get_archive_hash(fn_zip),
+            zip_file.open,
+            fn_file,
+            read_csv_args=read_csv_args,
+            cache_dir=cache_dir,
+        )
+
+
+def clear_cache(fn_zip=None, cache_dir=None):
+    """Delete cached tables
+    :param fn_zip: <string> name of zip file to delete cached tables for.
+            None to delete the cache of all archives
+    :param cache_dir: <string> cache directory. None for global cache directory
+    """
+    cache_dir = cache_dir or _cache_dir
+    if cache_dir is None:
+        return
+    if fn_zip is None:
+        dirs = [os.path.join(cache_dir, d) for d in os.listdir(cache_dir)]
+    else:
+        dirs = [os.path.join(cache_dir, get_archive_hash(fn_zip))]
+    for d in dirs:
+        if os.path.isdir(d):
+            shutil.rmtree(d)
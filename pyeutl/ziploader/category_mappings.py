@@ -1,3 +1,5 @@
+from ..categories import CategoryLookup
+
 map_activity_category = {
     1: "Combustion",
     2: "Refineries",
@@ -914,4 +916,9 @@ map_nace_category = {1.0: 'Agriculture and mining',
         98.0: 'Construction and services',
         98.1: 'Construction and services',
         98.2: 'Construction and services',
-        99.0: 'Construction and services'}
\ No newline at end of file
+        99.0: 'Construction and services'}
+
+# compiled lookups resolving codes not listed above through their parents
+lookup_activity_category = CategoryLookup.activity(map_activity_category).verify()
+lookup_account_category = CategoryLookup.account_type(map_account_category).verify()
+lookup_nace_category = CategoryLookup.nace(map_nace_category).verify()
@@ -0,0 +1,302 @@
+"""Materialized group-by cubes of archive tables.
+
+A cube holds measures summed over all combinations of its dimensions together
+with the number of rows in each cell. Slices and rollups are answered from the
+cube without reading the archive. Cubes are stored as parquet files with their
+definition in the file metadata and can be updated from a newer release by
+aggregating only the rows that changed (see delta.py):
+
+    cube = build_cube(fn_zip, "emissions")
+    cube.rollup(["year", "naceCategory"])
+    cube.slice(registry="Germany", year=(2013, 2020)).rollup(["year"])
+    cube.save("emissions.parquet")
+    cube = Cube.load("emissions.parquet").update(fn_zip_old, fn_zip_new)
+"""
+
+import json
+from dataclasses import dataclass, field, replace
+import pandas as pd
+from .delta import diff_archives
+from .archive import EUTLArchive
+from .cache import get_archive_hash
+from .utils import get_columns, filter_frame, get_frequency, period_labels
+from .ziploader import LABEL_SOURCES, get_compliance, get_installations
+from .ziploader import get_transactions
+
+# predefined cubes
+CUBES = {
+    "emissions": {
+        "table": "compliance",
+        "dimensions": ["year", "naceCategory", "registry"],
+        "measures": ["verified", "allocatedTotal", "surrendered"],
+        "filters": [("reportedInSystem_id", "==", "euets")],
+    },
+    "transaction_volume": {
+        "table": "transactions",
+        "dimensions": ["date", "transactionTypeMain", "unitType"],
+        "measures": ["amount"],
+        "freq": "MS",
+    },
+}
+
+# source tables of cubes: member aggregated, column identifying the rows that
+# are re-aggregated on updates, members merged into the rows with the column
+# they are merged on, and lookups of labels which require a rebuild on change
+CUBE_TABLES = {
+    "compliance": {
+        "member": "compliance.csv",
+        "key": "installation_id",
+        "key_type": str,
+        "dependencies": {"installation.csv": "id"},
+        "lookups": [
+            "compliance_code.csv",
+            "activity_type.csv",
+            "country_code.csv",
+            "nace_code.csv",
+        ],
+    },
+    "transactions": {
+        "member": "transaction.csv",
+        "key": "id",
+        "key_type": int,
+        "dependencies": {},
+        "lookups": [
+            "transaction_type_main.csv",
+            "transaction_type_supplementary.csv",
+            "unit_type.csv",
+        ],
+    },
+}
+
+# parquet metadata key with the definition of the cube
+METADATA_KEY = b"pyeutl.cube"
+
+
+@dataclass
+class Cube:
+    """Measures summed over all combinations of dimensions
+
+    table: <string> source table, see CUBE_TABLES
+    dimensions: <list: string> columns grouped by
+    measures: <list: string> columns summed
+    data: <pd.DataFrame> with dimensions, measures and the number of rows in
+        column "count"
+    freq: <string> frequency the date dimension is truncated to (see
+        utils.FREQUENCIES). None for transaction dates
+    filters: <list: tuple> of predicates (column, operator, value) on rows
+        before aggregation
+    archive_hash: <string> content hash of the archive the cube reflects
+    """
+
+    table: str
+    dimensions: list
+    measures: list
+    data: pd.DataFrame = None
+    freq: str = None
+    filters: list = field(default_factory=list)
+    archive_hash: str = None
+
+    def definition(self):
+        """Definition of the cube without data
+        :return: <dict>"""
+        return {
+            "table": self.table,
+            "dimensions": self.dimensions,
+            "measures": self.measures,
+            "freq": self.freq,
+            "filters": [list(f) for f in self.filters],
+            "archive_hash": self.archive_hash,
+        }
+
+    def slice(self, **selection):
+        """Select cells of the cube by values of dimensions. Values are single
+        values, lists of values, or tuples with bounds (included).
+        :param selection: values of dimensions, e.g., registry="Germany" or
+                year=(2013, 2020)
+        :return: <Cube>"""
+        filters = []
+        for dim, value in selection.items():
+            if dim not in self.dimensions:
+                raise ValueError(f"Unknown dimension: {dim}")
+            if isinstance(value, tuple):
+                filters.append((dim, "between", value))
+            elif isinstance(value, (list, set)):
+                filters.append((dim, "in", list(value)))
+            else:
+                filters.append((dim, "==", value))
+        data = filter_frame(self.data, filters).reset_index(drop=True)
+        return replace(self, data=data)
+
+    def rollup(self, dimensions=None):
+        """Sum measures over all dimensions not given
+        :param dimensions: <list: string> dimensions to keep. None for the
+                grand total
+        :return: <pd.DataFrame> with dimensions as index, measures and count"""
+        dimensions = dimensions or []
+        unknown = [d for d in dimensions if d not in self.dimensions]
+        if unknown:
+            raise ValueError(f"Unknown dimensions: {unknown}")
+        values = self.measures + ["count"]
+        if not dimensions:
+            return self.data[values].sum().to_frame().T
+        return self.data.groupby(dimensions, observed=True, dropna=False)[values].sum()
+
+    def save(self, fn):
+        """Store cube as parquet file with its definition as metadata
+        :param fn: <string> name of parquet file"""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pandas(self.data, preserve_index=False)
+        metadata = dict(table.schema.metadata or {})
+        metadata[METADATA_KEY] = json.dumps(self.definition()).encode()
+        pq.write_table(table.replace_schema_metadata(metadata), fn)
+
+    @classmethod
+    def load(cls, fn):
+        """Load cube stored by save
+        :param fn: <string> name of parquet file
+        :return: <Cube>"""
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(fn)
+        definition = json.loads(table.schema.metadata[METADATA_KEY])
+        definition["filters"] = [tuple(f) for f in definition["filters"]]
+        return cls(data=table.to_pandas(), **definition)
+
+    def update(self, fn_zip_old, fn_zip_new, delta=None):
+        """Update cube to a newer release of the archive. Only rows of the
+        source table changed between the releases, or merged with changed
+        rows, are aggregated. Changed lookups of labels require a rebuild.
+        :param fn_zip_old: <string> name of zip file or <EUTLArchive> the cube
+                was built from
+        :param fn_zip_new: <string> name of zip file or <EUTLArchive> of newer
+                release
+        :param delta: <ArchiveDelta> between the releases including the
+                members of the source table. None to compute it
+        :return: <Cube>"""
+        source = CUBE_TABLES[self.table]
+        if delta is None:
+            members = [source["member"], *source["dependencies"], *source["lookups"]]
+            delta = diff_archives(fn_zip_old, fn_zip_new, tables=members)
+        if self.archive_hash is not None and delta.hash_old != self.archive_hash:
+            raise ValueError("Cube was not built from the old archive")
+        if any(len(delta[m]) for m in source["lookups"]):
+            return build_cube(fn_zip_new, self.definition())
+
+        # source rows changed or merged with changed rows
+        members = {source["member"]: source["key"], **source["dependencies"]}
+        keys = pd.concat(
+            [
+                getattr(delta[m], part)[col]
+                for m, col in members.items()
+                for part in ["inserted", "deleted", "changed"]
+            ]
+        ).unique()
+        cube = replace(self, archive_hash=delta.hash_new)
+        if len(keys) == 0:
+            return cube
+        keys = [source["key_type"](k) for k in keys]
+        parts = [self.data]
+        for fn_zip, sign in [(fn_zip_old, -1), (fn_zip_new, 1)]:
+            df = aggregate(self, _load_rows(fn_zip, self, keys=keys))
+            df[self.measures + ["count"]] *= sign
+            parts.append(df)
+        cube.data = _combine(parts, self.dimensions)
+        return cube
+
+
+def _load_rows(fn_zip, cube, keys=None):
+    """Load rows of the source table of a cube
+    :param fn_zip: <string> name of zip file or <EUTLArchive>
+    :param cube: <Cube>
+    :param keys: <list> values of the key column (see CUBE_TABLES) of rows to
+            load. None for all rows
+    :return: <pd.DataFrame> with dimensions and measures"""
+    source = CUBE_TABLES[cube.table]
+    columns = cube.dimensions + cube.measures + [f[0] for f in cube.filters]
+    filters = None if keys is None else [(source["key"], "in", keys)]
+    if cube.table == "compliance":
+        own = get_columns(fn_zip, "compliance.csv")
+        own += list(LABEL_SOURCES["compliance.csv"])
+        df_installation = get_installations(
+            fn_zip,
+            columns=["id"] + [c for c in columns if c not in own],
+            filters=None if keys is None else [("id", "in", keys)],
+            compact=True,
+        )
+        df = get_compliance(
+            fn_zip,
+            df_installation=df_installation,
+            columns=[c for c in columns if c in own],
+            filters=filters,
+            compact=True,
+        )
+    else:
+        df = get_transactions(
+            fn_zip, columns=columns, filters=filters, compact=True, date_resolution="s"
+        )
+        if cube.freq is not None and "date" in df.columns:
+            df["date"] = _truncate_dates(df["date"], cube.freq)
+    if cube.filters:
+        df = filter_frame(df, cube.filters)
+    return df
+
+
+def _truncate_dates(dates, freq):
+    """Label dates by the period of the frequency they fall in"""
+    period, end = get_frequency(freq)
+    labels = period_labels(pd.PeriodIndex(dates, freq=period), end)
+    return pd.Series(labels, index=dates.index)
+
+
+def _combine(parts, dimensions):
+    """Sum aggregates of cube cells and drop cells without rows"""
+    df = pd.concat(parts, ignore_index=True)
+    df = df.groupby(dimensions, observed=True, dropna=False, sort=True).sum()
+    df = df[df["count"] != 0].reset_index()
+    for col in dimensions:
+        if df[col].dtype == object or pd.api.types.is_string_dtype(df[col]):
+            df[col] = df[col].astype("category")
+    return df
+
+
+def aggregate(cube, df):
+    """Sum measures of rows over the dimensions of a cube
+    :param cube: <Cube>
+    :param df: <pd.DataFrame> with dimensions and measures
+    :return: <pd.DataFrame> with dimensions, measures and count"""
+    grouped = df.groupby(cube.dimensions, observed=True, dropna=False, sort=True)
+    res = grouped[cube.measures].sum()
+    res["count"] = grouped.size().astype("int64")
+    return res.reset_index()
+
+
+def build_cube(fn_zip, definition):
+    """Materialize a cube from the archive
+    :param fn_zip: <string> name of zip file or <EUTLArchive>
+    :param definition: <string> name of predefined cube (see CUBES) or <dict>
+            with definition, i.e., table ("compliance" or "transactions"),
+            dimensions, measures, and optionally freq and filters
+    :return: <Cube>"""
+    if isinstance(definition, str):
+        if definition not in CUBES:
+            raise ValueError(f"Unknown cube: {definition}, use one of {list(CUBES)}")
+        definition = CUBES[definition]
+    if definition["table"] not in CUBE_TABLES:
+        raise ValueError(
+            f"Unknown table: {definition['table']}, use one of {list(CUBE_TABLES)}"
+        )
+    cube = Cube(
+        table=definition["table"],
+        dimensions=list(definition["dimensions"]),
+        measures=list(definition["measures"]),
+        freq=definition.get("freq"),
+        filters=[tuple(f) for f in definition.get("filters") or []],
+    )
+    cube.data = _combine([aggregate(cube, _load_rows(fn_zip, cube))], cube.dimensions)
+    if isinstance(fn_zip, EUTLArchive):
+        cube.archive_hash = fn_zip.hash
+    else:
+        cube.archive_hash = get_archive_hash(fn_zip)
+    return cube
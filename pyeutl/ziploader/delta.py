@@ -0,0 +1,251 @@
+"""Release-to-release delta between two EUTL archives.
+
+Members are compared row by row on their primary keys using vectorized row
+fingerprints. Members with identical size and CRC-32 in both archives are not
+read at all. Values are compared as they are written in the csv files, i.e.,
+as strings, so no change is missed or invented by type inference:
+
+    delta = diff_archives("eutl_2024_202405.zip", "eutl_2024_202410.zip")
+    delta.summary()
+    write_patch(delta, "patch_202405_202410.zip")
+    df = delta["account.csv"].apply(df_account_old)
+"""
+
+import io
+import json
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from zipfile import ZipFile, ZIP_DEFLATED
+import numpy as np
+import pandas as pd
+from .archive import EUTLArchive
+from .cache import archive_hash
+from .utils import load_zipped_file
+
+# primary key of the members of the archive
+PRIMARY_KEYS = {
+    "installation.csv": ["id"],
+    "account.csv": ["id"],
+    "account_holder.csv": ["id"],
+    "compliance.csv": ["installation_id", "year"],
+    "surrender.csv": ["id"],
+    "transaction.csv": ["id"],
+    "project.csv": ["id"],
+    "nace_code.csv": ["id"],
+    "country_code.csv": ["id"],
+    "compliance_code.csv": ["id"],
+    "unit_type.csv": ["id"],
+    "account_type.csv": ["id"],
+    "trading_system_code.csv": ["id"],
+    "activity_type.csv": ["id"],
+    "transaction_type_main.csv": ["id"],
+    "transaction_type_supplementary.csv": ["id"],
+}
+
+# members are compared as written in the csv files
+READ_CSV_ARGS = dict(dtype=str, keep_default_na=False)
+
+
+@dataclass
+class TableDelta:
+    """Changes of one member between two archives
+
+    keys: <list: string> primary key columns
+    inserted: <pd.DataFrame> with rows only in the new archive
+    deleted: <pd.DataFrame> with keys of rows only in the old archive
+    changed: <pd.DataFrame> with new values of rows in both archives
+    unchanged: <int> number of rows that did not change. None if the member
+        is identical in both archives and was not read
+    """
+
+    keys: list
+    inserted: pd.DataFrame
+    deleted: pd.DataFrame
+    changed: pd.DataFrame
+    unchanged: int = None
+
+    def __len__(self):
+        return len(self.inserted) + len(self.deleted) + len(self.changed)
+
+    def apply(self, df):
+        """Apply changes to the table of the old archive. Rows of the old table
+        keep their order, changed and inserted rows are appended.
+        :param df: <pd.DataFrame> with table of the old archive read as strings
+                (see READ_CSV_ARGS)
+        :return: <pd.DataFrame>"""
+        removed = pd.concat([self.deleted[self.keys], self.changed[self.keys]])
+        index = _key_index(removed, self.keys)
+        keep = _key_index(df, self.keys).get_indexer(index)
+        mask = np.ones(len(df), dtype=bool)
+        mask[keep[keep >= 0]] = False
+        return pd.concat([df[mask], self.changed, self.inserted], ignore_index=True)
+
+
+@dataclass
+class ArchiveDelta:
+    """Changes between two archives
+
+    tables: <dict: member -> TableDelta>
+    hash_old: <string> content hash of the old archive
+    hash_new: <string> content hash of the new archive
+    """
+
+    tables: dict = field(default_factory=dict)
+    hash_old: str = None
+    hash_new: str = None
+
+    def __getitem__(self, fn_file):
+        return self.tables[fn_file]
+
+    def summary(self):
+        """Number of inserted, deleted, changed and unchanged rows per member
+        :return: <pd.DataFrame>"""
+        return pd.DataFrame(
+            {
+                fn_file: {
+                    "inserted": len(d.inserted),
+                    "deleted": len(d.deleted),
+                    "changed": len(d.changed),
+                    "unchanged": d.unchanged,
+                }
+                for fn_file, d in self.tables.items()
+            }
+        ).T.astype("Int64")
+
+
+def _key_index(df, keys):
+    """Index on the primary key of a table"""
+    if len(keys) == 1:
+        return pd.Index(df[keys[0]])
+    return pd.MultiIndex.from_frame(df[keys])
+
+
+def fingerprint(df, columns=None):
+    """Hash every row of a table to one 64-bit fingerprint
+    :param df: <pd.DataFrame>
+    :param columns: <list: string> columns to include. None for all columns
+    :return: <np.ndarray: uint64>"""
+    if columns is not None:
+        df = df[columns]
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+def diff_tables(df_old, df_new, keys):
+    """Compute inserted, deleted and changed rows between two versions of a
+    table. Rows are matched on their primary key, values are compared using
+    fingerprints of the columns present in both versions.
+    :param df_old: <pd.DataFrame> with old version of table
+    :param df_new: <pd.DataFrame> with new version of table
+    :param keys: <list: string> primary key columns
+    :return: <TableDelta>"""
+    index_old, index_new = _key_index(df_old, keys), _key_index(df_new, keys)
+    for version, index in [("old", index_old), ("new", index_new)]:
+        if not index.is_unique:
+            raise ValueError(f"Primary key {keys} is not unique in {version} table")
+    columns = [c for c in df_new.columns if c in df_old.columns]
+    pos = index_new.get_indexer(index_old)
+    matched = pos >= 0
+
+    # rows in both versions with different fingerprints
+    is_changed = np.zeros(len(df_new), dtype=bool)
+    differs = (
+        fingerprint(df_old, columns)[matched]
+        != fingerprint(df_new, columns)[pos[matched]]
+    )
+    is_changed[pos[matched][differs]] = True
+    if list(df_new.columns) != columns:
+        # columns were added, all matched rows changed
+        is_changed[pos[matched]] = True
+    is_inserted = np.ones(len(df_new), dtype=bool)
+    is_inserted[pos[matched]] = False
+    return TableDelta(
+        keys=list(keys),
+        inserted=df_new[is_inserted].reset_index(drop=True),
+        deleted=df_old.loc[~matched, keys].reset_index(drop=True),
+        changed=df_new[is_changed].reset_index(drop=True),
+        unchanged=int(matched.sum() - is_changed.sum()),
+    )
+
+
+def _member_info(zip_file):
+    """Size and CRC-32 of all members of an archive"""
+    return {i.filename: (i.file_size, i.CRC) for i in zip_file.infolist()}
+
+
+def _zip_file(fn_zip, stack):
+    """Open zip file of archive, zip files opened by name are closed with the
+    stack"""
+    if isinstance(fn_zip, EUTLArchive):
+        return fn_zip.zip_file
+    return stack.enter_context(ZipFile(fn_zip))
+
+
+def diff_archives(fn_zip_old, fn_zip_new, tables=None):
+    """Compute changes of all members between two releases of the archive.
+    Members with identical size and CRC-32 are skipped without reading them.
+    :param fn_zip_old: <string> name of zip file or <EUTLArchive> of old release
+    :param fn_zip_new: <string> name of zip file or <EUTLArchive> of new release
+    :param tables: <list: string> members to compare. None for all members
+            present in both archives with a known primary key (see PRIMARY_KEYS)
+    :return: <ArchiveDelta>"""
+    with ExitStack() as stack:
+        zip_old = _zip_file(fn_zip_old, stack)
+        zip_new = _zip_file(fn_zip_new, stack)
+        info_old, info_new = _member_info(zip_old), _member_info(zip_new)
+        if tables is None:
+            tables = [t for t in PRIMARY_KEYS if t in info_old and t in info_new]
+        delta = ArchiveDelta(
+            hash_old=archive_hash(zip_old), hash_new=archive_hash(zip_new)
+        )
+        for fn_file in tables:
+            keys = PRIMARY_KEYS[fn_file]
+            if info_old[fn_file] == info_new[fn_file]:
+                with zip_new.open(fn_file) as f:
+                    header = pd.read_csv(f, nrows=0, **READ_CSV_ARGS)
+                delta.tables[fn_file] = TableDelta(
+                    keys=keys, inserted=header, deleted=header[keys], changed=header
+                )
+                continue
+            df_old = load_zipped_file(fn_zip_old, fn_file, read_csv_args=READ_CSV_ARGS)
+            df_new = load_zipped_file(fn_zip_new, fn_file, read_csv_args=READ_CSV_ARGS)
+            delta.tables[fn_file] = diff_tables(df_old, df_new, keys)
+    return delta
+
+
+def write_patch(delta, fn_patch):
+    """Write changes to a compressed patch file. Deleted rows are stored by
+    their keys only.
+    :param delta: <ArchiveDelta>
+    :param fn_patch: <string> name of zip file to write
+    """
+    meta = {"hash_old": delta.hash_old, "hash_new": delta.hash_new, "tables": {}}
+    with ZipFile(fn_patch, "w", compression=ZIP_DEFLATED) as zip_file:
+        for fn_file, d in delta.tables.items():
+            name = fn_file.removesuffix(".csv")
+            meta["tables"][fn_file] = {"keys": d.keys, "unchanged": d.unchanged}
+            for part in ["inserted", "deleted", "changed"]:
+                zip_file.writestr(
+                    f"{name}/{part}.csv", getattr(d, part).to_csv(index=False)
+                )
+        zip_file.writestr("patch.json", json.dumps(meta, indent=2))
+
+
+def read_patch(fn_patch):
+    """Read changes from a patch file written by write_patch
+    :param fn_patch: <string> name of zip file
+    :return: <ArchiveDelta>"""
+    with ZipFile(fn_patch) as zip_file:
+        meta = json.loads(zip_file.read("patch.json"))
+        delta = ArchiveDelta(hash_old=meta["hash_old"], hash_new=meta["hash_new"])
+        for fn_file, t in meta["tables"].items():
+            name = fn_file.removesuffix(".csv")
+            parts = {
+                part: pd.read_csv(
+                    io.BytesIO(zip_file.read(f"{name}/{part}.csv")), **READ_CSV_ARGS
+                )
+                for part in ["inserted", "deleted", "changed"]
+            }
+            delta.tables[fn_file] = TableDelta(
+                keys=t["keys"], unchanged=t["unchanged"], **parts
+            )
+    return delta
@@ -0,0 +1,207 @@
+"""Flow matrices of allowances between groups of accounts.
+
+Transferred amounts are accumulated over (period x source group x destination
+group) from integer codes of the transferring and acquiring accounts using
+bincount, without merging account information into the transaction data.
+Matrices are kept in coordinate format and can be converted to dense arrays,
+sparse matrices (requires scipy), or labeled frames:
+
+    fm = get_flow_matrix(fn_zip, by="registry", freq="ME")
+    fm.to_dense()  # array with shape (periods, registries, registries)
+    fm.matrix("2021-01-31")  # labeled registry-to-registry frame
+    fm.to_frame()  # period, source, destination, amount of non-zero flows
+"""
+
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+from .joins import ACCOUNT_KEYS
+from .utils import get_frequency, period_labels
+from .ziploader import get_transactions, get_accounts
+
+# account column defining the groups flows are accumulated over
+GROUPINGS = {
+    "account": "id",
+    "registry": "registry_id",
+    "accountType": "accountType_id",
+    "accountCategory": "accountCategory",
+    "accountHolder": "accountHolder_id",
+    "installation": "installation_id",
+}
+
+
+@dataclass
+class FlowMatrix:
+    """Flows between groups of accounts per period in coordinate format
+
+    periods: <pd.DatetimeIndex> labels of periods
+    groups: <pd.Index> labels of groups
+    period: <np.ndarray> with period codes of non-zero flows
+    source: <np.ndarray> with group codes of transferring accounts
+    destination: <np.ndarray> with group codes of acquiring accounts
+    amount: <np.ndarray> with transferred amounts
+    """
+
+    periods: pd.DatetimeIndex
+    groups: pd.Index
+    period: np.ndarray
+    source: np.ndarray
+    destination: np.ndarray
+    amount: np.ndarray
+
+    @property
+    def shape(self):
+        return len(self.periods), len(self.groups), len(self.groups)
+
+    def to_dense(self):
+        """Dense flow tensor
+        :return: <np.ndarray> with shape (periods, source, destination)"""
+        n_periods, n_groups, _ = self.shape
+        index = (self.period * n_groups + self.source) * n_groups + self.destination
+        dense = np.zeros(n_periods * n_groups * n_groups, dtype=self.amount.dtype)
+        dense[index] = self.amount
+        return dense.reshape(self.shape)
+
+    def to_sparse(self, period=None):
+        """Sparse flow matrix of one period (requires scipy)
+        :param period: <string> or <pd.Timestamp> label of period. None for
+                flows summed over all periods
+        :return: <scipy.sparse.csr_matrix> with shape (source, destination)"""
+        from scipy import sparse
+
+        mask = self._period_mask(period)
+        _, n_groups, _ = self.shape
+        return sparse.csr_matrix(
+            (self.amount[mask], (self.source[mask], self.destination[mask])),
+            shape=(n_groups, n_groups),
+        )
+
+    def matrix(self, period=None):
+        """Labeled flow matrix of one period
+        :param period: <string> or <pd.Timestamp> label of period. None for
+                flows summed over all periods
+        :return: <pd.DataFrame> with sources as index and destinations as
+                columns"""
+        mask = self._period_mask(period)
+        _, n_groups, _ = self.shape
+        index = self.source[mask] * n_groups + self.destination[mask]
+        dense = np.bincount(index, weights=self.amount[mask], minlength=n_groups**2)
+        return pd.DataFrame(
+            dense.reshape(n_groups, n_groups).astype(self.amount.dtype),
+            index=self.groups.rename("source"),
+            columns=self.groups.rename("destination"),
+        )
+
+    def to_frame(self):
+        """Non-zero flows in long format
+        :return: <pd.DataFrame> with period, source, destination, and amount"""
+        return pd.DataFrame(
+            {
+                "period": self.periods.take(self.period),
+                "source": self.groups.take(self.source),
+                "destination": self.groups.take(self.destination),
+                "amount": self.amount,
+            }
+        )
+
+    def _period_mask(self, period):
+        if period is None:
+            return slice(None)
+        return self.period == self.periods.get_loc(pd.Timestamp(period))
+
+
+def compute_flow_matrix(df, groups=None, freq=None, dropna=True):
+    """Accumulate transferred amounts between groups of accounts
+    :param df: <pd.DataFrame> with transaction data including amount,
+            transferring and acquiring account ids, and date if freq is given
+    :param groups: <pd.Series> mapping account ids (index) to groups.
+            None for flows between accounts
+    :param freq: <string> frequency of periods (see utils.FREQUENCIES).
+            Transactions without date are dropped. None for flows over the
+            whole time span
+    :param dropna: <boolean> False to keep flows from and to accounts without
+            group (e.g. issuance) in a group labeled NaN
+    :return: <FlowMatrix>"""
+    if freq is not None:
+        # missing dates have no period
+        df = df[df["date"].notna()]
+    if groups is None:
+        ids = pd.concat([df[key] for key in ACCOUNT_KEYS.values()]).dropna()
+        groups = pd.Series(ids.unique(), index=ids.unique())
+    codes, labels = pd.factorize(groups, sort=True)
+    index = pd.Index(groups.index)
+    # group code of both sides, missing groups get the code after all groups
+    sides = []
+    for key in ACCOUNT_KEYS.values():
+        pos = index.get_indexer(df[key])
+        side = np.where(pos >= 0, codes[pos], -1)
+        sides.append(np.where(side >= 0, side, len(labels)))
+    n_groups = len(labels) + 1
+    if freq is not None:
+        period, end = get_frequency(freq)
+        ordinals = pd.DatetimeIndex(df["date"]).to_period(period).asi8
+        first = ordinals.min() if len(ordinals) else 0
+        periods = pd.PeriodIndex.from_ordinals(
+            np.arange(first, ordinals.max() + 1 if len(ordinals) else 0), freq=period
+        )
+        periods = period_labels(periods, end)
+        period_codes = ordinals - first
+    else:
+        periods = pd.DatetimeIndex([pd.NaT])
+        period_codes = np.zeros(len(df), dtype="int64")
+
+    # accumulate amounts of all flows with the same coordinates
+    amount = df["amount"].to_numpy(dtype="float64", na_value=0)
+    flat = (period_codes * n_groups + sides[0]) * n_groups + sides[1]
+    flat, inverse = np.unique(flat, return_inverse=True)
+    totals = np.bincount(inverse, weights=amount, minlength=len(flat))
+    if (amount == np.round(amount)).all():
+        totals = totals.astype("int64")
+    source, destination = (flat // n_groups) % n_groups, flat % n_groups
+    keep = totals != 0
+    if dropna:
+        keep &= (source < len(labels)) & (destination < len(labels))
+        groups_index = pd.Index(labels)
+    else:
+        groups_index = pd.Index(labels).append(pd.Index([np.nan]))
+    return FlowMatrix(
+        periods=periods,
+        groups=groups_index,
+        period=(flat // n_groups**2)[keep],
+        source=source[keep],
+        destination=destination[keep],
+        amount=totals[keep],
+    )
+
+
+def get_flow_matrix(
+    fn_zip, by="registry", freq=None, filters=None, df_account=None, dropna=True
+):
+    """Load flows of allowances between groups of accounts
+    :param fn_zip: <string> name of zip file with data or <EUTLArchive>
+    :param by: <string> grouping of accounts (see GROUPINGS), e.g., "registry"
+            or "accountCategory"
+    :param freq: <string> frequency of periods, e.g., "ME" for monthly
+            matrices. None for flows over the whole time span
+    :param filters: <list: tuple> of predicates (column, operator, value) on
+            transactions, e.g., [("unitType_id", "==", "EUA")]
+    :param df_account: <pd.DataFrame> with account information used for
+            grouping. None to load accounts from the archive
+    :param dropna: <boolean> False to keep flows from and to accounts without
+            group (see compute_flow_matrix)
+    :return: <FlowMatrix>"""
+    if by not in GROUPINGS:
+        raise ValueError(f"Unknown grouping: {by}, use one of {list(GROUPINGS)}")
+    columns = ["amount"] + list(ACCOUNT_KEYS.values())
+    if freq is not None:
+        columns.append("date")
+    df = get_transactions(
+        fn_zip, columns=columns, filters=filters, compact=True, date_resolution="s"
+    )
+    groups = None
+    if by != "account":
+        col = GROUPINGS[by]
+        if df_account is None:
+            df_account = get_accounts(fn_zip, columns=["id", col], compact=True)
+        groups = df_account.set_index("id")[col]
+    return compute_flow_matrix(df, groups=groups, freq=freq, dropna=dropna)
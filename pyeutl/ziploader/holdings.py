@@ -0,0 +1,204 @@
+"""Account holdings computed from the full transaction table.
+
+Every transaction is turned into two signed flows, a negative one for the
+transferring and a positive one for the acquiring account. Flows are sorted by
+account (and unit type) and time, and holdings are the segmented cumulative sum
+of the flows, computed for all accounts in one vectorized pass:
+
+    df = get_holdings(fn_zip, freq="ME", by_unit_type=True)
+    df = get_holdings(fn_zip, freq="YE", level="installation", fill=True)
+
+Holdings rolled up to installations or account holders are computed from the
+flows of all their accounts, so transfers between accounts of the same
+installation or holder cancel out.
+"""
+
+import numpy as np
+import pandas as pd
+from .joins import ACCOUNT_KEYS
+from .utils import FREQUENCIES, get_frequency, period_labels
+from .ziploader import get_transactions, get_accounts
+
+# account column identifying the accounts of a rollup level
+LEVELS = {
+    "account": None,
+    "installation": "installation_id",
+    "accountHolder": "accountHolder_id",
+}
+
+
+def get_flows(df, by_unit_type=False):
+    """Signed flows of accounts. Flows of transactions without account are
+    dropped.
+    :param df: <pd.DataFrame> with transaction data including date, amount,
+            and transferring and acquiring account ids
+    :param by_unit_type: <boolean> True to keep the unit type of flows
+    :return: <pd.DataFrame> with account_id, date, unitType_id, and flow"""
+    amount = df["amount"].to_numpy(dtype="float64", na_value=0)
+    if (amount == np.round(amount)).all():
+        amount = amount.astype("int64")
+    flows = {
+        "account_id": np.concatenate(
+            [
+                df[key].to_numpy(dtype="float64", na_value=np.nan)
+                for key in ACCOUNT_KEYS.values()
+            ]
+        ),
+        "date": np.concatenate([df["date"].to_numpy()] * 2),
+    }
+    if by_unit_type:
+        flows["unitType_id"] = pd.concat([df["unitType_id"]] * 2).to_numpy()
+    flows["flow"] = np.concatenate([-amount, amount])
+    flows = pd.DataFrame(flows)
+    flows = flows[flows.account_id.notna()].reset_index(drop=True)
+    flows["account_id"] = flows.account_id.astype("int64")
+    return flows
+
+
+def _segmented_cumsum(values, is_start):
+    """Cumulative sum restarting at every segment start
+    :param values: <np.ndarray> values sorted by segment
+    :param is_start: <np.ndarray: bool> True for first value of segments
+    :return: <np.ndarray>"""
+    cs = np.cumsum(values)
+    starts = np.flatnonzero(is_start)
+    offsets = cs[starts] - values[starts]
+    return cs - np.repeat(offsets, np.diff(np.append(starts, len(values))))
+
+
+def _changes(*arrays):
+    """True where any of the sorted arrays changes its value"""
+    is_new = np.zeros(len(arrays[0]), dtype=bool)
+    is_new[:1] = True
+    for a in arrays:
+        is_new[1:] |= a[1:] != a[:-1]
+    return is_new
+
+
+def _fill_periods(segments, periods, flows, balances):
+    """Expand holdings to all periods from the first flow of each segment to
+    the last period with flows. Balances are carried forward.
+    :return: <tuple: np.ndarray> with segment, period, flow and balance"""
+    first = np.flatnonzero(_changes(segments))
+    start, end = periods[first], periods.max()
+    counts = end - start + 1
+    grid_segment = np.repeat(segments[first], counts)
+    grid_period = np.repeat(start, counts) + (
+        np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    )
+    # position of the last flow at or before each period of the segment
+    span = end - periods.min() + 1
+    combined = segments * span + periods
+    grid_combined = grid_segment * span + grid_period
+    pos = np.searchsorted(combined, grid_combined, side="right") - 1
+    grid_flows = np.where(combined[pos] == grid_combined, flows[pos], 0)
+    return grid_segment, grid_period, grid_flows, balances[pos]
+
+
+def compute_holdings(
+    df, freq=None, by_unit_type=False, groups=None, name="account_id", fill=False
+):
+    """Compute holdings of accounts from transactions by a segmented cumulative
+    sum of the signed flows. Transfers without date are not accounted for.
+    :param df: <pd.DataFrame> with transaction data including date, amount,
+            transferring and acquiring account ids, and unitType_id if
+            by_unit_type
+    :param freq: <string> frequency of holdings (see FREQUENCIES). Balances
+            are given at the end of each period. None for holdings after every
+            point in time with transfers
+    :param by_unit_type: <boolean> True for holdings per unit type
+    :param groups: <pd.Series> mapping account ids (index) to the group they
+            are rolled up to, e.g., installation ids. None for accounts
+    :param name: <string> name of the account or group column
+    :param fill: <boolean> True to give holdings for all periods from the first
+            transfer of an account until the last period. Requires freq
+    :return: <pd.DataFrame> with account (or group), unitType_id if
+            by_unit_type, date, flow, and balance"""
+    if fill and freq is None:
+        raise ValueError("Filling periods requires a frequency")
+    flows = get_flows(df, by_unit_type=by_unit_type)
+    # missing dates have no period and would sort before all others
+    flows = flows[flows.date.notna()]
+    keys = flows.account_id
+    if groups is not None:
+        groups = groups[groups.notna()]
+        pos = pd.Index(groups.index).get_indexer(keys)
+        flows, keys = flows[pos >= 0], groups.iloc[pos[pos >= 0]]
+    key_codes, key_values = pd.factorize(keys, sort=True)
+    if by_unit_type:
+        unit_codes, unit_values = pd.factorize(flows.unitType_id, sort=True)
+    else:
+        unit_codes = np.zeros(len(flows), dtype="int64")
+    dates = pd.DatetimeIndex(flows.date)
+    if freq is not None:
+        period, end = get_frequency(freq)
+        times = dates.to_period(period).asi8
+    else:
+        times = dates.asi8
+
+    # sort flows by account, unit type, and time and add up simultaneous flows
+    order = np.lexsort((times, unit_codes, key_codes))
+    k, u, t = key_codes[order], unit_codes[order], times[order]
+    starts = np.flatnonzero(_changes(k, u, t))
+    k, u, t = k[starts], u[starts], t[starts]
+    flow = np.add.reduceat(flows.flow.to_numpy()[order], starts) if len(starts) else []
+    flow = np.asarray(flow, dtype=flows.flow.dtype)
+    balance = _segmented_cumsum(flow, _changes(k, u))
+    if fill and len(flow):
+        # unit codes are shifted as missing unit types have code -1
+        n_units = u.max() + 2
+        segments = k * n_units + u + 1
+        segments, t, flow, balance = _fill_periods(segments, t, flow, balance)
+        k, u = segments // n_units, segments % n_units - 1
+
+    if freq is not None:
+        index = pd.PeriodIndex.from_ordinals(t, freq=period)
+        dates = period_labels(index, end)
+    else:
+        dates = pd.DatetimeIndex(t.astype(flows.date.dtype))
+    res = {name: key_values.take(k)}
+    if by_unit_type:
+        res["unitType_id"] = pd.Categorical.from_codes(u, categories=unit_values)
+    res.update(date=dates, flow=flow, balance=balance)
+    return pd.DataFrame(res)
+
+
+def get_holdings(
+    fn_zip,
+    freq=None,
+    by_unit_type=False,
+    level="account",
+    fill=False,
+    filters=None,
+    df_account=None,
+):
+    """Load holdings of all accounts, installations or account holders
+    :param fn_zip: <string> name of zip file with data or <EUTLArchive>
+    :param freq: <string> frequency of holdings (see compute_holdings)
+    :param by_unit_type: <boolean> True for holdings per unit type
+    :param level: <string> "account", "installation", or "accountHolder"
+    :param fill: <boolean> True to give holdings for all periods, see
+            compute_holdings
+    :param filters: <list: tuple> of predicates (column, operator, value) on
+            transactions, e.g., to exclude units of the trial period
+            [("unitType_id", "!=", "EUA2005")]
+    :param df_account: <pd.DataFrame> with account information used for
+            rollups. None to load accounts from the archive
+    :return: <pd.DataFrame>"""
+    if level not in LEVELS:
+        raise ValueError(f"Unknown level: {level}, use one of {list(LEVELS)}")
+    columns = ["date", "amount"] + list(ACCOUNT_KEYS.values())
+    if by_unit_type:
+        columns.append("unitType_id")
+    df = get_transactions(
+        fn_zip, columns=columns, filters=filters, compact=True, date_resolution="s"
+    )
+    groups, name = None, "account_id"
+    if LEVELS[level] is not None:
+        name = LEVELS[level]
+        if df_account is None:
+            df_account = get_accounts(fn_zip, columns=["id", name], compact=True)
+        groups = df_account.set_index("id")[name]
+    return compute_holdings(
+        df, freq=freq, by_unit_type=by_unit_type, groups=groups, name=name, fill=fill
+    )
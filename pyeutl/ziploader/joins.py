@@ -0,0 +1,131 @@
+import pandas as pd
+from pandas.api.extensions import take
+
+# columns with account ids in transaction data
+ACCOUNT_KEYS = {
+    "transferring": "transferringAccount_id",
+    "acquiring": "acquiringAccount_id",
+}
+
+
+def _account_columns(df_account, prefix_account):
+    """Names of account columns in transaction data
+    :param df_account: <pd.DataFrame> with account information
+    :param prefix_account: <dict> with prefix for account columns for
+                transferring and acquiring accounts
+    :return: <dict: column in transactions -> (side, column in accounts)>"""
+    return {
+        prefix_account[side] + c[0].capitalize() + c[1:]: (side, c)
+        for side in ACCOUNT_KEYS
+        for c in df_account.columns
+        if c != "id"
+    }
+
+
+def join_accounts(df, df_account, prefix_account):
+    """Add account information for transferring and acquiring accounts to
+    transaction data. Accounts are indexed by their id once and the account
+    columns are gathered by position for both sides, so the account table is
+    neither renamed nor copied. Result equals a left merge on the account ids.
+    :param df: <pd.DataFrame> with transaction data
+    :param df_account: <pd.DataFrame> with account information
+    :param prefix_account: <dict> with prefix for account columns for
+                transferring and acquiring accounts
+    :return: <pd.DataFrame>"""
+    index = pd.Index(df_account["id"])
+    positions = {side: index.get_indexer(df[key]) for side, key in ACCOUNT_KEYS.items()}
+    new_cols = {
+        col: take(df_account[c].array, positions[side], allow_fill=True)
+        for col, (side, c) in _account_columns(df_account, prefix_account).items()
+    }
+    return pd.concat([df, pd.DataFrame(new_cols, index=df.index)], axis=1)
+
+
+def can_join_accounts(df, df_account, prefix_account):
+    """Check whether accounts can be joined by position, i.e., account ids are
+    unique and account columns do not collide with transaction columns
+    :param df: <pd.DataFrame> with transaction data
+    :param df_account: <pd.DataFrame> with account information
+    :param prefix_account: <dict> with prefix for account columns
+    :return: <boolean>"""
+    if not df_account["id"].is_unique:
+        return False
+    cols = _account_columns(df_account, prefix_account)
+    return not any(c in df.columns for c in cols)
+
+
+class LazyAccountFrame:
+    """Transaction data with account information resolved on access. Account
+    columns are gathered from the account table only when they are accessed,
+    all other attributes are passed to the transaction data frame, e.g.:
+
+        df = get_transactions(fn_zip, df_account=df_acc, lazy_accounts=True)
+        df["acquiringRegistry"]  # looked up now
+        df.to_frame(["date", "amount", "acquiringRegistry"])
+    """
+
+    def __init__(self, frame, df_account, prefix_account):
+        """
+        :param frame: <pd.DataFrame> with transaction data
+        :param df_account: <pd.DataFrame> with account information
+        :param prefix_account: <dict> with prefix for account columns for
+                transferring and acquiring accounts
+        """
+        self.frame = frame
+        self.df_account = df_account
+        self.account_columns = _account_columns(df_account, prefix_account)
+        self._index = None
+        self._positions = {}
+
+    def __repr__(self):
+        return (
+            f"<LazyAccountFrame rows={len(self.frame)} "
+            f"columns={len(self.frame.columns)}+{len(self.account_columns)} lazy>"
+        )
+
+    def __len__(self):
+        return len(self.frame)
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            if key in self.account_columns:
+                return self._resolve(key)
+            return self.frame[key]
+        return self.to_frame(key)
+
+    def __getattr__(self, name):
+        if name.startswith("_") or name in ["frame", "df_account", "account_columns"]:
+            raise AttributeError(name)
+        if name in self.account_columns:
+            return self._resolve(name)
+        return getattr(self.frame, name)
+
+    @property
+    def columns(self):
+        """Columns of transaction data followed by lazy account columns"""
+        return list(self.frame.columns) + list(self.account_columns)
+
+    def _get_positions(self, side):
+        """Positions of the accounts of one side in the account table"""
+        if side not in self._positions:
+            if self._index is None:
+                self._index = pd.Index(self.df_account["id"])
+            self._positions[side] = self._index.get_indexer(
+                self.frame[ACCOUNT_KEYS[side]]
+            )
+        return self._positions[side]
+
+    def _resolve(self, col):
+        """Gather account column for all transactions"""
+        side, c = self.account_columns[col]
+        values = take(
+            self.df_account[c].array, self._get_positions(side), allow_fill=True
+        )
+        return pd.Series(values, index=self.frame.index, name=col)
+
+    def to_frame(self, columns=None):
+        """Materialize data frame
+        :param columns: <list: string> with columns. None for all columns
+        :return: <pd.DataFrame>"""
+        columns = self.columns if columns is None else columns
+        return pd.DataFrame({c: self[c] for c in columns}, index=self.frame.index)
@@ -0,0 +1,499 @@
+"""Lazy query plans of the ziploader based on Polars.
+
+The scan functions mirror the get_* functions of the ziploader but return a
+Polars LazyFrame. Reading, label mapping, drops, merges and resampling are
+nodes of one query plan, which Polars optimizes as a whole (e.g., projections
+and filters are pushed into the scan of the csv files) and executes in
+parallel when the plan is collected:
+
+    df_inst = scan_installations(fn_zip)
+    df_acc = scan_accounts(fn_zip, df_installation=df_inst)
+    df = scan_transactions(fn_zip, freq="YE", df_account=df_acc)
+    df.select(["date", "acquiringRegistry", "amount"]).collect()
+
+The get_* functions return the same plans for lazy=True. Members are extracted
+from the archive, so that Polars can scan them. If a persistent cache
+directory is set (see set_cache_dir), members are converted once to parquet
+files in the cache. Otherwise they are extracted to a temporary directory that
+is removed at exit.
+
+Polars is an optional dependency (pip install polars).
+"""
+
+import os
+import atexit
+import shutil
+import tempfile
+from contextlib import ExitStack
+from zipfile import ZipFile
+from .archive import EUTLArchive
+from .cache import get_cache_dir, get_archive_hash, extract_member
+from .schemas import NA_VALUES, get_schema, STRING, CATEGORY, DATETIME, BOOLEAN, FLOAT
+from .utils import get_mapper, get_frequency
+from .joins import ACCOUNT_KEYS
+from .ziploader import _get_usecols
+from ..categories import CategoryLookup
+from .category_mappings import (
+    lookup_activity_category,
+    lookup_account_category,
+    lookup_nace_category,
+)
+
+# truncation of pandas frequencies and whether labels are period ends
+FREQUENCIES = {
+    "D": ("1d", False),
+    "MS": ("1mo", False),
+    "ME": ("1mo", True),
+    "M": ("1mo", True),
+    "QS": ("1q", False),
+    "QE": ("1q", True),
+    "Q": ("1q", True),
+    "YS": ("1y", False),
+    "AS": ("1y", False),
+    "YE": ("1y", True),
+    "Y": ("1y", True),
+    "A": ("1y", True),
+}
+
+_tmp_dir = None
+
+
+def _import_polars():
+    try:
+        import polars
+    except ImportError as e:
+        raise ImportError(
+            "Lazy loading requires polars. Install it with: pip install polars"
+        ) from e
+    return polars
+
+
+def _get_tmp_dir():
+    """Temporary directory for extracted members removed at exit"""
+    global _tmp_dir
+    if _tmp_dir is None:
+        _tmp_dir = tempfile.mkdtemp(prefix="pyeutl_")
+        atexit.register(shutil.rmtree, _tmp_dir, ignore_errors=True)
+    return _tmp_dir
+
+
+def _cast(pl, col, marker):
+    """Expression converting a column read as text to a schema marker"""
+    c = pl.col(col)
+    if marker == DATETIME:
+        return c.str.to_datetime(strict=False)
+    if marker == BOOLEAN:
+        return c.str.to_lowercase().replace_strict(
+            {"true": True, "false": False}, default=None, return_dtype=pl.Boolean
+        )
+    if marker == CATEGORY:
+        return c.cast(pl.Categorical)
+    if marker == FLOAT:
+        return c.cast(pl.Float64, strict=False)
+    if marker == STRING:
+        return c
+    # integer columns may be written as floats (e.g. "1.0")
+    dtype = getattr(pl, marker.capitalize())
+    return c.cast(pl.Float64, strict=False).cast(dtype, strict=False)
+
+
+def _scan_source(pl, open_file, fn_file, directory):
+    """Scan extracted csv member with column types of the compact schema"""
+    path = extract_member(open_file, fn_file, directory)
+    schema = get_schema(fn_file)
+    # missing values as read by pandas
+    lf = pl.scan_csv(
+        path,
+        schema_overrides={c: pl.String for c in schema},
+        null_values=NA_VALUES,
+    )
+    columns = lf.collect_schema().names()
+    return lf.with_columns([_cast(pl, c, m) for c, m in schema.items() if c in columns])
+
+
+def _scan_member(fn_zip, fn_file, usecols, filters=None, prepare=None):
+    """Scan member of the archive
+    :param fn_zip: <string> name of zip file with data or <EUTLArchive>
+    :param fn_file: <string> name of file in zip file
+    :param usecols: <list: string> columns to select
+    :param filters: <list: tuple> of predicates (column, operator, value).
+            Columns in filters are scanned in addition to usecols
+    :param prepare: <callable> applied to the lazy frame before filtering
+    :return: <pl.LazyFrame>"""
+    pl = _import_polars()
+    with ExitStack() as stack:
+        if isinstance(fn_zip, EUTLArchive):
+            open_file, hash_zip = fn_zip.open, fn_zip.hash
+            cache_dir = fn_zip.cache_dir or get_cache_dir()
+        else:
+            # the archive is only read while members are extracted
+            open_file = stack.enter_context(ZipFile(fn_zip)).open
+            hash_zip = get_archive_hash(fn_zip)
+            cache_dir = get_cache_dir()
+        if cache_dir is None:
+            lf = _scan_source(
+                pl, open_file, fn_file, os.path.join(_get_tmp_dir(), hash_zip)
+            )
+        else:
+            directory = os.path.join(cache_dir, hash_zip, "polars")
+            fn_parquet = os.path.join(
+                directory, os.path.splitext(fn_file)[0] + ".parquet"
+            )
+            if not os.path.exists(fn_parquet):
+                lf = _scan_source(pl, open_file, fn_file, directory)
+                fn_tmp = f"{fn_parquet}.{os.getpid()}.tmp"
+                lf.sink_parquet(fn_tmp)
+                os.replace(fn_tmp, fn_parquet)
+                os.remove(os.path.join(directory, os.path.basename(fn_file)))
+            lf = pl.scan_parquet(fn_parquet)
+    filters = filters or []
+    cols_filter = {f[0] for f in filters}
+    readcols = [
+        c for c in lf.collect_schema().names() if c in usecols or c in cols_filter
+    ]
+    lf = lf.select(readcols)
+    if prepare is not None:
+        lf = prepare(lf)
+    if filters:
+        lf = _filter(lf, filters).select(usecols)
+    return lf
+
+
+def _prepare_transactions(lf):
+    """Parse transaction dates cutting off milli-seconds"""
+    pl = _import_polars()
+    if "date" not in lf.collect_schema().names():
+        return lf
+    return lf.with_columns(
+        pl.col("date").str.to_datetime(strict=False).dt.truncate("1s")
+    )
+
+
+def _filter(lf, filters):
+    """Apply predicates (column, operator, value) to a lazy frame, see
+    filter_frame"""
+    pl = _import_polars()
+    schema = lf.collect_schema()
+    for col, op, value in filters or []:
+        c = pl.col(col)
+        is_datetime = isinstance(schema[col], pl.Datetime)
+
+        def convert(v):
+            # dates are given as strings or timestamps
+            if is_datetime:
+                return pl.lit(str(v)).str.to_datetime()
+            return pl.lit(v)
+
+        if op in ["==", "="]:
+            expr = c == convert(value)
+        elif op == "!=":
+            expr = c != convert(value)
+        elif op == "<":
+            expr = c < convert(value)
+        elif op == "<=":
+            expr = c <= convert(value)
+        elif op == ">":
+            expr = c > convert(value)
+        elif op == ">=":
+            expr = c >= convert(value)
+        elif op in ["in", "not in"]:
+            values = pl.Series(list(value), dtype=schema[col], strict=False)
+            expr = c.is_in(values.implode())
+            expr = ~expr if op == "not in" else expr
+        elif op == "between":
+            expr = c.is_between(convert(value[0]), convert(value[1]))
+        else:
+            raise ValueError(f"Unknown filter operator: {op}")
+        lf = lf.filter(expr)
+    return lf
+
+
+def _map_label(lf, mapper, col, col_mapped):
+    """Add label column if the column it is derived from exists, see
+    map_if_exists"""
+    pl = _import_polars()
+    schema = lf.collect_schema()
+    if col not in schema.names():
+        return lf
+    is_categorical = isinstance(schema[col], pl.Categorical)
+    # categories are text
+    expr = pl.col(col).cast(pl.String) if is_categorical else pl.col(col)
+    if isinstance(mapper, CategoryLookup):
+        # distinct codes of each batch are resolved by the compiled lookup
+        def label(s):
+            mapping = mapper.to_dict(s.drop_nulls().unique().to_list())
+            return s.replace_strict(
+                list(mapping),
+                list(mapping.values()),
+                default=None,
+                return_dtype=pl.String,
+            )
+
+        return lf.with_columns(
+            expr.map_batches(label, return_dtype=pl.String).alias(col_mapped)
+        )
+    keys = [str(k) for k in mapper] if is_categorical else list(mapper)
+    label = expr.replace_strict(
+        keys, list(mapper.values()), default=None, return_dtype=pl.String
+    )
+    return lf.with_columns(label.alias(col_mapped))
+
+
+def _as_lazy(df):
+    """Convert data frame to lazy frame"""
+    pl = _import_polars()
+    if isinstance(df, pl.LazyFrame):
+        return df
+    if isinstance(df, pl.DataFrame):
+        return df.lazy()
+    return pl.from_pandas(df).lazy()
+
+
+def _merge_details(lf, df_details, key, prefix):
+    """Left join details renaming conflicting columns, see
+    _merge_account_details"""
+    df_details = _as_lazy(df_details)
+    columns = lf.collect_schema().names()
+    df_details = df_details.rename(
+        {
+            c: prefix + c.capitalize()
+            for c in df_details.collect_schema().names()
+            if c in columns and c != "id"
+        }
+    )
+    return lf.join(df_details, left_on=key, right_on="id", how="left")
+
+
+def scan_installations(
+    fn_zip,
+    drop=[
+        "latitudeEutl",
+        "longitudeEutl",
+        "nace15_id",
+        "nace20_id",
+        "created_on",
+        "updated_on",
+    ],
+    columns=None,
+    filters=None,
+):
+    """Lazy plan of installation data with labels, see get_installations
+    :param fn_zip: <string> name of zip file with data or <EUTLArchive>
+    :param drop: <list: string> with column names to drop
+    :param columns: <list: string> with column names to read. Label columns
+              select the column they are derived from. None for all columns
+    :param filters: <list: tuple> of predicates (column, operator, value)
+    :return: <pl.LazyFrame>"""
+    usecols = _get_usecols(
+        fn_zip, "installation.csv", drop=drop, columns=columns, keys=["id"]
+    )
+    lf = _scan_member(fn_zip, "installation.csv", usecols, filters=filters)
+    mapper = get_mapper(fn_zip, "activity_type.csv")
+    lf = _map_label(lf, mapper, "activity_id", "activity")
+    lf = _map_label(lf, lookup_activity_category, "activity_id", "activityCategory")
+    mapper = get_mapper(fn_zip, "country_code.csv")
+    lf = _map_label(lf, mapper, "registry_id", "registry")
+    lf = _map_label(lf, mapper, "country_id", "country")
+    # nace codes are numbers in the installation data
+    mapper = CategoryLookup.nace(
+        get_mapper(fn_zip, "nace_code.csv"), hierarchical=False
+    )
+    lf = _map_label(lf, mapper, "nace_id", "nace")
+    return _map_label(lf, lookup_nace_category, "nace_id", "naceCategory")
+
+
+def scan_compliance(
+    fn_zip,
+    df_installation=None,
+    create_id=True,
+    drop=[
+        "surrenderedCummulative",
+        "created_on",
+        "updated_on",
+    ],
+    columns=None,
+    filters=None,
+):
+    """Lazy plan of compliance data with labels and installation information,
+    see get_compliance
+    :param fn_zip: <string> name of zip file with data or <EUTLArchive>
+    :param df_installation: <pl.LazyFrame> or <pd.DataFrame> with installation
+              information to be included
+    :param create_id: <boolean> True to create a column with a unique id
+              combining installation id and year of compliance
+    :param drop: <list: string> with column names to drop
+    :param columns: <list: string> with column names to read
+    :param filters: <list: tuple> of predicates (column, operator, value)
+    :return: <pl.LazyFrame>"""
+    pl = _import_polars()
+    keys = ["installation_id", "year"] if create_id else []
+    if df_installation is not None:
+        keys.append("installation_id")
+    usecols = _get_usecols(
+        fn_zip, "compliance.csv", drop=drop, columns=columns, keys=keys
+    )
+    lf = _scan_member(fn_zip, "compliance.csv", usecols, filters=filters)
+    mapper = get_mapper(fn_zip, "compliance_code.csv")
+    lf = _map_label(lf, mapper, "compliance_id", "complianceCode")
+    if create_id:
+        lf = lf.select(
+            pl.concat_str(
+                [pl.col("installation_id"), pl.col("year").cast(pl.String)],
+                separator="_",
+            ).alias("id"),
+            pl.all(),
+        )
+    if df_installation is not None:
+        lf = lf.join(
+            _as_lazy(df_installation).rename({"id": "installation_id"}),
+            on="installation_id",
+            how="left",
+        )
+    return lf
+
+
+def scan_accounts(
+    fn_zip,
+    drop=["created_on", "updated_on"],
+    df_installation=None,
+    prefix_installation="installation",
+    df_accountHolder=None,
+    prefix_accountHolder="accountHolder",
+    columns=None,
+    filters=None,
+):
+    """Lazy plan of account data with labels, see get_accounts
+    :param fn_zip: <string> name of zip file with data or <EUTLArchive>
+    :param drop: <list: string> with column names to drop
+    :param df_installation: <pl.LazyFrame> or <pd.DataFrame> with
+                  installation information to be included
+    :param prefix_installation: <string> prefix for conflicting installation
+                  columns
+    :param df_accountHolder: <pl.LazyFrame> or <pd.DataFrame> with account
+                  holder information to be included
+    :param prefix_accountHolder: <string> prefix for conflicting account
+                  holder columns
+    :param columns: <list: string> with column names to read
+    :param filters: <list: tuple> of predicates (column, operator, value)
+    :return: <pl.LazyFrame>"""
+    keys = ["id"]
+    if df_installation is not None:
+        keys.append("installation_id")
+    if df_accountHolder is not None:
+        keys.append("accountHolder_id")
+    usecols = _get_usecols(fn_zip, "account.csv", drop=drop, columns=columns, keys=keys)
+    lf = _scan_member(fn_zip, "account.csv", usecols, filters=filters)
+    mapper = get_mapper(fn_zip, "country_code.csv")
+    lf = _map_label(lf, mapper, "registry_id", "registry")
+    mapper = get_mapper(fn_zip, "account_type.csv")
+    lf = _map_label(lf, mapper, "accountType_id", "accountType")
+    lf = _map_label(lf, lookup_account_category, "accountType_id", "accountCategory")
+    if df_installation is not None:
+        lf = _merge_details(lf, df_installation, "installation_id", prefix_installation)
+    if df_accountHolder is not None:
+        lf = _merge_details(
+            lf, df_accountHolder, "accountHolder_id", prefix_accountHolder
+        )
+    return lf
+
+
+def scan_account_holders(
+    fn_zip,
+    drop=[
+        "created_on",
+        "updated_on",
+        "telephone1",
+        "telephone2",
+        "eMail",
+        "addressSecondary",
+    ],
+    columns=None,
+    filters=None,
+):
+    """Lazy plan of account holder information, see get_account_holders
+    :param fn_zip: <string> name of zip file with data or <EUTLArchive>
+    :param drop: <list: string> with column names to drop
+    :param columns: <list: string> with column names to read
+    :param filters: <list: tuple> of predicates (column, operator, value)
+    :return: <pl.LazyFrame>"""
+    usecols = _get_usecols(
+        fn_zip, "account_holder.csv", drop=drop, columns=columns, keys=["id"]
+    )
+    lf = _scan_member(fn_zip, "account_holder.csv", usecols, filters=filters)
+    mapper = get_mapper(fn_zip, "country_code.csv")
+    return _map_label(lf, mapper, "country_id", "country")
+
+
+def _resample(lf, freq):
+    """Aggregate transferred amounts to given frequency, see
+    _resample_transactions"""
+    pl = _import_polars()
+    every, end = get_frequency(freq, FREQUENCIES)
+    date = pl.col("date").dt.truncate(every)
+    if end:
+        date = date.dt.offset_by(every).dt.offset_by("-1d")
+    groups = [c for c in lf.collect_schema().names() if c not in ["amount", "date"]]
+    return (
+        lf.with_columns(date)
+        .group_by(["date"] + groups)
+        .agg(pl.col("amount").sum())
+        .sort(["date"] + groups, nulls_last=True)
+    )
+
+
+def scan_transactions(
+    fn_zip,
+    drop=[],
+    freq=None,
+    df_account=None,
+    prefix_account={"transferring": "transferring", "acquiring": "acquiring"},
+    columns=None,
+    filters=None,
+):
+    """Lazy plan of transaction data with labels, see get_transactions
+    :param fn_zip: <string> name of zip file with data or <EUTLArchive>
+    :param drop: <list: string> with column names to drop
+    :param freq: <string> frequency for resampling (see FREQUENCIES)
+    :param df_account: <pl.LazyFrame> or <pd.DataFrame> with account
+                information
+    :param prefix_account: <dict> with prefix for account columns for
+                transferring and acquiring accounts
+    :param columns: <list: string> with column names to read
+    :param filters: <list: tuple> of predicates (column, operator, value)
+    :return: <pl.LazyFrame>"""
+    keys = ["date", "amount"] if freq is not None else []
+    if df_account is not None:
+        keys += list(ACCOUNT_KEYS.values())
+    usecols = _get_usecols(
+        fn_zip, "transaction.csv", drop=drop, columns=columns, keys=keys
+    )
+    lf = _scan_member(
+        fn_zip,
+        "transaction.csv",
+        usecols,
+        filters=filters,
+        prepare=_prepare_transactions,
+    )
+    if freq is not None:
+        lf = _resample(lf, freq)
+    for col, col_mapped, fn_file in [
+        ("transactionTypeMain_id", "transactionTypeMain", "transaction_type_main.csv"),
+        (
+            "transactionTypeSupplementary_id",
+            "transactionTypeSupplementary",
+            "transaction_type_supplementary.csv",
+        ),
+        ("unitType_id", "unitType", "unit_type.csv"),
+    ]:
+        lf = _map_label(lf, get_mapper(fn_zip, fn_file), col, col_mapped)
+    if df_account is None:
+        return lf
+    df_account = _as_lazy(df_account)
+    for side, key in ACCOUNT_KEYS.items():
+        rename = {
+            c: prefix_account[side] + c[0].capitalize() + c[1:]
+            for c in df_account.collect_schema().names()
+            if c != "id"
+        }
+        lf = lf.join(df_account.rename(rename), left_on=key, right_on="id", how="left")
+    return lf
@@ -0,0 +1,132 @@
+import os
+import warnings
+from contextvars import copy_context
+from dataclasses import dataclass, fields
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import pandas as pd
+from .archive import EUTLArchive
+from .profiling import is_profiling
+from .ziploader import (
+    get_installations,
+    get_account_holders,
+    get_accounts,
+    get_compliance,
+    get_transactions,
+    _merge_account_details,
+    _merge_compliance_details,
+    _merge_transaction_accounts,
+)
+
+LOADERS = {
+    "installations": get_installations,
+    "account_holders": get_account_holders,
+    "accounts": get_accounts,
+    "compliance": get_compliance,
+    "transactions": get_transactions,
+}
+
+
+@dataclass
+class EUTLTables:
+    """Tables loaded from an EUTL archive. Tables not loaded are None."""
+
+    installations: pd.DataFrame | None = None
+    account_holders: pd.DataFrame | None = None
+    accounts: pd.DataFrame | None = None
+    compliance: pd.DataFrame | None = None
+    transactions: pd.DataFrame | None = None
+
+    def items(self):
+        """Iterate over (name, table) of loaded tables"""
+        for f in fields(self):
+            df = getattr(self, f.name)
+            if df is not None:
+                yield f.name, df
+
+
+def load_all(
+    fn_zip,
+    tables=list(LOADERS),
+    max_workers=None,
+    executor="thread",
+    merge=True,
+    account_columns=None,
+    table_args={},
+    engine=None,
+):
+    """Load tables of an EUTL archive concurrently. Members are parsed and
+    labeled on a pool of workers. Afterwards, installation and account holder
+    information is merged into accounts, installation information into
+    compliance data, and account information into transactions.
+    :param fn_zip: <string> name of zip file with data or <EUTLArchive>
+    :param tables: <list: string> with tables to load out of installations,
+            account_holders, accounts, compliance, and transactions
+    :param max_workers: <int> number of workers. None for one worker per table
+            limited by the number of cpus
+    :param executor: <string> "thread" or "process". Threads share one open
+            archive, processes open the archive on their own and require fn_zip
+            to be a file name. Loaders on threads run in a copy of the context
+            of the caller, so that profile_memory records their stages.
+            Stages run in processes are not recorded
+    :param merge: <boolean> False to return tables without merged information
+    :param account_columns: <list: string> with account columns merged into
+            transactions. None for all columns
+    :param table_args: <dict: table -> dict> with further arguments passed to
+            the loader of the table, e.g. {"transactions": {"freq": "ME"}}
+    :param engine: <string> csv parsing engine used for all tables
+            (see get_engine_args)
+    :return: <EUTLTables>"""
+    unknown = [t for t in tables if t not in LOADERS]
+    if unknown:
+        raise ValueError(f"Unknown tables: {unknown}")
+    if max_workers is None:
+        max_workers = min(len(tables), os.cpu_count() or 1)
+    if executor == "thread":
+        pool = ThreadPoolExecutor(max_workers=max_workers)
+        archive = fn_zip if isinstance(fn_zip, EUTLArchive) else EUTLArchive(fn_zip)
+    elif executor == "process":
+        if is_profiling():
+            warnings.warn("Memory of stages run in worker processes is not recorded")
+        pool = ProcessPoolExecutor(max_workers=max_workers)
+        archive = fn_zip.fn_zip if isinstance(fn_zip, EUTLArchive) else fn_zip
+    else:
+        raise ValueError(f"Unknown executor: {executor}")
+
+    # load independent tables concurrently
+    with pool:
+        futures = {}
+        for t in tables:
+            args = (LOADERS[t], archive)
+            if executor == "thread":
+                # context variables, e.g. of profile_memory, are not inherited
+                args = (copy_context().run,) + args
+            futures[t] = pool.submit(
+                *args, **{"engine": engine, **table_args.get(t, {})}
+            )
+        res = EUTLTables(**{t: f.result() for t, f in futures.items()})
+    if archive is not fn_zip and isinstance(archive, EUTLArchive):
+        archive.close()
+    if not merge:
+        return res
+
+    # merge information in order of dependency
+    if res.accounts is not None:
+        res.accounts = _merge_account_details(
+            res.accounts,
+            df_installation=res.installations,
+            df_accountHolder=res.account_holders,
+        )
+    if res.compliance is not None:
+        res.compliance = _merge_compliance_details(
+            res.compliance, df_installation=res.installations
+        )
+    if res.transactions is not None and res.accounts is not None:
+        df_account = res.accounts
+        if account_columns is not None:
+            df_account = df_account[["id"] + [c for c in account_columns if c != "id"]]
+        res.transactions = _merge_transaction_accounts(
+            res.transactions,
+            df_account,
+            prefix_account={"transferring": "transferring", "acquiring": "acquiring"},
+        )
+    return res
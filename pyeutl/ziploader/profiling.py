@@ -0,0 +1,150 @@
+"""Memory accounting of the stages of the loaders.
+
+Instrumentation is opt-in. Within profile_memory, every stage of the get_*
+functions (reading the csv member, imposing labels, merging related tables,
+resampling) records the peak of allocations traced by tracemalloc and the deep
+memory usage of the frame it produced:
+
+    with profile_memory() as profile:
+        df = get_transactions(fn_zip, df_account=df_account)
+    profile.to_frame()
+
+Records are also emitted as debug log records of the logger of this module.
+Outside profile_memory, stages cost a context variable lookup.
+
+Stages of loaders run on threads of load_all are recorded as well. As
+tracemalloc traces the whole process, peaks and allocations of concurrent
+stages include the allocations of each other. Stages run in worker processes
+are not recorded.
+"""
+
+import logging
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field, asdict
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# profile of the current context, None if profiling is off
+_profile = ContextVar("profile", default=None)
+
+
+@dataclass
+class StageRecord:
+    """Memory used by one stage of a loader
+
+    function: <string> name of the loader, e.g., "get_transactions"
+    stage: <string> name of the stage, e.g., "read" or "labels"
+    peak: <int> peak of traced allocations during the stage in bytes,
+        relative to the traced memory at the start of the stage
+    allocated: <int> change of traced memory by the stage in bytes
+    frame_bytes: <int> deep memory usage of the frame produced in bytes
+    rows: <int> number of rows of the frame produced
+    seconds: <float> duration of the stage
+    """
+
+    function: str
+    stage: str
+    peak: int = 0
+    allocated: int = 0
+    frame_bytes: int = None
+    rows: int = None
+    seconds: float = None
+
+    def record(self, df):
+        """Record size of the frame produced by the stage
+        :param df: <pd.DataFrame>"""
+        if isinstance(df, pd.DataFrame):
+            self.frame_bytes = int(df.memory_usage(deep=True).sum())
+            self.rows = len(df)
+
+
+@dataclass
+class MemoryProfile:
+    """Records of all stages run while profiling
+
+    records: <list: StageRecord> in order of completion
+    """
+
+    records: list = field(default_factory=list)
+    _open: list = field(default_factory=list, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def to_frame(self):
+        """Stage records as table
+        :return: <pd.DataFrame>"""
+        columns = list(StageRecord.__dataclass_fields__)
+        return pd.DataFrame([asdict(r) for r in self.records], columns=columns)
+
+
+class _Noop:
+    """Stage placeholder used if profiling is off"""
+
+    def record(self, df):
+        pass
+
+
+_NOOP = _Noop()
+
+
+def is_profiling():
+    """True within profile_memory"""
+    return _profile.get() is not None
+
+
+@contextmanager
+def profile_memory():
+    """Record memory of loader stages run within the context. Starts
+    tracemalloc if it is not tracing already.
+    :return: <MemoryProfile>"""
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    profile = MemoryProfile()
+    token = _profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _profile.reset(token)
+        if started:
+            tracemalloc.stop()
+
+
+@contextmanager
+def stage(function, name):
+    """Measure a stage of a loader if profiling is on. Frames produced are
+    passed to the record method of the yielded object.
+    :param function: <string> name of the loader
+    :param name: <string> name of the stage
+    :return: <StageRecord> or placeholder"""
+    profile = _profile.get()
+    if profile is None or not tracemalloc.is_tracing():
+        yield _NOOP
+        return
+    rec = StageRecord(function, name)
+    with profile._lock:
+        start, peak = tracemalloc.get_traced_memory()
+        # peaks of enclosing and concurrent stages survive resetting the peak
+        for outer, outer_start in profile._open:
+            outer.peak = max(outer.peak, peak - outer_start)
+        tracemalloc.reset_peak()
+        profile._open.append((rec, start))
+    t0 = time.perf_counter()
+    try:
+        yield rec
+    finally:
+        rec.seconds = time.perf_counter() - t0
+        with profile._lock:
+            # stages of other threads may have been opened in the meantime
+            profile._open = [o for o in profile._open if o[0] is not rec]
+            current, peak = tracemalloc.get_traced_memory()
+            rec.peak = max(rec.peak, peak - start)
+            rec.allocated = current - start
+            for outer, outer_start in profile._open:
+                outer.peak = max(outer.peak, peak - outer_start)
+            profile.records.append(rec)
+        logger.debug("%s %s", function, name, extra={"stage": asdict(rec)})
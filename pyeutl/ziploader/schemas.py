@@ -0,0 +1,233 @@
+"""Compact column types for the members of the EUTL archive.
+
+Schemas declare the dtype of every known column using the markers below.
+Markers are resolved to pandas dtypes when the member is read:
+
+    STRING: Arrow-backed string if pyarrow is installed, else pandas string
+    CATEGORY: categorical for repeated codes
+    DATETIME: parsed to datetime
+    all other markers are passed to pandas as they are (e.g. nullable integers)
+
+Columns not declared are inferred by pandas as usual.
+"""
+
+STRING = "string"
+CATEGORY = "category"
+DATETIME = "datetime"
+BOOLEAN = "boolean"
+FLOAT = "float64"
+INT8 = "Int8"
+INT16 = "Int16"
+INT32 = "Int32"
+INT64 = "Int64"
+
+# strings read as missing values by pandas read_csv by default
+NA_VALUES = [
+    "",
+    "#N/A",
+    "#N/A N/A",
+    "#NA",
+    "-1.#IND",
+    "-1.#QNAN",
+    "-NaN",
+    "-nan",
+    "1.#IND",
+    "1.#QNAN",
+    "<NA>",
+    "N/A",
+    "NA",
+    "NULL",
+    "NaN",
+    "None",
+    "n/a",
+    "nan",
+    "null",
+]
+
+_LOOKUP = {"id": STRING, "description": STRING}
+_TIMESTAMPS = {"created_on": DATETIME, "updated_on": DATETIME}
+
+SCHEMAS = {
+    "installation.csv": {
+        "id": STRING,
+        "name": STRING,
+        "tradingSystem_id": CATEGORY,
+        "registry_id": CATEGORY,
+        "activity_id": INT16,
+        "eprtrID": STRING,
+        "parentCompany": STRING,
+        "subsidiaryCompany": STRING,
+        "permitID": STRING,
+        "designatorICAO": STRING,
+        "monitoringID": STRING,
+        "monitoringExpiry": STRING,
+        "monitoringFirstYear": STRING,
+        "permitDateExpiry": DATETIME,
+        "isAircraftOperator": BOOLEAN,
+        "ec748_2009Code": STRING,
+        "permitDateEntry": DATETIME,
+        "addressMain": STRING,
+        "addressSecondary": STRING,
+        "postalCode": STRING,
+        "city": STRING,
+        "country_id": CATEGORY,
+        "latitudeEutl": FLOAT,
+        "longitudeEutl": FLOAT,
+        "latitudeGoogle": FLOAT,
+        "longitudeGoogle": FLOAT,
+        # nace codes are kept as numbers to match the keys of map_nace_category
+        "nace15_id": FLOAT,
+        "nace20_id": FLOAT,
+        "nace_id": FLOAT,
+        "euEntitlement": INT64,
+        "chEntitlement": INT64,
+        "isMaritimeOperator": BOOLEAN,
+        "shippingCompanyCountry": CATEGORY,
+        "shippingCompanyType": CATEGORY,
+        "shippingCompany": STRING,
+        "imoID": STRING,
+        "region": CATEGORY,
+        **_TIMESTAMPS,
+    },
+    "account.csv": {
+        "id": INT64,
+        "tradingSystem_id": CATEGORY,
+        "accountIDEutl": INT64,
+        "accountIDTransactions": STRING,
+        "accountIDESD": STRING,
+        "yearValid": INT16,
+        "name": STRING,
+        "registry_id": CATEGORY,
+        "accountHolder_id": INT64,
+        "accountType_id": CATEGORY,
+        "isOpen": BOOLEAN,
+        "openingDate": DATETIME,
+        "closingDate": DATETIME,
+        "commitmentPeriod": CATEGORY,
+        "companyRegistrationNumber": STRING,
+        "companyRegistrationNumberType": CATEGORY,
+        "isRegisteredEutl": BOOLEAN,
+        "installation_id": STRING,
+        "bvdId": STRING,
+        **_TIMESTAMPS,
+    },
+    "account_holder.csv": {
+        "id": INT64,
+        "name": STRING,
+        "tradingSystem_id": CATEGORY,
+        "addressMain": STRING,
+        "addressSecondary": STRING,
+        "postalCode": STRING,
+        "city": STRING,
+        "telephone1": STRING,
+        "telephone2": STRING,
+        "eMail": STRING,
+        "legalEntityIdentifier": STRING,
+        "country_id": CATEGORY,
+        **_TIMESTAMPS,
+    },
+    "compliance.csv": {
+        "installation_id": STRING,
+        "year": INT16,
+        "reportedInSystem_id": CATEGORY,
+        "euetsPhase": CATEGORY,
+        "compliance_id": CATEGORY,
+        "allocatedFree": INT64,
+        "allocatedNewEntrance": INT64,
+        "allocatedTotal": INT64,
+        "allocated10c": INT64,
+        "verified": INT64,
+        "verifiedCummulative": INT64,
+        "verifiedUpdated": BOOLEAN,
+        "surrendered": INT64,
+        "surrenderedCummulative": INT64,
+        "balance": INT64,
+        "penalty": INT64,
+        **_TIMESTAMPS,
+    },
+    "surrender.csv": {
+        "id": INT64,
+        "installation_id": STRING,
+        "reportedInSystem_id": CATEGORY,
+        "year": INT16,
+        "unitType_id": CATEGORY,
+        "amount": INT64,
+        "originatingRegistry_id": CATEGORY,
+        "project_id": INT64,
+        **_TIMESTAMPS,
+    },
+    "transaction.csv": {
+        "id": INT64,
+        "transactionID": STRING,
+        "tradingSystem_id": CATEGORY,
+        # dates are parsed by the transaction loader
+        "date": STRING,
+        "acquiringYear": INT16,
+        "transferringYear": INT16,
+        "transactionTypeMain_id": INT16,
+        "transactionTypeSupplementary_id": INT16,
+        "transferringAccount_id": INT64,
+        "acquiringAccount_id": INT64,
+        "unitType_id": CATEGORY,
+        "project_id": INT64,
+        "amount": INT64,
+    },
+    "project.csv": {
+        "id": INT64,
+        "track": INT8,
+        "country_id": CATEGORY,
+        **_TIMESTAMPS,
+    },
+    "country_code.csv": _LOOKUP,
+    "compliance_code.csv": _LOOKUP,
+    "unit_type.csv": _LOOKUP,
+    "account_type.csv": _LOOKUP,
+    "trading_system_code.csv": _LOOKUP,
+    "activity_type.csv": {"id": INT16, "description": STRING},
+    "transaction_type_main.csv": {"id": INT16, "description": STRING},
+    "transaction_type_supplementary.csv": {"id": INT16, "description": STRING},
+    "nace_code.csv": {
+        "id": STRING,
+        "parent_id": STRING,
+        "level": INT8,
+        "description": STRING,
+        "includes": STRING,
+        "includesAlso": STRING,
+        "ruling": STRING,
+        "excludes": STRING,
+        "isic4_id": STRING,
+    },
+}
+
+
+def _string_dtype():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return "string"
+    return "string[pyarrow]"
+
+
+def get_schema(fn_file):
+    """Get declared column types of member of the archive
+    :param fn_file: <string> name of file in zip file
+    :return: <dict: column -> type marker>"""
+    return SCHEMAS.get(fn_file, {})
+
+
+def get_read_csv_args(fn_file, columns=None):
+    """Get arguments for pandas read_csv imposing the compact schema of a member
+    :param fn_file: <string> name of file in zip file
+    :param columns: <list: string> columns present in the file. Only used to
+            restrict the datetime columns parsed by read_csv
+    :return: <dict> with dtype and parse_dates"""
+    dtype, parse_dates = {}, []
+    for col, marker in get_schema(fn_file).items():
+        if marker == DATETIME:
+            if columns is None or col in columns:
+                parse_dates.append(col)
+        elif marker == STRING:
+            dtype[col] = _string_dtype()
+        else:
+            dtype[col] = marker
+    return dict(dtype=dtype, parse_dates=parse_dates)
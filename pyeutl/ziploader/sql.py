@@ -0,0 +1,535 @@
+"""Embedded SQL backend of the ziploader based on DuckDB.
+
+The members of the archive are registered as views in an in-process DuckDB
+database, named after the member without extension (e.g. "transaction",
+"account", "installation"). Members are extracted when a query first uses
+them. Queries are executed streaming, vectorized and on
+all cores, only the final result is returned as data frame:
+
+    with DuckDBArchive("eutl.zip") as db:
+        db.query('''
+            SELECT a.registry_id, sum(t.amount) AS amount
+            FROM "transaction" t JOIN account a ON t.acquiringAccount_id = a.id
+            GROUP BY ALL''')
+        df = db.get_transactions(
+            freq="YE", columns=["date", "unitType", "amount"],
+            filters=[("date", ">=", "2013-01-01")])
+
+Columns are typed according to the compact schemas (see schemas.py). If a
+persistent cache directory is set (see set_cache_dir), members are converted
+once to parquet files in the cache and views read the parquet files.
+Otherwise members are extracted to a temporary directory.
+
+DuckDB is an optional dependency (pip install duckdb).
+"""
+
+import os
+import shutil
+import tempfile
+import pandas as pd
+from .archive import EUTLArchive
+from .cache import get_cache_dir, extract_member
+from .schemas import NA_VALUES, SCHEMAS, STRING, CATEGORY, DATETIME, BOOLEAN, FLOAT
+from .schemas import INT8, INT16, INT32, INT64
+from .utils import get_mapper, get_columns, get_frequency
+from .ziploader import LABEL_SOURCES
+from .joins import ACCOUNT_KEYS
+from ..categories import CategoryLookup
+from .category_mappings import (
+    lookup_activity_category,
+    lookup_account_category,
+    lookup_nace_category,
+)
+
+# sql types of the schema markers
+SQL_TYPES = {
+    STRING: "VARCHAR",
+    CATEGORY: "VARCHAR",
+    DATETIME: "TIMESTAMP",
+    BOOLEAN: "BOOLEAN",
+    FLOAT: "DOUBLE",
+    INT8: "TINYINT",
+    INT16: "SMALLINT",
+    INT32: "INTEGER",
+    INT64: "BIGINT",
+}
+
+# columns converted differently than according to the schemas, e.g.,
+# transaction dates are cut off at seconds like by the transaction loader
+SQL_EXPRESSIONS = {
+    "transaction.csv": {"date": "date_trunc('second', TRY_CAST({col} AS TIMESTAMP))"}
+}
+
+# lookup of labels: member of the archive, mapping dictionary, or compiled
+# lookup of categories resolving the codes present in the member
+LABEL_LOOKUPS = {
+    "installation.csv": {
+        "activity": "activity_type.csv",
+        "activityCategory": lookup_activity_category,
+        "registry": "country_code.csv",
+        "country": "country_code.csv",
+        "nace": "nace_code.csv",
+        "naceCategory": lookup_nace_category,
+    },
+    "compliance.csv": {"complianceCode": "compliance_code.csv"},
+    "account.csv": {
+        "registry": "country_code.csv",
+        "accountType": "account_type.csv",
+        "accountCategory": lookup_account_category,
+    },
+    "account_holder.csv": {"country": "country_code.csv"},
+    "transaction.csv": {
+        "transactionTypeMain": "transaction_type_main.csv",
+        "transactionTypeSupplementary": "transaction_type_supplementary.csv",
+        "unitType": "unit_type.csv",
+    },
+}
+
+# lookups with numeric keys although some keys are not numbers
+NUMERIC_LOOKUPS = ["nace_code.csv"]
+
+# date_trunc part of pandas frequencies and whether labels are period ends
+FREQUENCIES = {
+    "D": ("day", False),
+    "MS": ("month", False),
+    "ME": ("month", True),
+    "M": ("month", True),
+    "QS": ("quarter", False),
+    "QE": ("quarter", True),
+    "Q": ("quarter", True),
+    "YS": ("year", False),
+    "AS": ("year", False),
+    "YE": ("year", True),
+    "Y": ("year", True),
+    "A": ("year", True),
+}
+
+# sql of the filter operators (see FILTER_OPERATORS)
+SQL_OPERATORS = {
+    "==": "=",
+    "=": "=",
+    "!=": "<>",
+    "<": "<",
+    "<=": "<=",
+    ">": ">",
+    ">=": ">=",
+}
+
+
+def _import_duckdb():
+    try:
+        import duckdb
+    except ImportError as e:
+        raise ImportError(
+            "DuckDBArchive requires duckdb. Install it with: pip install duckdb"
+        ) from e
+    return duckdb
+
+
+def _quote(name):
+    """Quote sql identifier"""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _literal(value):
+    """Quote sql string literal"""
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _view_name(fn_file):
+    return os.path.splitext(fn_file)[0]
+
+
+def _where(filters, alias):
+    """Translate filters into a sql condition
+    :param filters: <list: tuple> of predicates (column, operator, value)
+    :param alias: <string> alias of the filtered table
+    :return: <tuple: string, list> with condition and parameters"""
+    conditions, params = [], []
+    for col, op, value in filters or []:
+        col = f"{alias}.{_quote(col)}"
+        if op in SQL_OPERATORS:
+            conditions.append(f"{col} {SQL_OPERATORS[op]} ?")
+            params.append(value)
+        elif op in ["in", "not in"]:
+            value = list(value)
+            placeholders = ", ".join("?" * len(value)) or "NULL"
+            conditions.append(f"{col} {op.upper()} ({placeholders})")
+            params += value
+        elif op == "between":
+            conditions.append(f"{col} BETWEEN ? AND ?")
+            params += list(value)
+        else:
+            raise ValueError(f"Unknown filter operator: {op}")
+    return " AND ".join(conditions) or "TRUE", params
+
+
+def _freq_sql(col, freq):
+    """Sql expression of the period a date falls into (see pandas resample)"""
+    part, end = get_frequency(freq, FREQUENCIES)
+    expr = f"date_trunc('{part}', {col})"
+    if end:
+        expr = f"{expr} + INTERVAL 1 {part} - INTERVAL 1 day"
+    return f"CAST({expr} AS TIMESTAMP)"
+
+
+class DuckDBArchive:
+    """EUTL archive registered as views in an in-process DuckDB database.
+    Loader methods push projections, filters, aggregations and label joins
+    into the database and return only the final result. Rows are returned in
+    no particular order.
+    """
+
+    def __init__(self, fn_zip, cache_dir=None, threads=None, database=":memory:"):
+        """
+        :param fn_zip: <string> name of zip file with data or <EUTLArchive>
+        :param cache_dir: <string> directory of the persistent cache for the
+                parquet files. None to use the global cache directory
+                (see set_cache_dir). If no cache directory is set, members are
+                extracted to a temporary directory
+        :param threads: <int> number of threads used by DuckDB.
+                None for all cores
+        :param database: <string> DuckDB database file. Defaults to memory
+        """
+        duckdb = _import_duckdb()
+        self.archive = (
+            fn_zip if isinstance(fn_zip, EUTLArchive) else EUTLArchive(fn_zip)
+        )
+        self.cache_dir = cache_dir or get_cache_dir()
+        self.con = duckdb.connect(database)
+        if threads is not None:
+            self.con.execute(f"SET threads = {int(threads)}")
+        self.views = {}
+        self._tmp_dir = None
+        self._lookups = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __repr__(self):
+        return f"<DuckDBArchive({self.archive.fn_zip!r}) views={list(self.views)}>"
+
+    def close(self):
+        """Close database and remove extracted members"""
+        self.con.close()
+        if self._tmp_dir is not None:
+            shutil.rmtree(self._tmp_dir, ignore_errors=True)
+            self._tmp_dir = None
+
+    def _read_sql(self, fn_file, path):
+        """Sql reading a csv file with types of the compact schema"""
+        columns = get_columns(self.archive, fn_file)
+        types = {
+            c: SQL_TYPES[m] for c, m in SCHEMAS.get(fn_file, {}).items() if c in columns
+        }
+        expressions = {
+            c: f"TRY_CAST({{col}} AS {t})" for c, t in types.items() if t != "VARCHAR"
+        }
+        expressions.update(SQL_EXPRESSIONS.get(fn_file, {}))
+        # typed columns are read as text and converted, so that values
+        # that cannot be converted become null instead of failing the query
+        varchar = ", ".join(
+            f"{_literal(c)}: 'VARCHAR'" for c in {**types, **expressions}
+        )
+        # missing values as read by pandas
+        nullstr = ", ".join(_literal(v) for v in NA_VALUES)
+        read = (
+            f"read_csv({_literal(path)}, header = true, nullstr = [{nullstr}], "
+            f"types = {{{varchar}}})"
+        )
+        casts = [
+            f"{e.format(col=_quote(c))} AS {_quote(c)}" for c, e in expressions.items()
+        ]
+        replace = f" REPLACE ({', '.join(casts)})" if casts else ""
+        return f"SELECT *{replace} FROM {read}"
+
+    def _target(self):
+        """Directory of the extracted members or parquet files"""
+        if self.cache_dir is not None:
+            target = os.path.join(self.cache_dir, self.archive.hash, "duckdb")
+        else:
+            if self._tmp_dir is None:
+                self._tmp_dir = tempfile.mkdtemp(prefix="pyeutl_")
+            target = self._tmp_dir
+        os.makedirs(target, exist_ok=True)
+        return target
+
+    def _view(self, fn_file):
+        """Name of the view of a csv member. Members are extracted and
+        registered on first use."""
+        if fn_file in self.views:
+            return self.views[fn_file]
+        target = self._target()
+        view = _view_name(fn_file)
+        fn_parquet = os.path.join(target, view + ".parquet")
+        if self.cache_dir is None or not os.path.exists(fn_parquet):
+            fn_csv = extract_member(self.archive.open, fn_file, target)
+            sql = self._read_sql(fn_file, fn_csv)
+            if self.cache_dir is not None:
+                fn_tmp = f"{fn_parquet}.{os.getpid()}.tmp"
+                self.con.execute(f"COPY ({sql}) TO {_literal(fn_tmp)} (FORMAT parquet)")
+                os.replace(fn_tmp, fn_parquet)
+                os.remove(fn_csv)
+        if self.cache_dir is not None:
+            sql = f"SELECT * FROM read_parquet({_literal(fn_parquet)})"
+        self.con.execute(f"CREATE OR REPLACE VIEW {_quote(view)} AS {sql}")
+        self.views[fn_file] = view
+        return view
+
+    def _register_views(self, sql):
+        """Register the views of all members used in a query"""
+        members = {
+            _view_name(fn): fn for fn in self.archive.namelist() if fn.endswith(".csv")
+        }
+        # parsed without the registered views, which would be bound otherwise
+        for name in _import_duckdb().get_table_names(sql):
+            if name in members:
+                self._view(members[name])
+
+    def query(self, sql, params=None):
+        """Execute sql query
+        :param sql: <string> query using the views of the members
+        :param params: <list> parameters of the query
+        :return: <pd.DataFrame>"""
+        self._register_views(sql)
+        return self.con.execute(sql, params).df()
+
+    def relation(self, sql):
+        """DuckDB relation of a query to process the result further in the
+        database or to fetch it in batches (e.g. fetch_record_batch)
+        :param sql: <string> query using the views of the members
+        :return: <duckdb.DuckDBPyRelation>"""
+        self._register_views(sql)
+        return self.con.sql(sql)
+
+    def _lookup(self, source, fn_file=None, col=None):
+        """Name of table with keys and labels of lookup. Compiled lookups are
+        resolved for the distinct values of the column of the member."""
+        key = source if isinstance(source, str) else (id(source), fn_file, col)
+        if key not in self._lookups:
+            if isinstance(source, str):
+                mapper = get_mapper(self.archive, source)
+            elif isinstance(source, CategoryLookup):
+                codes = self.con.execute(
+                    f"SELECT DISTINCT {_quote(col)} FROM {_quote(self._view(fn_file))}"
+                ).df()[col]
+                mapper = source.to_dict(codes.dropna())
+            else:
+                mapper = source
+            keys = pd.Series(list(mapper.keys()), dtype=object)
+            numeric = pd.to_numeric(keys, errors="coerce")
+            df = pd.DataFrame({"key": keys, "label": list(mapper.values())})
+            if source in NUMERIC_LOOKUPS or numeric.notna().all():
+                df["key"] = numeric
+                df = df[numeric.notna()]
+            else:
+                df["key"] = keys.astype(str)
+            name = f"_lookup_{len(self._lookups)}"
+            self.con.register(name, df)
+            self._lookups[key] = (name, pd.api.types.is_numeric_dtype(df["key"]))
+        return self._lookups[key]
+
+    def _label_joins(self, fn_file, labels, alias):
+        """Sql of label columns and joins of lookup tables
+        :return: <tuple: list, list> with select expressions and joins"""
+        selects, joins = [], []
+        for i, label in enumerate(labels):
+            source = LABEL_SOURCES[fn_file][label]
+            col = f"{alias}.{_quote(source)}"
+            table, numeric = self._lookup(
+                LABEL_LOOKUPS[fn_file][label], fn_file, source
+            )
+            key = f"TRY_CAST({col} AS DOUBLE)" if numeric else f"CAST({col} AS VARCHAR)"
+            joins.append(f"LEFT JOIN {table} l{i} ON {key} = l{i}.key")
+            selects.append(f"l{i}.label AS {_quote(label)}")
+        return selects, joins
+
+    def _select(self, fn_file, drop=[], columns=None, filters=None, labels=True):
+        """Sql selecting columns of a member with labels
+        :return: <tuple: string, list, list> with query, parameters and columns"""
+        all_labels = list(LABEL_SOURCES.get(fn_file, {}))
+        sources = LABEL_SOURCES.get(fn_file, {})
+        if columns is not None:
+            selected = set(columns) | {sources[c] for c in columns if c in sources}
+        cols = [
+            c
+            for c in get_columns(self.archive, fn_file)
+            if c not in drop and (columns is None or c in selected)
+        ]
+        labels = [
+            label
+            for label in all_labels
+            if labels
+            and sources[label] in cols
+            and (columns is None or label in columns or sources[label] in columns)
+        ]
+        selects, joins = self._label_joins(fn_file, labels, "t")
+        where, params = _where(filters, "t")
+        sql = (
+            f"SELECT {', '.join([f't.{_quote(c)}' for c in cols] + selects)} "
+            f"FROM {_quote(self._view(fn_file))} t {' '.join(joins)} WHERE {where}"
+        )
+        return sql, params, cols + labels
+
+    def get_installations(
+        self,
+        drop=[
+            "latitudeEutl",
+            "longitudeEutl",
+            "nace15_id",
+            "nace20_id",
+            "created_on",
+            "updated_on",
+        ],
+        columns=None,
+        filters=None,
+        labels=True,
+    ):
+        """Load installation data with labels, see get_installations
+        :param drop: <list: string> with column names to drop
+        :param columns: <list: string> with column names to select. Label
+                columns select the column they are derived from.
+                None for all columns
+        :param filters: <list: tuple> of predicates (column, operator, value)
+        :param labels: <boolean> False to omit label columns
+        :return: <pd.DataFrame>"""
+        return self.query(
+            *self._select("installation.csv", drop, columns, filters, labels)[:2]
+        )
+
+    def get_accounts(
+        self, drop=["created_on", "updated_on"], columns=None, filters=None, labels=True
+    ):
+        """Load account data with labels, see get_accounts
+        :param drop: <list: string> with column names to drop
+        :param columns: <list: string> with column names to select
+        :param filters: <list: tuple> of predicates (column, operator, value)
+        :param labels: <boolean> False to omit label columns
+        :return: <pd.DataFrame>"""
+        return self.query(
+            *self._select("account.csv", drop, columns, filters, labels)[:2]
+        )
+
+    def get_account_holders(
+        self,
+        drop=[
+            "created_on",
+            "updated_on",
+            "telephone1",
+            "telephone2",
+            "eMail",
+            "addressSecondary",
+        ],
+        columns=None,
+        filters=None,
+        labels=True,
+    ):
+        """Load account holder data with labels, see get_account_holders
+        :param drop: <list: string> with column names to drop
+        :param columns: <list: string> with column names to select
+        :param filters: <list: tuple> of predicates (column, operator, value)
+        :param labels: <boolean> False to omit label columns
+        :return: <pd.DataFrame>"""
+        return self.query(
+            *self._select("account_holder.csv", drop, columns, filters, labels)[:2]
+        )
+
+    def get_compliance(
+        self,
+        create_id=True,
+        drop=["surrenderedCummulative", "created_on", "updated_on"],
+        columns=None,
+        filters=None,
+        labels=True,
+    ):
+        """Load compliance data with labels, see get_compliance
+        :param create_id: <boolean> True to create a column with a unique id
+                combining installation id and year of compliance
+        :param drop: <list: string> with column names to drop
+        :param columns: <list: string> with column names to select
+        :param filters: <list: tuple> of predicates (column, operator, value)
+        :param labels: <boolean> False to omit label columns
+        :return: <pd.DataFrame>"""
+        if create_id and columns is not None:
+            columns = list(columns) + ["installation_id", "year"]
+        sql, params, _ = self._select("compliance.csv", drop, columns, filters, labels)
+        if create_id:
+            sql = (
+                "SELECT installation_id || '_' || CAST(year AS VARCHAR) AS id, * "
+                f"FROM ({sql})"
+            )
+        return self.query(sql, params)
+
+    def get_transactions(
+        self,
+        drop=[],
+        freq=None,
+        columns=None,
+        filters=None,
+        labels=True,
+        account_columns=None,
+        prefix_account={"transferring": "transferring", "acquiring": "acquiring"},
+    ):
+        """Load and aggregate transaction data with labels, see get_transactions.
+        Transactions are filtered and aggregated before labels and account
+        information are joined.
+        :param drop: <list: string> with column names to drop
+        :param freq: <string> frequency for aggregation (see FREQUENCIES).
+                Amounts are summed over all other columns
+        :param columns: <list: string> with column names to select
+        :param filters: <list: tuple> of predicates (column, operator, value)
+                on columns of the transaction data
+        :param labels: <boolean> False to omit label columns
+        :param account_columns: <list: string> with account columns (including
+                labels) to join for transferring and acquiring accounts.
+                None to join no account information
+        :param prefix_account: <dict> with prefix for account columns for
+                transferring and acquiring accounts
+        :return: <pd.DataFrame>"""
+        fn_file = "transaction.csv"
+        sources = LABEL_SOURCES[fn_file]
+        keys = ["date", "amount"] if freq is not None else []
+        if account_columns is not None:
+            keys += list(ACCOUNT_KEYS.values())
+        if columns is not None:
+            columns = list(columns) + keys
+        sql, params, cols = self._select(fn_file, drop, columns, filters, labels=False)
+        if freq is not None:
+            others = [_quote(c) for c in cols if c not in ["date", "amount"]]
+            sql = (
+                f"SELECT {', '.join([_freq_sql('date', freq) + ' AS date'] + others)}, "
+                f"CAST(sum(amount) AS BIGINT) AS amount FROM ({sql}) GROUP BY ALL"
+            )
+            cols = ["date"] + [c for c in cols if c not in ["date", "amount"]]
+            cols.append("amount")
+
+        # labels and account information are joined after aggregation
+        label_cols = [
+            label
+            for label in sources
+            if labels
+            and sources[label] in cols
+            and (columns is None or label in columns or sources[label] in columns)
+        ]
+        selects, joins = self._label_joins(fn_file, label_cols, "t")
+        if account_columns is not None:
+            sql_acc, params_acc, acc_cols = self._select(
+                "account.csv", [], list(account_columns) + ["id"]
+            )
+            for side, key in ACCOUNT_KEYS.items():
+                joins.append(
+                    f"LEFT JOIN ({sql_acc}) {side} ON t.{_quote(key)} = {side}.id"
+                )
+                selects += [
+                    f"{side}.{_quote(c)} AS "
+                    + _quote(prefix_account[side] + c[0].capitalize() + c[1:])
+                    for c in acc_cols
+                    if c != "id"
+                ]
+                params = params + params_acc
+        selects = "".join(", " + s for s in selects)
+        sql = f"SELECT t.*{selects} FROM ({sql}) t {' '.join(joins)}"
+        return self.query(sql, params)
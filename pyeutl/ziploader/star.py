@@ -0,0 +1,277 @@
+"""Star-schema representation of the EUTL archive.
+
+Fact tables (transactions, compliance, surrender) and entity tables
+(installations, accounts, account holders) keep only compact keys, labels are
+stored once in dimension tables. Code columns are encoded as categoricals
+sharing one dictionary per kind of code across all tables, e.g., registry_id
+of installations, accounts and surrender all use the "country" dictionary.
+Joins and group-bys between tables thus run on the integer codes:
+
+    star = get_star_schema(fn_zip)
+    df = star.facts["transactions"]
+    df.groupby("unitType_id", observed=True).amount.sum()
+    star.decode(df, ["unitType_id"])  # adds unitType label
+"""
+
+from dataclasses import dataclass, field
+import pandas as pd
+from .utils import get_mapper, map_values
+from .ziploader import (
+    LABEL_SOURCES,
+    get_installations,
+    get_accounts,
+    get_account_holders,
+    get_compliance,
+    get_transactions,
+    _get_usecols,
+    _load_member,
+)
+from .category_mappings import (
+    lookup_activity_category,
+    lookup_account_category,
+    lookup_nace_category,
+)
+
+# code columns and the shared dictionary they are encoded with
+CODE_COLUMNS = {
+    "registry_id": "country",
+    "country_id": "country",
+    "originatingRegistry_id": "country",
+    "tradingSystem_id": "trading_system",
+    "reportedInSystem_id": "trading_system",
+    "accountType_id": "account_type",
+    "unitType_id": "unit_type",
+    "compliance_id": "compliance_code",
+    "installation_id": "installation",
+}
+
+# integer id columns referring to a dimension without dictionary
+ID_COLUMNS = {
+    "activity_id": "activity",
+    "nace_id": "nace",
+    "transactionTypeMain_id": "transaction_type_main",
+    "transactionTypeSupplementary_id": "transaction_type_supplementary",
+}
+
+# lookup tables of the dimensions
+DIMENSION_SOURCES = {
+    "country": "country_code.csv",
+    "trading_system": "trading_system_code.csv",
+    "account_type": "account_type.csv",
+    "unit_type": "unit_type.csv",
+    "compliance_code": "compliance_code.csv",
+    "activity": "activity_type.csv",
+    "nace": "nace_code.csv",
+    "transaction_type_main": "transaction_type_main.csv",
+    "transaction_type_supplementary": "transaction_type_supplementary.csv",
+}
+
+# further categories of dimensions
+DIMENSION_CATEGORIES = {
+    "activity": lookup_activity_category,
+    "account_type": lookup_account_category,
+    "nace": lookup_nace_category,
+}
+
+# names of labels added by decode if they differ from the column without "_id"
+LABEL_NAMES = {"compliance_id": "complianceCode"}
+
+FACT_TABLES = ["transactions", "compliance", "surrender"]
+
+
+@dataclass
+class StarSchema:
+    """Tables of an EUTL archive in star schema
+
+    facts: <dict: name -> pd.DataFrame> with fact tables
+    entities: <dict: name -> pd.DataFrame> with installations, accounts
+        and account holders
+    dimensions: <dict: name -> pd.DataFrame> with labels indexed by id.
+        Dimensions with dictionary are indexed in order of the codes
+    dictionaries: <dict: name -> pd.CategoricalDtype> shared by all code
+        columns of a kind (see CODE_COLUMNS)
+    """
+
+    facts: dict = field(default_factory=dict)
+    entities: dict = field(default_factory=dict)
+    dimensions: dict = field(default_factory=dict)
+    dictionaries: dict = field(default_factory=dict)
+
+    def tables(self):
+        """Iterate over (name, table) of fact and entity tables"""
+        yield from self.facts.items()
+        yield from self.entities.items()
+
+    def label(self, s, dimension=None, field="description"):
+        """Get labels of an encoded column
+        :param s: <pd.Series> with codes or ids
+        :param dimension: <string> name of dimension. None to derive the
+                dimension from the name of the series
+        :param field: <string> column of the dimension, e.g., "category"
+        :return: <pd.Series> categorical"""
+        if dimension is None:
+            dimension = {**CODE_COLUMNS, **ID_COLUMNS}[s.name]
+        dim = self.dimensions[dimension]
+        return map_values(s, dict(zip(dim.index, dim[field])), as_category=True)
+
+    def decode(self, df, columns=None):
+        """Add labels of encoded columns to a table
+        :param df: <pd.DataFrame> fact or entity table
+        :param columns: <list: string> columns to add labels for. None for all
+                columns with dimension except installation ids
+        :return: <pd.DataFrame>"""
+        dimensions = {**CODE_COLUMNS, **ID_COLUMNS}
+        if columns is None:
+            columns = [
+                c
+                for c in df.columns
+                if c in dimensions and dimensions[c] in self.dimensions
+            ]
+        df = df.copy()
+        for c in columns:
+            df[LABEL_NAMES.get(c, c.removesuffix("_id"))] = self.label(df[c])
+        return df
+
+    def memory_usage(self):
+        """Memory usage of all tables in bytes
+        :return: <pd.Series>"""
+        tables = {**dict(self.tables()), **self.dimensions}
+        return pd.Series(
+            {n: df.memory_usage(deep=True).sum() for n, df in tables.items()}
+        )
+
+
+def _drop_labels(df, fn_file):
+    """Drop label columns created by the loaders"""
+    labels = LABEL_SOURCES.get(fn_file, {})
+    return df.drop(columns=[c for c in labels if c in df.columns])
+
+
+def _get_surrender(fn_zip, drop=["created_on", "updated_on"], engine=None):
+    """Load surrendered units from zip
+    :param fn_zip: <string> name of zip file with data or <EUTLArchive>
+    :param drop: <list: string> with column names to drop
+    :param engine: <string> csv parsing engine (see get_engine_args)
+    :return: <pd.DataFrame>"""
+    usecols = _get_usecols(fn_zip, "surrender.csv", drop=drop)
+    return _load_member(
+        fn_zip, "surrender.csv", usecols, compact=True, engine=engine, low_memory=False
+    )
+
+
+def _get_dimension(fn_zip, name):
+    """Load lookup table of a dimension
+    :param fn_zip: <string> name of zip file with data or <EUTLArchive>
+    :param name: <string> name of dimension
+    :return: <pd.DataFrame> indexed by id"""
+    mapper = get_mapper(fn_zip, DIMENSION_SOURCES[name])
+    if name == "nace":
+        # nace ids are numbers in installation data
+        mapper = {float(k): v for k, v in mapper.items() if _is_number(k)}
+    elif name in ID_COLUMNS.values():
+        mapper = {int(k): v for k, v in mapper.items()}
+    df = pd.DataFrame({"description": mapper.values()}, index=list(mapper))
+    df.index.name = "id"
+    if name in DIMENSION_CATEGORIES:
+        df["category"] = map_values(df.index.to_series(), DIMENSION_CATEGORIES[name])
+    return df
+
+
+def _is_number(x):
+    try:
+        float(x)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
+def _observed_values(s):
+    """Distinct values of a column without missing values"""
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        return s.cat.categories
+    return pd.Index(s.dropna().unique())
+
+
+def _build_dictionaries(tables, dimensions, df_installation=None):
+    """Build shared dictionaries covering lookup ids and all observed codes
+    :param tables: <dict: name -> pd.DataFrame> with tables to encode
+    :param dimensions: <dict: name -> pd.DataFrame> with lookup tables
+    :param df_installation: <pd.DataFrame> with installations
+    :return: <dict: name -> pd.CategoricalDtype>"""
+    values = {
+        name: [dimensions[name].index] if name in dimensions else []
+        for name in CODE_COLUMNS.values()
+    }
+    if df_installation is not None:
+        values["installation"].insert(0, df_installation.id)
+    for df in tables.values():
+        for col, name in CODE_COLUMNS.items():
+            if col in df.columns:
+                values[name].append(_observed_values(df[col]))
+    dictionaries = {}
+    for name, indexes in values.items():
+        # known ids first, ids only present in the data are appended sorted
+        known = pd.Index(indexes[0]).astype(object) if indexes else pd.Index([])
+        observed = pd.Index([]).append([pd.Index(i).astype(object) for i in indexes])
+        extra = observed.unique().difference(known, sort=False)
+        dictionaries[name] = pd.CategoricalDtype(
+            known.append(pd.Index(sorted(extra))).unique()
+        )
+    return dictionaries
+
+
+def get_star_schema(fn_zip, facts=FACT_TABLES, freq=None, engine=None):
+    """Load archive into a star schema with integer-coded fact tables, entity
+    tables, and dimensions with labels stored once.
+    :param fn_zip: <string> name of zip file with data or <EUTLArchive>
+    :param facts: <list: string> fact tables to load out of transactions,
+            compliance, and surrender
+    :param freq: <string> frequency to aggregate transactions to (see
+            get_transactions). None for individual transactions
+    :param engine: <string> csv parsing engine (see get_engine_args)
+    :return: <StarSchema>"""
+    unknown = [t for t in facts if t not in FACT_TABLES]
+    if unknown:
+        raise ValueError(f"Unknown fact tables: {unknown}")
+    args = dict(compact=True, engine=engine)
+    entities = {
+        "installations": _drop_labels(
+            get_installations(fn_zip, **args), "installation.csv"
+        ),
+        "accounts": _drop_labels(get_accounts(fn_zip, **args), "account.csv"),
+        "account_holders": _drop_labels(
+            get_account_holders(fn_zip, **args), "account_holder.csv"
+        ),
+    }
+    loaders = {
+        "transactions": lambda: _drop_labels(
+            get_transactions(fn_zip, freq=freq, **args), "transaction.csv"
+        ),
+        "compliance": lambda: _drop_labels(
+            get_compliance(fn_zip, create_id=False, **args), "compliance.csv"
+        ),
+        "surrender": lambda: _get_surrender(fn_zip, engine=engine),
+    }
+    facts = {t: loaders[t]() for t in facts}
+    dimensions = {name: _get_dimension(fn_zip, name) for name in DIMENSION_SOURCES}
+
+    # encode code columns of all tables with shared dictionaries
+    dictionaries = _build_dictionaries(
+        {**facts, **entities}, dimensions, df_installation=entities["installations"]
+    )
+    for tables in [facts, entities]:
+        for name, df in tables.items():
+            codes = {
+                c: dictionaries[d] for c, d in CODE_COLUMNS.items() if c in df.columns
+            }
+            if name == "installations":
+                codes["id"] = dictionaries["installation"]
+            tables[name] = df.astype(codes)
+    for name, dtype in dictionaries.items():
+        if name in dimensions:
+            dimensions[name] = dimensions[name].reindex(
+                pd.CategoricalIndex(dtype.categories, dtype=dtype, name="id")
+            )
+    return StarSchema(
+        facts=facts, entities=entities, dimensions=dimensions, dictionaries=dictionaries
+    )
@@ -1,43 +1,271 @@
+import warnings
+import numpy as np
 import pandas as pd
+from pandas.api.types import union_categoricals
 from zipfile import ZipFile
+from ..categories import CategoryLookup
+from .archive import EUTLArchive
+from .cache import get_cache_dir, load_cached_file
+
+ENGINES = ["c", "python", "pyarrow"]
+
+
+def get_engine_args(engine=None, arrow_dtypes=True):
+    """Get arguments for pandas read_csv selecting the parsing engine. The
+    multithreaded pyarrow engine falls back to the c engine if pyarrow is not
+    installed.
+    :param engine: <string> one of "c", "python", or "pyarrow".
+            None for the pandas default
+    :param arrow_dtypes: <boolean> True to return Arrow-backed columns when
+            parsing with the pyarrow engine
+    :return: <dict>"""
+    if engine is None:
+        return {}
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine: {engine}")
+    if engine == "pyarrow":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            warnings.warn("pyarrow is not installed. Fall back to c engine.")
+            return {"engine": "c"}
+        if arrow_dtypes:
+            return {"engine": "pyarrow", "dtype_backend": "pyarrow"}
+    return {"engine": engine}
 
 
 def load_zipped_file(fn_zip, fn_file, read_csv_args={}):
-    """Load file in zip archiv
-    :param fn_zip: <string> name of zip file
+    """Load file in zip archiv. If a cache directory is set (see
+    set_cache_dir), the file is served from the persistent columnar cache.
+    :param fn_zip: <string> name of zip file or <EUTLArchive>
     :param fn_file: <string> name of file in zip file
     :param read_csv_args: <dict> passed to pandas read_csv"""
+    if isinstance(fn_zip, EUTLArchive):
+        return fn_zip.load_file(fn_file, read_csv_args=read_csv_args)
+    if get_cache_dir() is not None:
+        return load_cached_file(fn_zip, fn_file, read_csv_args=read_csv_args)
     zip_file = ZipFile(fn_zip)
     df = pd.read_csv(zip_file.open(fn_file), **read_csv_args)
     return df
 
 
+def iter_zipped_file(fn_zip, fn_file, chunksize, read_csv_args={}):
+    """Iterate over chunks of file in zip archive
+    :param fn_zip: <string> name of zip file or <EUTLArchive>
+    :param fn_file: <string> name of file in zip file
+    :param chunksize: <int> number of rows per chunk
+    :param read_csv_args: <dict> passed to pandas read_csv. The pyarrow
+            engine does not read in chunks
+    :return: <iterator: pd.DataFrame>"""
+    if read_csv_args.get("engine") == "pyarrow":
+        raise ValueError("The pyarrow engine cannot read files in chunks")
+    read_csv_args = {k: v for k, v in read_csv_args.items() if k != "low_memory"}
+    if isinstance(fn_zip, EUTLArchive):
+        with pd.read_csv(
+            fn_zip.open(fn_file), chunksize=chunksize, **read_csv_args
+        ) as reader:
+            yield from reader
+        return
+    with ZipFile(fn_zip) as zip_file:
+        with pd.read_csv(
+            zip_file.open(fn_file), chunksize=chunksize, **read_csv_args
+        ) as reader:
+            yield from reader
+
+
+def concat_chunks(chunks):
+    """Concatenate chunks of a table. Categorical columns are combined using
+    the union of their categories, so that they stay categorical.
+    :param chunks: <list: pd.DataFrame>
+    :return: <pd.DataFrame>"""
+    if len(chunks) == 1:
+        return chunks[0]
+    for col, dtype in chunks[0].dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype):
+            categories = union_categoricals(
+                [df[col] for df in chunks], ignore_order=True
+            ).categories
+            for df in chunks:
+                df[col] = df[col].cat.set_categories(categories)
+    return pd.concat(chunks, ignore_index=True)
+
+
+FILTER_OPERATORS = {
+    "==": lambda s, v: s == v,
+    "=": lambda s, v: s == v,
+    "!=": lambda s, v: s != v,
+    "<": lambda s, v: s < v,
+    "<=": lambda s, v: s <= v,
+    ">": lambda s, v: s > v,
+    ">=": lambda s, v: s >= v,
+    "in": lambda s, v: s.isin(v),
+    "not in": lambda s, v: ~s.isin(v),
+    "between": lambda s, v: s.between(*v),
+}
+
+
+def filter_frame(df, filters):
+    """Select rows of dataframe satisfying all filters
+    :param df: <pd.DataFrame>
+    :param filters: <list: tuple> of predicates (column, operator, value), e.g.,
+        [("registry_id", "==", "AT"), ("year", "between", (2013, 2020)),
+        ("acquiringAccount_id", "in", [1, 2])]. Operators are ==, !=, <, <=,
+        >, >=, in, not in, and between (bounds included)
+    :return: <pd.DataFrame>"""
+    mask = np.ones(len(df), dtype=bool)
+    for col, op, value in filters:
+        if op not in FILTER_OPERATORS:
+            raise ValueError(f"Unknown filter operator: {op}")
+        selected = FILTER_OPERATORS[op](df[col], value)
+        mask &= np.asarray(selected.fillna(False), dtype=bool)
+    return df[mask]
+
+
+def get_columns(fn_zip, fn_file):
+    """Get column names of csv file in zip archive without parsing the file
+    :param fn_zip: <string> name of zip file or <EUTLArchive>
+    :param fn_file: <string> name of file in zip file
+    :return: <list: string>"""
+    if isinstance(fn_zip, EUTLArchive):
+        return fn_zip.get_columns(fn_file)
+    with ZipFile(fn_zip) as zip_file:
+        return list(pd.read_csv(zip_file.open(fn_file), nrows=0).columns)
+
+
+def parse_datetime(s, resolution=None):
+    """Parse EUTL timestamps (e.g. "2005-04-26 11:14:16.957") cutting off
+        fractional seconds. Timestamps are parsed with the ISO 8601 fast path,
+        so no intermediate strings are created.
+    :param s: <pd.Series> with timestamp strings
+    :param resolution: <string> "s" to store timestamps at second and "D" to
+        store them at day resolution. None to keep the default resolution.
+    :return: <pd.Series> of datetimes"""
+    if resolution not in [None, "s", "D"]:
+        raise ValueError(f"Unknown date resolution: {resolution}")
+    dt = pd.to_datetime(s, format="ISO8601")
+    if isinstance(dt.dtype, pd.ArrowDtype):
+        # timestamps already parsed by the pyarrow engine
+        dt = dt.astype(f"datetime64[{dt.dtype.pyarrow_dtype.unit}]")
+    dt = dt.dt.floor(resolution or "s")
+    if resolution is not None:
+        dt = dt.astype("datetime64[s]")
+    return dt
+
+
+# period of pandas frequencies and whether labels are period ends
+FREQUENCIES = {
+    "D": ("D", False),
+    "W": ("W", True),
+    "MS": ("M", False),
+    "ME": ("M", True),
+    "M": ("M", True),
+    "QS": ("Q", False),
+    "QE": ("Q", True),
+    "Q": ("Q", True),
+    "YS": ("Y", False),
+    "AS": ("Y", False),
+    "YE": ("Y", True),
+    "Y": ("Y", True),
+    "A": ("Y", True),
+}
+
+
+def get_frequency(freq, frequencies=FREQUENCIES):
+    """Entry of a supported frequency
+    :param freq: <string> pandas frequency
+    :param frequencies: <dict> mapping supported frequencies to their period
+            and whether labels are period ends
+    :return: <tuple> (period, end)"""
+    if freq not in frequencies:
+        raise ValueError(
+            f"Frequency {freq} is not supported, use one of {list(frequencies)}"
+        )
+    return frequencies[freq]
+
+
+def period_labels(periods, end):
+    """Dates labelling periods by their first or last day
+    :param periods: <pd.PeriodIndex>
+    :param end: <boolean> True to label periods by their last day
+    :return: <pd.DatetimeIndex>"""
+    return periods.end_time.normalize() if end else periods.start_time
+
+
 def get_mapper(fn_zip, fn_file, key="id", value="description"):
     """Get mapping dictionary from zip file
-    :param fn_zip: <string> name of zip file
+    :param fn_zip: <string> name of zip file or <EUTLArchive>
     :param fn_file: <string> name of file in zip file
     :param key: <string> name of key column
     :param value: <string> name of value column
     :param: <dict: key -> value>
     """
+    if isinstance(fn_zip, EUTLArchive):
+        return fn_zip.get_mapper(fn_file, key=key, value=value)
     zip_file = ZipFile(fn_zip)
     df = pd.read_csv(zip_file.open(fn_file), keep_default_na=False)
     return dict(zip(df[key], df[value]))
 
 
-def map_if_exists(df, mapper, col, col_mapped, default=None, drop_col=False):
+def map_values(s, mapper, default=None, as_category=False):
+    """Vectorized version of s.map(lambda x: mapper.get(x, default)). Keys are
+        looked up using a hash index on the mapper keys and mapped values are
+        gathered by position. For categorical series only the categories are
+        looked up.
+    param s: <pd.Series> with values to map
+    param mapper: <dict> with mapping imposed or <CategoryLookup>
+    default: default value for values not in mapper
+    as_category: <boolean> true to return a categorical series
+    return: <pd.Series> with index of s
+    """
+    if isinstance(mapper, CategoryLookup):
+        return mapper.map(s, default=default, as_category=as_category)
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        categories = map_values(
+            pd.Series(s.cat.categories), mapper, default=default, as_category=False
+        )
+        mapped = map_values(
+            pd.Series(s.cat.codes.to_numpy()),
+            dict(enumerate(categories)),
+            default=mapper.get(np.nan, default),
+            as_category=as_category,
+        )
+        return mapped.set_axis(s.index)
+    keys = pd.Index(list(mapper.keys()))
+    try:
+        pos = keys.get_indexer(s)
+    except (TypeError, ValueError):
+        # keys cannot be compared with values, fall back to python lookup
+        mapped = s.map(lambda x: mapper.get(x, default))
+        return mapped.astype("category") if as_category else mapped
+    pos[pos == -1] = len(keys)  # position of default value
+    values = list(mapper.values()) + [default]
+    if as_category:
+        codes, categories = pd.factorize(pd.Series(values))
+        return pd.Series(
+            pd.Categorical.from_codes(codes[pos], categories=categories),
+            index=s.index,
+        )
+    return pd.Series(values).take(pos).set_axis(s.index)
+
+
+def map_if_exists(
+    df, mapper, col, col_mapped, default=None, drop_col=False, as_category=False
+):
     """Applies mapper dictionary on values in col and creates new column
         with mapped values
     param df: <pd.DataFrame>
-    param mapper: <dict> with mapping imposed
+    param mapper: <dict> with mapping imposed or <CategoryLookup>
     param col: <string> name of column for mapping
     param col_mapped: <string> name of column for mapping
     default: default value for mapping
     drop_col: <boolean> true to drop column with original values
+    as_category: <boolean> true to store mapped values as categorical column
     """
     if col not in df.columns:
         return df
-    df[col_mapped] = df[col].map(lambda x: mapper.get(x, default))
+    df[col_mapped] = map_values(
+        df[col], mapper, default=default, as_category=as_category
+    )
     if drop_col:
         df = df.drop(col, axis=1)
     return df
@@ -1,11 +1,172 @@
 import pandas as pd
-from .utils import load_zipped_file, map_if_exists, get_mapper
+from pandas.tseries.frequencies import to_offset
+from .utils import (
+    load_zipped_file,
+    iter_zipped_file,
+    concat_chunks,
+    filter_frame,
+    map_if_exists,
+    get_mapper,
+    get_columns,
+    get_engine_args,
+    parse_datetime,
+)
+from .schemas import get_read_csv_args
+from .profiling import stage
+from .joins import ACCOUNT_KEYS, LazyAccountFrame, join_accounts, can_join_accounts
+from ..categories import CategoryLookup
 from .category_mappings import (
-    map_activity_category,
-    map_account_category,
-    map_nace_category,
+    lookup_activity_category,
+    lookup_account_category,
+    lookup_nace_category,
 )
 
+# number of rows read at once when filtering archive members
+FILTER_CHUNKSIZE = 500000
+
+# label columns created by the loaders and the column they are derived from
+LABEL_SOURCES = {
+    "installation.csv": {
+        "activity": "activity_id",
+        "activityCategory": "activity_id",
+        "registry": "registry_id",
+        "country": "country_id",
+        "nace": "nace_id",
+        "naceCategory": "nace_id",
+    },
+    "compliance.csv": {"complianceCode": "compliance_id"},
+    "account.csv": {
+        "registry": "registry_id",
+        "accountType": "accountType_id",
+        "accountCategory": "accountType_id",
+    },
+    "account_holder.csv": {"country": "country_id"},
+    "transaction.csv": {
+        "transactionTypeMain": "transactionTypeMain_id",
+        "transactionTypeSupplementary": "transactionTypeSupplementary_id",
+        "unitType": "unitType_id",
+    },
+}
+
+
+def _get_usecols(fn_zip, fn_file, drop=[], columns=None, keys=[]):
+    """Get columns to read from member of the archive
+    :param fn_zip: <string> name of zip file with data or <EUTLArchive>
+    :param fn_file: <string> name of file in zip file
+    :param drop: <list: string> with column names to drop
+    :param columns: <list: string> with column names to read. Names of label
+            columns select the column the label is derived from.
+            None to read all columns
+    :param keys: <list: string> columns required for merges, added to columns
+    :return: <list: string> in order of the file"""
+    if columns is not None:
+        labels = LABEL_SOURCES.get(fn_file, {})
+        columns = set(columns) | set(keys) | {labels[c] for c in columns if c in labels}
+    return [
+        c
+        for c in get_columns(fn_zip, fn_file)
+        if c not in drop and (columns is None or c in columns)
+    ]
+
+
+def _read_csv_args(fn_zip, fn_file, compact=False, usecols=None, engine=None, **kwargs):
+    """Get arguments for reading a member of the archive
+    :param fn_zip: <string> name of zip file with data or <EUTLArchive>
+    :param fn_file: <string> name of file in zip file
+    :param compact: <boolean> True to impose compact column types
+    :param usecols: <list: string> columns to read. None to read all columns
+    :param engine: <string> parsing engine (see get_engine_args)
+    :param kwargs: further arguments passed to read_csv
+    :return: <dict>"""
+    kwargs.update(get_engine_args(engine))
+    if kwargs.get("engine", "c") != "c":
+        kwargs.pop("low_memory", None)
+    if usecols is not None:
+        kwargs["usecols"] = usecols
+    if compact:
+        kwargs.update(
+            get_read_csv_args(fn_file, usecols or get_columns(fn_zip, fn_file))
+        )
+    return kwargs
+
+
+def _iter_member(
+    fn_zip, fn_file, usecols, chunksize, filters=None, prepare=None, **kwargs
+):
+    """Iterate over prepared and filtered chunks of member of the archive
+    :param fn_zip: <string> name of zip file with data or <EUTLArchive>
+    :param fn_file: <string> name of file in zip file
+    :param usecols: <list: string> columns to return
+    :param chunksize: <int> number of rows to read at once
+    :param filters: <list: tuple> of predicates (see filter_frame). Columns
+            in filters are read in addition to usecols
+    :param prepare: <callable> applied to each chunk before filtering
+    :param kwargs: passed to _read_csv_args
+    :return: <iterator: pd.DataFrame>"""
+    filters = filters or []
+    cols_filter = {f[0] for f in filters}
+    readcols = [
+        c for c in get_columns(fn_zip, fn_file) if c in usecols or c in cols_filter
+    ]
+    for df in iter_zipped_file(
+        fn_zip,
+        fn_file,
+        chunksize,
+        read_csv_args=_read_csv_args(fn_zip, fn_file, usecols=readcols, **kwargs),
+    ):
+        if prepare is not None:
+            df = prepare(df)
+        if filters:
+            df = filter_frame(df, filters)[usecols]
+        yield df
+
+
+def _load_member(fn_zip, fn_file, usecols, filters=None, prepare=None, **kwargs):
+    """Load member of the archive. If filters are given, the member is read in
+    chunks and only rows satisfying the filters are kept. The pyarrow engine
+    reads the whole member before filtering.
+    :param fn_zip: <string> name of zip file with data or <EUTLArchive>
+    :param fn_file: <string> name of file in zip file
+    :param usecols: <list: string> columns to return
+    :param filters: <list: tuple> of predicates (see filter_frame)
+    :param prepare: <callable> applied to the data before filtering
+    :param kwargs: passed to _read_csv_args
+    :return: <pd.DataFrame>"""
+    read_csv_args = _read_csv_args(fn_zip, fn_file, usecols=usecols, **kwargs)
+    if filters and read_csv_args.get("engine") != "pyarrow":
+        chunks = list(
+            _iter_member(
+                fn_zip,
+                fn_file,
+                usecols,
+                FILTER_CHUNKSIZE,
+                filters=filters,
+                prepare=prepare,
+                **kwargs,
+            )
+        )
+        return concat_chunks(chunks).reset_index(drop=True)
+    if filters:
+        cols_filter = {f[0] for f in filters}
+        readcols = [
+            c for c in get_columns(fn_zip, fn_file) if c in usecols or c in cols_filter
+        ]
+        read_csv_args = _read_csv_args(fn_zip, fn_file, usecols=readcols, **kwargs)
+    df = load_zipped_file(fn_zip, fn_file, read_csv_args=read_csv_args)
+    if prepare is not None:
+        df = prepare(df)
+    if filters:
+        df = filter_frame(df, filters)[usecols].reset_index(drop=True)
+    return df
+
+
+def _check_lazy(**options):
+    """Raise an error for options of the pandas loaders set together with lazy
+    :param options: <dict: name -> value> of options lazy plans do not support"""
+    used = [name for name, value in options.items() if value not in (None, False)]
+    if used:
+        raise ValueError(f"lazy=True cannot be combined with {', '.join(used)}")
+
 
 def get_installations(
     fn_zip,
@@ -17,44 +178,77 @@ def get_installations(
         "created_on",
         "updated_on",
     ],
+    compact=False,
+    columns=None,
+    filters=None,
+    engine=None,
+    lazy=False,
 ):
     """Load installation data from zip and add labels
-    :param fn_zip: <string> name of zip file with data
+    :param fn_zip: <string> name of zip file with data or <EUTLArchive>
     :param drop: <list: string> with column names to drop
-    :return: <pd.DataFrame>"""
-    # get installation and drop columns
-    df = load_zipped_file(
-        fn_zip, "installation.csv", read_csv_args=dict(low_memory=False)
+    :param compact: <boolean> True to use compact column types and
+              categorical labels
+    :param columns: <list: string> with column names to read. Label columns
+              select the column they are derived from. None for all columns
+    :param filters: <list: tuple> of predicates (column, operator, value)
+              applied while reading, e.g. [("registry_id", "==", "AT")]
+    :param engine: <string> csv parsing engine: "c", "python", or "pyarrow"
+              (multithreaded, Arrow-backed columns). None for pandas default
+    :param lazy: <boolean> True to return a lazy Polars query plan (see
+              lazy.py) instead of a data frame. Cannot be combined with
+              compact and engine
+    :return: <pd.DataFrame> or <pl.LazyFrame> for lazy"""
+    if lazy:
+        from .lazy import scan_installations
+
+        _check_lazy(compact=compact, engine=engine)
+        return scan_installations(fn_zip, drop=drop, columns=columns, filters=filters)
+    # get installation without dropped columns
+    usecols = _get_usecols(
+        fn_zip, "installation.csv", drop=drop, columns=columns, keys=["id"]
     )
-    cols = [c for c in df.columns if c not in drop]
-    df = df[cols].copy()
+    with stage("get_installations", "read") as st:
+        df = _load_member(
+            fn_zip,
+            "installation.csv",
+            usecols,
+            filters=filters,
+            compact=compact,
+            engine=engine,
+            low_memory=False,
+        )
+        st.record(df)
 
     # impose relations
-    mapper = get_mapper(fn_zip, "activity_type.csv")
-    df = map_if_exists(
-        df,
-        mapper,
-        "activity_id",
-        "activity",
-    )
-    df = map_if_exists(
-        df,
-        map_activity_category,
-        "activity_id",
-        "activityCategory",
-    )
-    mapper = get_mapper(fn_zip, "country_code.csv")
-    df = map_if_exists(df, mapper, "registry_id", "registry")
-    df = map_if_exists(df, mapper, "country_id", "country")
-    mapper = get_mapper(fn_zip, "nace_code.csv")
-    r_mapper = {}  # ensure correct types between map and data frame
-    for k, v in mapper.items():
-        try:
-            r_mapper[float(k)] = v
-        except:
-            pass
-    df = map_if_exists(df, r_mapper, "nace_id", "nace")
-    df = map_if_exists(df, map_nace_category, "nace_id", "naceCategory")
+    with stage("get_installations", "labels") as st:
+        mapper = get_mapper(fn_zip, "activity_type.csv")
+        df = map_if_exists(
+            df,
+            mapper,
+            "activity_id",
+            "activity",
+            as_category=compact,
+        )
+        df = map_if_exists(
+            df,
+            lookup_activity_category,
+            "activity_id",
+            "activityCategory",
+            as_category=compact,
+        )
+        mapper = get_mapper(fn_zip, "country_code.csv")
+        df = map_if_exists(df, mapper, "registry_id", "registry", as_category=compact)
+        df = map_if_exists(df, mapper, "country_id", "country", as_category=compact)
+        # nace codes are numbers in the installation data
+        mapper = CategoryLookup.nace(
+            get_mapper(fn_zip, "nace_code.csv"), hierarchical=False
+        )
+        df = map_if_exists(df, mapper, "nace_id", "nace", as_category=compact)
+        df = map_if_exists(
+            df, lookup_nace_category, "nace_id", "naceCategory", as_category=compact
+        )
+        st.record(df)
     return df
 
 
@@ -67,33 +261,88 @@ def get_compliance(
         "created_on",
         "updated_on",
     ],
+    compact=False,
+    columns=None,
+    filters=None,
+    engine=None,
+    lazy=False,
 ):
     """Load compliance data from zip and add labels and installation information
-    :param fn_zip: <string> name of zip file with data
+    :param fn_zip: <string> name of zip file with data or <EUTLArchive>
     :parma create_id: <boolean> True to create a column with a unique if combining installation
               id and year of compliance
     :param df_installations: <pd.DataFrame> with installation information to be included
               index column has to be named "id"
     :param drop: <list: string> with column names to drop
-    :return: <pd.DataFrame>"""
-    df = load_zipped_file(
-        fn_zip, "compliance.csv", read_csv_args=dict(low_memory=False)
+    :param compact: <boolean> True to use compact column types and
+              categorical labels
+    :param columns: <list: string> with column names to read. Keys required
+              for the id and the installation merge are added automatically.
+              None for all columns
+    :param filters: <list: tuple> of predicates (column, operator, value)
+              applied while reading, e.g. [("year", "between", (2013, 2020))]
+    :param engine: <string> csv parsing engine: "c", "python", or "pyarrow"
+              (multithreaded, Arrow-backed columns). None for pandas default
+    :param lazy: <boolean> True to return a lazy Polars query plan (see
+              lazy.py) instead of a data frame. Cannot be combined with
+              compact and engine
+    :return: <pd.DataFrame> or <pl.LazyFrame> for lazy"""
+    if lazy:
+        from .lazy import scan_compliance
+
+        _check_lazy(compact=compact, engine=engine)
+        return scan_compliance(
+            fn_zip,
+            df_installation=df_installation,
+            create_id=create_id,
+            drop=drop,
+            columns=columns,
+            filters=filters,
+        )
+    keys = ["installation_id", "year"] if create_id else []
+    if df_installation is not None:
+        keys.append("installation_id")
+    usecols = _get_usecols(
+        fn_zip, "compliance.csv", drop=drop, columns=columns, keys=keys
     )
-    cols = [c for c in df.columns if c not in drop]
-    df = df[cols].copy()
+    with stage("get_compliance", "read") as st:
+        df = _load_member(
+            fn_zip,
+            "compliance.csv",
+            usecols,
+            filters=filters,
+            compact=compact,
+            engine=engine,
+            low_memory=False,
+        )
+        st.record(df)
     # get compliance codes
-    mapper = get_mapper(fn_zip, "compliance_code.csv")
-    df = map_if_exists(df, mapper, "compliance_id", "complianceCode")
-    # order of columns
-    # create an unique id
-    if create_id:
-        df["id"] = df.installation_id + "_" + df.year.map(str)
-        df = df[["id"] + list(df.columns[:-1])]
+    with stage("get_compliance", "labels") as st:
+        mapper = get_mapper(fn_zip, "compliance_code.csv")
+        df = map_if_exists(
+            df, mapper, "compliance_id", "complianceCode", as_category=compact
+        )
+        # order of columns
+        # create an unique id
+        if create_id:
+            df["id"] = df.installation_id + "_" + df.year.map(str)
+            df = df[["id"] + list(df.columns[:-1])]
+        st.record(df)
     # add installation informations
+    with stage("get_compliance", "merge") as st:
+        df = _merge_compliance_details(df, df_installation)
+        st.record(df)
+    return df
+
+
+def _merge_compliance_details(df, df_installation=None):
+    """Merge installation information into compliance data
+    :param df: <pd.DataFrame> with compliance data
+    :param df_installations: <pd.DataFrame> with installation information
+    :return: <pd.DataFrame>"""
     if df_installation is not None:
         df_installation = df_installation.rename(columns={"id": "installation_id"})
         df = df.merge(df_installation, on="installation_id", how="left")
-
     return df
 
 
@@ -104,28 +353,103 @@ def get_accounts(
     prefix_installation="installation",
     df_accountHolder=None,
     prefix_accountHolder="accountHolder",
+    compact=False,
+    columns=None,
+    filters=None,
+    engine=None,
+    lazy=False,
 ):
     """Load and aggregate account data from zip and add labels
-    :param fn_zip: <string> name of zip file with data
+    :param fn_zip: <string> name of zip file with data or <EUTLArchive>
     :param drop: <list: string> with column names to drop
     :param df_installations: <pd.DataFrame> with installation information to be included
                   index column has to be named "id"s
     :param prefix_installation: <string> prefix for installation columns to avoid column
                   name conflicts. Only applied to columns with name conflict.
-    :return: <pd.DataFrame>"""
-    # get account and drop columns
-    df = load_zipped_file(fn_zip, "account.csv", read_csv_args=dict(low_memory=False))
-    cols = [c for c in df.columns if c not in drop]
-    df = df[cols].copy()
+    :param compact: <boolean> True to use compact column types and
+                  categorical labels
+    :param columns: <list: string> with column names to read. Keys required
+                  for merges are added automatically. None for all columns
+    :param filters: <list: tuple> of predicates (column, operator, value)
+                  applied while reading, e.g. [("registry_id", "in", ["AT", "DE"])]
+    :param engine: <string> csv parsing engine: "c", "python", or "pyarrow"
+                  (multithreaded, Arrow-backed columns). None for pandas default
+    :param lazy: <boolean> True to return a lazy Polars query plan (see
+                  lazy.py) instead of a data frame. Cannot be combined with
+                  compact and engine
+    :return: <pd.DataFrame> or <pl.LazyFrame> for lazy"""
+    if lazy:
+        from .lazy import scan_accounts
+
+        _check_lazy(compact=compact, engine=engine)
+        return scan_accounts(
+            fn_zip,
+            drop=drop,
+            df_installation=df_installation,
+            prefix_installation=prefix_installation,
+            df_accountHolder=df_accountHolder,
+            prefix_accountHolder=prefix_accountHolder,
+            columns=columns,
+            filters=filters,
+        )
+    # get account without dropped columns
+    keys = ["id"]
+    if df_installation is not None:
+        keys.append("installation_id")
+    if df_accountHolder is not None:
+        keys.append("accountHolder_id")
+    usecols = _get_usecols(fn_zip, "account.csv", drop=drop, columns=columns, keys=keys)
+    with stage("get_accounts", "read") as st:
+        df = _load_member(
+            fn_zip,
+            "account.csv",
+            usecols,
+            filters=filters,
+            compact=compact,
+            engine=engine,
+            low_memory=False,
+        )
+        st.record(df)
 
     # impose relations
-    mapper = get_mapper(fn_zip, "country_code.csv")
-    df = map_if_exists(df, mapper, "registry_id", "registry")
-    mapper = get_mapper(fn_zip, "account_type.csv")
-    df = map_if_exists(df, mapper, "accountType_id", "accountType")
-    df = map_if_exists(df, map_account_category, "accountType_id", "accountCategory")
+    with stage("get_accounts", "labels") as st:
+        mapper = get_mapper(fn_zip, "country_code.csv")
+        df = map_if_exists(df, mapper, "registry_id", "registry", as_category=compact)
+        mapper = get_mapper(fn_zip, "account_type.csv")
+        df = map_if_exists(
+            df, mapper, "accountType_id", "accountType", as_category=compact
+        )
+        df = map_if_exists(
+            df,
+            lookup_account_category,
+            "accountType_id",
+            "accountCategory",
+            as_category=compact,
+        )
+        st.record(df)
 
-    # merge installation information
+    # merge installation and account holder information
+    with stage("get_accounts", "merge") as st:
+        df = _merge_account_details(
+            df,
+            df_installation=df_installation,
+            prefix_installation=prefix_installation,
+            df_accountHolder=df_accountHolder,
+            prefix_accountHolder=prefix_accountHolder,
+        )
+        st.record(df)
+    return df
+
+
+def _merge_account_details(
+    df,
+    df_installation=None,
+    prefix_installation="installation",
+    df_accountHolder=None,
+    prefix_accountHolder="accountHolder",
+):
+    """Merge installation and account holder information into account data,
+    see get_accounts for parameters"""
     if df_installation is not None:
         cols_rename = {
             c: prefix_installation + c.capitalize()
@@ -157,57 +481,91 @@ def get_accounts(
     return df
 
 
-def get_transactions(
-    fn_zip,
-    drop=[],
-    freq=None,
-    df_account=None,
-    prefix_account={"transferring": "transferring", "acquiring": "acquiring"},
-):
-    """Load and aggregate transaction data from zip and add labels
-    :param fn_zip: <string> name of zip file with data
-    :param drop: <list: string> with column names to drop
+def _prepare_transactions(df, date_resolution=None):
+    """Parse dates of raw transaction data
+    :param df: <pd.DataFrame> with raw transaction data
+    :param date_resolution: <string> resolution of dates (see parse_datetime)
+    :return: <pd.DataFrame>"""
+    if "date" in df.columns:
+        # cut out milli-seconds
+        df["date"] = parse_datetime(df.date, resolution=date_resolution)
+    return df
+
+
+def _transaction_usecols(fn_zip, drop=[], freq=None, df_account=None, columns=None):
+    """Get columns to read from transaction data, see get_transactions"""
+    keys = ["date", "amount"] if freq is not None else []
+    if df_account is not None:
+        keys += ["transferringAccount_id", "acquiringAccount_id"]
+    return _get_usecols(
+        fn_zip, "transaction.csv", drop=drop, columns=columns, keys=keys
+    )
+
+
+def _resample_transactions(df, freq):
+    """Aggregate transferred amounts to given frequency. The result can be
+    resampled again with the same frequency, e.g., to combine partial results.
+    Bins of fixed frequencies (e.g. "7D") start at the epoch, so they do not
+    depend on the first date of the data.
+    :param df: <pd.DataFrame> with transaction data
     :param freq: <string> frequency for resampling
+    :return: <pd.DataFrame>"""
+    offset = to_offset(freq)
+    if isinstance(offset, pd.offsets.Day):
+        # days are calendar offsets for which pandas ignores the origin
+        offset = pd.offsets.Hour(24 * offset.n)
+    if isinstance(offset, pd.offsets.Tick):
+        grouper = pd.Grouper(key="date", freq=offset, origin="epoch")
+    else:
+        grouper = pd.Grouper(key="date", freq=offset)
+    groups = [grouper] + [c for c in df.columns if c not in ["amount", "date"]]
+    return df.groupby(groups, dropna=False, observed=True).amount.sum().reset_index()
+
+
+def _get_transaction_mappers(fn_zip):
+    """Get mappers for the labels of the transaction data
+    :param fn_zip: <string> name of zip file with data or <EUTLArchive>
+    :return: <dict: id column -> (label column, mapper)>"""
+    return {
+        "transactionTypeMain_id": (
+            "transactionTypeMain",
+            get_mapper(fn_zip, "transaction_type_main.csv"),
+        ),
+        "transactionTypeSupplementary_id": (
+            "transactionTypeSupplementary",
+            get_mapper(fn_zip, "transaction_type_supplementary.csv"),
+        ),
+        "unitType_id": ("unitType", get_mapper(fn_zip, "unit_type.csv")),
+    }
+
+
+def _label_transactions(df, mappers, df_account=None, prefix_account={}, compact=False):
+    """Impose labels and account information on transaction data
+    :param df: <pd.DataFrame> with transaction data
+    :param mappers: <dict> as returned by _get_transaction_mappers
     :param df_account: <pd.DataFrame> with account information
     :param prefix_account: <dict> with prefix for account columns for
                 transferring and acquiring accounts
+    :param compact: <boolean> True for categorical labels
     :return: <pd.DataFrame>"""
-    # get transactions, drop columns and resample
-    df = load_zipped_file(fn_zip, "transaction.csv").assign(
-        # cut out milli-seconds
-        date=lambda df: pd.to_datetime(df.date.str.split(".").str[0])
-    )
-    cols = [c for c in df.columns if c not in drop]
-    df = df[cols].copy()
-    if freq is not None:
-        groups = [pd.Grouper(key="date", freq=freq)] + [
-            c for c in cols if c not in ["amount", "date"]
-        ]
-        df = df.groupby(groups, dropna=False).amount.sum().reset_index()
-    # get mappings for references and impose labels
-    mapper = get_mapper(fn_zip, "transaction_type_main.csv")
-    df = map_if_exists(
-        df,
-        mapper,
-        "transactionTypeMain_id",
-        "transactionTypeMain",
-    )
-    mapper = get_mapper(fn_zip, "transaction_type_supplementary.csv")
-    df = map_if_exists(
-        df,
-        mapper,
-        "transactionTypeSupplementary_id",
-        "transactionTypeSupplementary",
-    )
-    mapper = get_mapper(fn_zip, "unit_type.csv")
-    df = map_if_exists(
-        df,
-        mapper,
-        "unitType_id",
-        "unitType",
-    )
+    with stage("get_transactions", "labels") as st:
+        for col, (col_mapped, mapper) in mappers.items():
+            df = map_if_exists(df, mapper, col, col_mapped, as_category=compact)
+        st.record(df)
 
     # impose account information
+    with stage("get_transactions", "merge") as st:
+        df = _merge_transaction_accounts(df, df_account, prefix_account)
+        st.record(df)
+    return df
+
+
+def _merge_transaction_accounts(df, df_account=None, prefix_account={}):
+    """Merge account information for transferring and acquiring accounts into
+    transaction data, see get_transactions for parameters. Accounts are joined
+    by position on an index of account ids if ids are unique."""
+    if df_account is not None and can_join_accounts(df, df_account, prefix_account):
+        return join_accounts(df, df_account, prefix_account)
     if df_account is not None:
         rename_cols = {
             c: prefix_account["transferring"] + c[0].capitalize() + c[1:]
@@ -228,10 +586,246 @@ def get_transactions(
         df = df.merge(
             df_account.rename(columns=rename_cols), on="acquiringAccount_id", how="left"
         )
-
     return df
 
 
+def get_transactions(
+    fn_zip,
+    drop=[],
+    freq=None,
+    df_account=None,
+    prefix_account={"transferring": "transferring", "acquiring": "acquiring"},
+    compact=False,
+    date_resolution=None,
+    chunksize=None,
+    columns=None,
+    filters=None,
+    engine=None,
+    lazy_accounts=False,
+    lazy=False,
+):
+    """Load and aggregate transaction data from zip and add labels
+    :param fn_zip: <string> name of zip file with data or <EUTLArchive>
+    :param drop: <list: string> with column names to drop
+    :param freq: <string> frequency for resampling
+    :param df_account: <pd.DataFrame> with account information
+    :param prefix_account: <dict> with prefix for account columns for
+                transferring and acquiring accounts
+    :param compact: <boolean> True to use compact column types and
+                categorical labels
+    :param date_resolution: <string> "s" to store dates at second and "D" to
+                store dates at day resolution
+    :param chunksize: <int> number of rows to read at once. If given, the data
+                are read in chunks and resampled incrementally, so that peak
+                memory depends on the size of the resampled data only.
+                Cannot be combined with the pyarrow engine.
+    :param columns: <list: string> with column names to read. Keys required
+                for resampling and the account merge are added automatically.
+                None for all columns
+    :param filters: <list: tuple> of predicates (column, operator, value)
+                applied to each chunk while reading, e.g.
+                [("date", ">=", "2021-01-01"), ("acquiringAccount_id", "in", ids)]
+    :param engine: <string> csv parsing engine: "c", "python", or "pyarrow"
+                (multithreaded, Arrow-backed columns). None for pandas default
+    :param lazy_accounts: <boolean> True to resolve account information only
+                when account columns are accessed
+    :param lazy: <boolean> True to return a lazy Polars query plan (see
+                lazy.py) instead of a data frame. Cannot be combined with
+                compact, date_resolution, chunksize, engine, and lazy_accounts
+    :return: <pd.DataFrame>, <LazyAccountFrame> for lazy_accounts, or
+                <pl.LazyFrame> for lazy"""
+    if lazy:
+        from .lazy import scan_transactions
+
+        _check_lazy(
+            compact=compact,
+            date_resolution=date_resolution,
+            chunksize=chunksize,
+            engine=engine,
+            lazy_accounts=lazy_accounts,
+        )
+        return scan_transactions(
+            fn_zip,
+            drop=drop,
+            freq=freq,
+            df_account=df_account,
+            prefix_account=prefix_account,
+            columns=columns,
+            filters=filters,
+        )
+    if lazy_accounts and df_account is not None:
+        df = get_transactions(
+            fn_zip,
+            drop=drop,
+            freq=freq,
+            prefix_account=prefix_account,
+            compact=compact,
+            date_resolution=date_resolution,
+            chunksize=chunksize,
+            columns=(
+                None if columns is None else list(columns) + list(ACCOUNT_KEYS.values())
+            ),
+            filters=filters,
+            engine=engine,
+        )
+        return LazyAccountFrame(df, df_account, prefix_account)
+    if chunksize is not None:
+        return _get_transactions_chunked(
+            fn_zip,
+            chunksize,
+            drop=drop,
+            freq=freq,
+            df_account=df_account,
+            prefix_account=prefix_account,
+            compact=compact,
+            date_resolution=date_resolution,
+            columns=columns,
+            filters=filters,
+            engine=engine,
+        )
+    # get transactions without dropped columns and resample
+    usecols = _transaction_usecols(fn_zip, drop, freq, df_account, columns)
+    with stage("get_transactions", "read") as st:
+        df = _load_member(
+            fn_zip,
+            "transaction.csv",
+            usecols,
+            filters=filters,
+            prepare=lambda df: _prepare_transactions(df, date_resolution),
+            compact=compact,
+            engine=engine,
+        )
+        st.record(df)
+    if freq is not None:
+        with stage("get_transactions", "resample") as st:
+            df = _resample_transactions(df, freq)
+            st.record(df)
+    # get mappings for references and impose labels
+    return _label_transactions(
+        df,
+        _get_transaction_mappers(fn_zip),
+        df_account=df_account,
+        prefix_account=prefix_account,
+        compact=compact,
+    )
+
+
+def _get_transactions_chunked(
+    fn_zip,
+    chunksize,
+    drop=[],
+    freq=None,
+    df_account=None,
+    prefix_account={},
+    compact=False,
+    date_resolution=None,
+    columns=None,
+    filters=None,
+    engine=None,
+):
+    """Load transactions in chunks, see get_transactions for parameters.
+    Resampled chunks are combined as soon as they exceed the chunk size and
+    twice the rows of the last combination, so that each row is combined a
+    bounded number of times on average."""
+    if freq is None:
+        return concat_chunks(
+            list(
+                iter_transactions(
+                    fn_zip,
+                    chunksize=chunksize,
+                    drop=drop,
+                    df_account=df_account,
+                    prefix_account=prefix_account,
+                    compact=compact,
+                    date_resolution=date_resolution,
+                    columns=columns,
+                    filters=filters,
+                    engine=engine,
+                )
+            )
+        )
+    parts, n_rows, threshold = [], 0, chunksize
+    usecols = _transaction_usecols(fn_zip, drop, freq, df_account, columns)
+    with stage("get_transactions", "read_resample") as st:
+        for df in _iter_member(
+            fn_zip,
+            "transaction.csv",
+            usecols,
+            chunksize,
+            filters=filters,
+            prepare=lambda df: _prepare_transactions(df, date_resolution),
+            compact=compact,
+            engine=engine,
+        ):
+            parts.append(_resample_transactions(df, freq))
+            n_rows += len(parts[-1])
+            if n_rows > threshold and len(parts) > 1:
+                parts = [_resample_transactions(concat_chunks(parts), freq)]
+                n_rows = len(parts[0])
+                threshold = max(chunksize, 2 * n_rows)
+        df = _resample_transactions(concat_chunks(parts), freq)
+        st.record(df)
+    return _label_transactions(
+        df,
+        _get_transaction_mappers(fn_zip),
+        df_account=df_account,
+        prefix_account=prefix_account,
+        compact=compact,
+    )
+
+
+def iter_transactions(
+    fn_zip,
+    chunksize=1000000,
+    drop=[],
+    df_account=None,
+    prefix_account={"transferring": "transferring", "acquiring": "acquiring"},
+    compact=False,
+    date_resolution=None,
+    columns=None,
+    filters=None,
+    engine=None,
+):
+    """Iterate over labeled chunks of transaction data
+    :param fn_zip: <string> name of zip file with data or <EUTLArchive>
+    :param chunksize: <int> maximal number of transactions per chunk
+    :param drop: <list: string> with column names to drop
+    :param df_account: <pd.DataFrame> with account information
+    :param prefix_account: <dict> with prefix for account columns for
+                transferring and acquiring accounts
+    :param compact: <boolean> True to use compact column types and
+                categorical labels
+    :param date_resolution: <string> "s" to store dates at second and "D" to
+                store dates at day resolution
+    :param columns: <list: string> with column names to read. Keys required
+                for the account merge are added automatically.
+                None for all columns
+    :param filters: <list: tuple> of predicates (column, operator, value)
+                applied to each chunk. Chunks may hold fewer rows than chunksize
+    :param engine: <string> csv parsing engine: "c" or "python". The pyarrow
+                engine does not read in chunks. None for pandas default
+    :return: <iterator: pd.DataFrame>"""
+    mappers = _get_transaction_mappers(fn_zip)
+    usecols = _transaction_usecols(fn_zip, drop, None, df_account, columns)
+    for df in _iter_member(
+        fn_zip,
+        "transaction.csv",
+        usecols,
+        chunksize,
+        filters=filters,
+        prepare=lambda df: _prepare_transactions(df, date_resolution),
+        compact=compact,
+        engine=engine,
+    ):
+        yield _label_transactions(
+            df,
+            mappers,
+            df_account=df_account,
+            prefix_account=prefix_account,
+            compact=compact,
+        )
+
+
 def get_account_holders(
     fn_zip,
     drop=[
@@ -242,14 +836,48 @@ def get_account_holders(
         "eMail",
         "addressSecondary",
     ],
+    compact=False,
+    columns=None,
+    filters=None,
+    engine=None,
+    lazy=False,
 ):
     """Load account holder information from zip files
-    :param fn_zip: <string> name of zip file with data
+    :param fn_zip: <string> name of zip file with data or <EUTLArchive>
     :param drop: <list: string> with column names to drop
-    :return: <pd.DataFrame>"""
-    # get account holdes and drop columns
-    df = load_zipped_file(fn_zip, "account_holder.csv")
-    df = df.drop(drop, axis=1)
-    mapper = get_mapper(fn_zip, "country_code.csv")
-    df = map_if_exists(df, mapper, "country_id", "country")
+    :param compact: <boolean> True to use compact column types and
+              categorical labels
+    :param columns: <list: string> with column names to read. Label columns
+              select the column they are derived from. None for all columns
+    :param filters: <list: tuple> of predicates (column, operator, value)
+              applied while reading, e.g. [("country_id", "==", "AT")]
+    :param engine: <string> csv parsing engine: "c", "python", or "pyarrow"
+              (multithreaded, Arrow-backed columns). None for pandas default
+    :param lazy: <boolean> True to return a lazy Polars query plan (see
+              lazy.py) instead of a data frame. Cannot be combined with
+              compact and engine
+    :return: <pd.DataFrame> or <pl.LazyFrame> for lazy"""
+    if lazy:
+        from .lazy import scan_account_holders
+
+        _check_lazy(compact=compact, engine=engine)
+        return scan_account_holders(fn_zip, drop=drop, columns=columns, filters=filters)
+    # get account holders without dropped columns
+    usecols = _get_usecols(
+        fn_zip, "account_holder.csv", drop=drop, columns=columns, keys=["id"]
+    )
+    with stage("get_account_holders", "read") as st:
+        df = _load_member(
+            fn_zip,
+            "account_holder.csv",
+            usecols,
+            filters=filters,
+            compact=compact,
+            engine=engine,
+        )
+        st.record(df)
+    with stage("get_account_holders", "labels") as st:
+        mapper = get_mapper(fn_zip, "country_code.csv")
+        df = map_if_exists(df, mapper, "country_id", "country", as_category=compact)
+        st.record(df)
     return df
@@ -0,0 +1,16 @@
+import os
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from synthetic import make_archive  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def fn_zip(tmp_path_factory):
+    """Small synthetic archive with the members of a release"""
+    fn = str(tmp_path_factory.mktemp("archive") / "eutl.zip")
+    make_archive(fn, scale=0.01)
+    return fn
@@ -0,0 +1,17 @@
+import pandas as pd
+import pytest
+from pyeutl import ziploader as zl
+
+
+def _sorted(df):
+    return df.sort_values(list(df.columns), ignore_index=True)
+
+
+@pytest.mark.parametrize("freq", ["7D", "10D", "5h", "D", "W", "MS", "YE"])
+@pytest.mark.parametrize("columns", [None, ["date", "amount"]])
+def test_chunked_resampling_equals_unchunked(fn_zip, freq, columns):
+    df = zl.get_transactions(fn_zip, freq=freq, columns=columns)
+    df_chunked = zl.get_transactions(fn_zip, freq=freq, columns=columns, chunksize=500)
+    pd.testing.assert_frame_equal(
+        _sorted(df), _sorted(df_chunked[df.columns]), check_categorical=False
+    )